@@ -0,0 +1,125 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Bedrock batch inference services"""
+
+# lib/batch_inference.py
+import boto3
+import json
+import os
+import logging
+from typing import Callable, Dict, Iterator, List
+from .utils import load_local_env
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_local_env()
+
+MANIFEST_FILE_NAME = 'records.jsonl'
+
+class BatchInferenceService:
+    """Submit batch inference jobs to Amazon Bedrock using S3 manifests"""
+
+    def __init__(self, s3_service):
+        self.s3_service = s3_service
+        self.bedrock = boto3.client('bedrock')
+        self.role_arn = os.getenv('FDP_BATCH_ROLE_ARN')
+
+    def write_manifest(self, job_name: str, records: List[Dict]) -> str:
+        """Write the JSONL manifest to S3 and return the input prefix"""
+        key = f"batch/{job_name}/input/{MANIFEST_FILE_NAME}"
+        self.s3_service.put_text(key, "\n".join(json.dumps(record) for record in records))
+        return f"s3://{self.s3_service.bucket_name}/batch/{job_name}/input/"
+
+    def submit_job(self, job_name: str, model_id: str, input_uri: str) -> str:
+        """Create the model invocation job and return its ARN"""
+        if not self.role_arn:
+            raise ValueError("FDP_BATCH_ROLE_ARN environment variable is not set")
+
+        response = self.bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={'s3InputDataConfig': {'s3Uri': input_uri}},
+            outputDataConfig={
+                's3OutputDataConfig': {
+                    's3Uri': f"s3://{self.s3_service.bucket_name}/batch/{job_name}/output/"
+                }
+            }
+        )
+        logger.info(f"Submitted batch inference job: {response['jobArn']}")
+        return response['jobArn']
+
+    def get_job(self, job_arn: str) -> Dict:
+        """Get the status and model of a model invocation job"""
+        response = self.bedrock.get_model_invocation_job(jobIdentifier=job_arn)
+        return {
+            'job_name': response['jobName'],
+            'model_id': response['modelId'],
+            'status': response['status']
+        }
+
+    def read_output(self, job_arn: str) -> Iterator[Dict]:
+        """Read output records written by a completed job"""
+        job = self.get_job(job_arn)
+        job_id = job_arn.split('/')[-1]
+        key = f"batch/{job['job_name']}/output/{job_id}/{MANIFEST_FILE_NAME}.out"
+        for line in self.s3_service.get_text(key).splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+class LocalBatchInferenceService:
+    """File based stand-in for Bedrock batch inference
+
+    Jobs complete as soon as they are submitted, each record's model output
+    is produced by the given responder callable.
+    """
+
+    def __init__(self, base_dir: str, responder: Callable[[str, Dict], Dict]):
+        self.base_dir = base_dir
+        self.responder = responder
+        self.jobs = {}
+
+    def write_manifest(self, job_name: str, records: List[Dict]) -> str:
+        """Write the JSONL manifest to the local directory"""
+        input_dir = os.path.join(self.base_dir, job_name, 'input')
+        os.makedirs(input_dir, exist_ok=True)
+        with open(os.path.join(input_dir, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+        return input_dir
+
+    def submit_job(self, job_name: str, model_id: str, input_uri: str) -> str:
+        """Run every record through the responder and write the output file"""
+        output_dir = os.path.join(self.base_dir, job_name, 'output')
+        os.makedirs(output_dir, exist_ok=True)
+
+        with open(os.path.join(input_uri, MANIFEST_FILE_NAME), encoding='utf-8') as source, \
+                open(os.path.join(output_dir, f"{MANIFEST_FILE_NAME}.out"), 'w', encoding='utf-8') as target:
+            for line in source:
+                record = json.loads(line)
+                record['modelOutput'] = self.responder(model_id, record['modelInput'])
+                target.write(json.dumps(record) + "\n")
+
+        self.jobs[job_name] = model_id
+        return f"local/{job_name}"
+
+    def get_job(self, job_arn: str) -> Dict:
+        """Local jobs complete on submission"""
+        job_name = job_arn.split('/')[-1]
+        return {
+            'job_name': job_name,
+            'model_id': self.jobs.get(job_name),
+            'status': 'Completed'
+        }
+
+    def read_output(self, job_arn: str) -> Iterator[Dict]:
+        """Read output records from the local directory"""
+        job_name = job_arn.split('/')[-1]
+        path = os.path.join(self.base_dir, job_name, 'output', f"{MANIFEST_FILE_NAME}.out")
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
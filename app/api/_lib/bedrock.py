@@ -0,0 +1,212 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Amazon Bedrock request helpers"""
+
+# lib/bedrock.py
+import json
+import time
+from typing import Any, Dict, List, Optional
+from .utils import extract_json_object
+from .request_logging import add_timing
+
+# Model families that only accept text input
+TEXT_ONLY_MODELS = (
+    'amazon.nova-micro',
+)
+
+# Model families that accept images by S3 location
+S3_IMAGE_SOURCE_MODELS = (
+    'amazon.nova-lite',
+    'amazon.nova-pro',
+    'amazon.nova-premier'
+)
+
+# Model families that accept prompt cache checkpoints
+PROMPT_CACHE_MODELS = (
+    'amazon.nova-micro',
+    'amazon.nova-lite',
+    'amazon.nova-pro',
+    'amazon.nova-premier'
+)
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+def supports_prompt_cache(model_id: str) -> bool:
+    """Check if the model (or an inference profile for it) supports prompt caching"""
+    return any(model in (model_id or '') for model in PROMPT_CACHE_MODELS)
+
+def supports_image_input(model_id: str) -> bool:
+    """Check if the model (or an inference profile for it) accepts image input"""
+    return not any(model in (model_id or '') for model in TEXT_ONLY_MODELS)
+
+def supports_s3_image_source(model_id: str) -> bool:
+    """Check if the model (or an inference profile for it) accepts images by S3 location"""
+    return any(model in (model_id or '') for model in S3_IMAGE_SOURCE_MODELS)
+
+def build_messages_request(model_id: str, system: str, inference_config: Dict,
+                           instructions: Optional[str] = None, image_base64: Optional[str] = None,
+                           image_format: str = 'png', text: Optional[str] = None,
+                           image_s3_uri: Optional[str] = None, output_tool: Optional[Dict] = None) -> Dict:
+    """
+    Build a Nova messages-v1 request
+
+    The system text and the instructions are the same across requests, so they
+    come first and are followed by a cache checkpoint. The image and any
+    request specific text are placed after the checkpoint. The image is sent
+    as a reference to the S3 object when the model supports it, so the bytes
+    are not serialized into every request, and inline as base64 otherwise.
+    With an output tool, the model is required to answer by calling it with
+    arguments matching the tool's JSON schema.
+    """
+    system_blocks = [{"text": system}]
+    content = []
+
+    if instructions:
+        content.append({"text": instructions})
+
+    if supports_prompt_cache(model_id):
+        if content:
+            content.append(CACHE_POINT)
+        else:
+            system_blocks.append(CACHE_POINT)
+
+    if image_s3_uri and (supports_s3_image_source(model_id) or not image_base64):
+        content.append({
+            "image": {
+                "format": image_format,
+                "source": {"s3Location": {"uri": image_s3_uri}},
+            }
+        })
+    elif image_base64:
+        content.append({
+            "image": {
+                "format": image_format,
+                "source": {"bytes": image_base64},
+            }
+        })
+
+    if text:
+        content.append({"text": text})
+
+    request = {
+        "schemaVersion": "messages-v1",
+        "messages": [{
+            "role": "user",
+            "content": content,
+        }],
+        "system": system_blocks,
+        "inferenceConfig": inference_config,
+    }
+
+    if output_tool:
+        request["toolConfig"] = {
+            "tools": [output_tool],
+            "toolChoice": {"tool": {"name": output_tool["toolSpec"]["name"]}}
+        }
+
+    return request
+
+def build_output_tool(name: str, description: str, output_model) -> Dict:
+    """Build a tool spec whose input schema is the JSON schema of a pydantic model"""
+    return {
+        "toolSpec": {
+            "name": name,
+            "description": description,
+            "inputSchema": {"json": output_model.model_json_schema()}
+        }
+    }
+
+def invoke_model(bedrock_client, model_id: str, request: Dict,
+                 usage_log: Optional[List[Dict]] = None) -> Dict:
+    """
+    Invoke a Bedrock model and return the parsed response body
+
+    When a usage log is given, a usage record with the token counts and the
+    wall time of the call is appended to it.
+    """
+    start_time = time.perf_counter()
+
+    # Use a synchronous call since boto3 doesn't support async natively
+    response = bedrock_client.invoke_model(
+        modelId=model_id,
+        body=json.dumps(request)
+    )
+
+    model_response = json.loads(response["body"].read())
+    latency_ms = int((time.perf_counter() - start_time) * 1000)
+    add_timing('bedrock', latency_ms)
+
+    if usage_log is not None:
+        usage_log.append(build_usage_record(model_id, model_response.get('usage', {}), latency_ms))
+
+    return model_response
+
+def build_usage_record(model_id: str, usage: Dict, latency_ms: Optional[int]) -> Dict:
+    """Build a usage record for a single model call, latency_ms is None when not measured"""
+    return {
+        'model_id': model_id,
+        'input_tokens': int(usage.get('inputTokens', 0)),
+        'output_tokens': int(usage.get('outputTokens', 0)),
+        'cache_read_input_tokens': int(usage.get('cacheReadInputTokenCount', 0)),
+        'cache_write_input_tokens': int(usage.get('cacheWriteInputTokenCount', 0)),
+        'latency_ms': latency_ms
+    }
+
+def summarize_usage(usage_log: List[Dict]) -> Dict:
+    """Sum the usage records of a verification"""
+    summary = {
+        'invocations': len(usage_log),
+        'input_tokens': 0,
+        'output_tokens': 0,
+        'cache_read_input_tokens': 0,
+        'cache_write_input_tokens': 0,
+        'latency_ms': 0
+    }
+    for record in usage_log:
+        for key in ('input_tokens', 'output_tokens', 'cache_read_input_tokens',
+                    'cache_write_input_tokens', 'latency_ms'):
+            summary[key] += record.get(key) or 0
+    return summary
+
+def get_image_s3_uri(request: Dict) -> Optional[str]:
+    """Get the S3 URI of the image referenced by a messages-v1 request"""
+    for message in request.get("messages", []):
+        for block in message.get("content", []):
+            location = block.get("image", {}).get("source", {}).get("s3Location")
+            if location:
+                return location.get("uri")
+    return None
+
+def get_response_text(model_response: Dict) -> str:
+    """Extract the text output from a messages-v1 response"""
+    return model_response["output"]["message"]["content"][0]["text"]
+
+def get_response_output(model_response: Dict) -> Optional[Dict]:
+    """
+    Get the structured output of a messages-v1 response
+
+    The arguments of a tool call are used when present, otherwise the first
+    JSON object in the text output.
+    """
+    content = model_response.get("output", {}).get("message", {}).get("content", [])
+    for block in content:
+        if "toolUse" in block:
+            return block["toolUse"].get("input")
+    for block in content:
+        if "text" in block:
+            output = extract_json_object(block["text"])
+            if output is not None:
+                return output
+    return None
+
+def parse_structured_output(model_response: Dict, output_model) -> Dict[str, Any]:
+    """
+    Validate the structured output of a response against a pydantic model
+
+    Raises:
+        ValueError: If the response has no JSON output or it does not match the model
+    """
+    output = get_response_output(model_response)
+    if output is None:
+        raise ValueError("Model response has no JSON output")
+    return output_model.model_validate(output).model_dump()
@@ -0,0 +1,131 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Micro-benchmarks for the API hot paths
+
+Run from a function directory, for example ``python -m lib.benchmarks``.
+"""
+
+# lib/benchmarks.py
+import os
+import re
+import sys
+import json
+import uuid
+import timeit
+import subprocess
+from decimal import Decimal
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence
+from .models import VerificationStatus
+from .utils import dumps_json, json_default, orjson
+
+# Modules the handlers import from lib, measured without creating AWS clients
+HANDLER_MODULES = (
+    'lib.router',
+    'lib.document_analyzer',
+    'lib.document_verification_agent',
+    'lib.configuration_manager',
+    'lib.prompt_manager',
+    'lib.dynamodb',
+    'lib.dynamodb_extensions',
+    'lib.s3',
+    'lib.job_queue',
+    'lib.notifications'
+)
+
+# Cold start budget for importing the handler modules, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv('FDP_IMPORT_BUDGET_MS', '600'))
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+def build_verification_rows(count: int = 1000) -> List[Dict]:
+    """Verification records as read back from DynamoDB"""
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'pk': str(uuid.uuid4()),
+            'timestamp': (started + timedelta(minutes=index)).isoformat(),
+            'status': VerificationStatus.COMPLETED,
+            'document_type': 'passport',
+            'confidence': Decimal('0.87'),
+            'content_text': 'Document Type: Passport\nConfidence Score: 87\n' * 8,
+            'file_key': f"documents/{index}.jpg",
+            'model_tier': 'tier1',
+            'usage_summary': {
+                'invocations': Decimal('2'),
+                'input_tokens': Decimal('1520'),
+                'output_tokens': Decimal('214'),
+                'latency_ms': Decimal('1834')
+            },
+            'preview_url': f"https://example-bucket.s3.amazonaws.com/documents/{index}.jpg?X-Amz-Signature=abc"
+        }
+        for index in range(count)
+    ]
+
+def benchmark_json_encoding(rows: int = 1000, number: int = 50) -> Dict:
+    """
+    Compare the response encoder with the standard library on a verification list
+
+    Returns:
+        Dict: milliseconds per encoding for each encoder and the speedup
+    """
+    items = build_verification_rows(rows)
+    stdlib_ms = timeit.timeit(lambda: json.dumps(items, default=json_default), number=number) / number * 1000
+    encoder_ms = timeit.timeit(lambda: dumps_json(items), number=number) / number * 1000
+    return {
+        'rows': rows,
+        'backend': 'orjson' if orjson is not None else 'json',
+        'stdlib_ms': round(stdlib_ms, 3),
+        'encoder_ms': round(encoder_ms, 3),
+        'speedup': round(stdlib_ms / encoder_ms, 1)
+    }
+
+def _import_times(code: str) -> List[tuple]:
+    """Depth, module name and cumulative milliseconds of every import made by running code"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            # Nested imports are indented by two spaces per level
+            times.append(((len(match.group(3)) - 1) // 2, match.group(4), int(match.group(2)) / 1000))
+    return times
+
+def import_time_report(modules: Sequence[str] = HANDLER_MODULES, budget_ms: float = IMPORT_BUDGET_MS,
+                       top: int = 10) -> Dict:
+    """
+    Measure the import time of modules in a fresh interpreter against a budget
+
+    Imports made by interpreter startup are excluded. Run from a function
+    directory so lib resolves.
+
+    Returns:
+        Dict: total milliseconds, whether it is within budget and the
+        packages with the largest cumulative import time
+    """
+    startup = {name for _, name, _ in _import_times('pass')}
+    times = [
+        (depth, name, milliseconds)
+        for depth, name, milliseconds in _import_times('; '.join(f"import {module}" for module in modules))
+        if name not in startup
+    ]
+
+    total_ms = sum(milliseconds for depth, _, milliseconds in times if depth == 0)
+    packages = {name: milliseconds for _, name, milliseconds in times if '.' not in name}
+    packages.update({name: milliseconds for _, name, milliseconds in times if name in modules})
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'total_ms': round(total_ms, 1),
+        'budget_ms': budget_ms,
+        'within_budget': total_ms <= budget_ms,
+        'slowest': [{'module': name, 'cumulative_ms': round(milliseconds, 1)} for name, milliseconds in slowest]
+    }
+
+if __name__ == '__main__':
+    print(json.dumps(benchmark_json_encoding(), indent=2))
+    report = import_time_report()
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['within_budget'] else 1)
@@ -48,7 +48,10 @@ class ConfigurationManager:
                 )
 
             # Use update_configuration_without_locking to avoid optimistic locking issues
-            return await self.db_service.update_configuration_without_locking(config_data)
+            result = await self.db_service.update_configuration_without_locking(config_data)
+            # Handlers sharing this service see the new values at once
+            self.db_service.clear_caches()
+            return result
         except Exception as e:
             self.logger.error(f"Error updating configuration: {str(e)}")
             raise
@@ -66,7 +69,9 @@ class ConfigurationManager:
                     config_data['sk']
                 )
 
-            return await self.db_service.save_configuration(config_data)
+            result = await self.db_service.save_configuration(config_data)
+            self.db_service.clear_caches()
+            return result
         except Exception as e:
             self.logger.error(f"Error creating configuration: {str(e)}")
             raise
@@ -112,3 +117,11 @@ class ConfigurationManager:
         except Exception as e:
             self.logger.error(f"Error getting inference parameters: {str(e)}")
             raise
+
+    async def get_usage_stats(self):
+        """Get model usage aggregates per model and per prompt version"""
+        try:
+            return await self.db_service.get_usage_stats()
+        except Exception as e:
+            self.logger.error(f"Error getting usage stats: {str(e)}")
+            raise
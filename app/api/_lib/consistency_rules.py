@@ -0,0 +1,190 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Rule based consistency checks for extracted document fields"""
+
+# lib/consistency_rules.py
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence
+
+# Field names the model uses for the same value
+FIELD_ALIASES = {
+    'name': ('name', 'full_name'),
+    'date_of_birth': ('date_of_birth', 'birth_date', 'dob'),
+    'issue_date': ('issue_date', 'date_of_issue', 'issued_date'),
+    'expiry_date': ('expiry_date', 'expiration_date', 'date_of_expiry', 'expires'),
+    'document_number': ('document_number', 'passport_number', 'license_number', 'id_number',
+                        'certificate_number')
+}
+
+# Per document type rules: required fields, document number format, age bounds
+# and whether the document expires
+RULE_SETS = {
+    'passport': {
+        'required': ('name', 'date_of_birth', 'document_number', 'expiry_date'),
+        'document_number': r'^[A-Z0-9]{6,9}$',
+        'min_age': 0,
+        'max_age': 130,
+        'expires': True
+    },
+    "driver's license": {
+        'required': ('name', 'date_of_birth', 'document_number', 'expiry_date'),
+        'document_number': r'^[A-Z0-9-]{4,20}$',
+        'min_age': 14,
+        'max_age': 130,
+        'expires': True
+    },
+    'id card': {
+        'required': ('name', 'date_of_birth', 'document_number'),
+        'document_number': r'^[A-Z0-9-]{5,20}$',
+        'min_age': 0,
+        'max_age': 130,
+        'expires': True
+    },
+    'birth certificate': {
+        'required': ('name', 'date_of_birth'),
+        'document_number': None,
+        'min_age': 0,
+        'max_age': 130,
+        'expires': False
+    }
+}
+
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%Y.%m.%d',
+    '%d %b %Y',
+    '%d %B %Y',
+    '%b %d %Y',
+    '%B %d %Y',
+    '%d-%b-%Y'
+)
+
+def get_rule_set(document_type: Optional[str]) -> Optional[Dict]:
+    """Get the rule set for a document type, None for unknown types"""
+    document_type = (document_type or '').lower()
+    if 'passport' in document_type:
+        return RULE_SETS['passport']
+    if 'licen' in document_type:
+        return RULE_SETS["driver's license"]
+    if 'birth' in document_type:
+        return RULE_SETS['birth certificate']
+    if 'identification' in document_type or re.search(r'\bid\b', document_type):
+        return RULE_SETS['id card']
+    return None
+
+def get_field(fields: Dict, name: str) -> Optional[str]:
+    """Get a field value by its standard name or one of its aliases"""
+    normalized = {str(key).lower().replace(' ', '_'): value for key, value in fields.items()}
+    for alias in FIELD_ALIASES.get(name, (name,)):
+        value = normalized.get(alias)
+        if value not in (None, ''):
+            return str(value).strip()
+    return None
+
+def parse_date(value: str) -> Optional[date]:
+    """
+    Parse a document date
+
+    Numeric day/month dates are only accepted when the day is unambiguous,
+    None is returned for values that cannot be parsed with certainty.
+    """
+    value = re.sub(r'[,\s]+', ' ', value.strip())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+
+    match = re.fullmatch(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})', value)
+    if match:
+        first, second, year = (int(part) for part in match.groups())
+        try:
+            if first > 12:
+                return date(year, second, first)
+            if second > 12:
+                return date(year, first, second)
+            if first == second:
+                return date(year, first, second)
+        except ValueError:
+            return None
+    return None
+
+def _age_on(birth_date: date, today: date) -> int:
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+def check_consistency(fields: Dict, document_type: Optional[str], today: Optional[date] = None,
+                      mismatches: Sequence[str] = ()) -> Optional[Dict]:
+    """
+    Check extracted fields against the rule set of the document type
+
+    The confidence is the share of the checks run that passed, mismatches
+    found by other checks, such as the MRZ comparison, count as failed
+    checks and are listed first.
+
+    Returns:
+        Dict: consistency result in the shape of the LLM check, or None when
+        the rules are inconclusive (unknown document type or unparseable dates)
+    """
+    rule_set = get_rule_set(document_type)
+    if rule_set is None or not fields:
+        return None
+
+    today = today or date.today()
+    inconsistencies: List[str] = list(mismatches)
+    checks = len(inconsistencies)
+
+    def check(passed: bool, inconsistency: str):
+        nonlocal checks
+        checks += 1
+        if not passed:
+            inconsistencies.append(inconsistency)
+
+    # Required fields
+    for name in rule_set['required']:
+        check(get_field(fields, name) is not None, f"Missing required field: {name}")
+
+    # Document number format
+    document_number = get_field(fields, 'document_number')
+    if rule_set['document_number'] and document_number:
+        check(bool(re.match(rule_set['document_number'], document_number.upper().replace(' ', ''))),
+              f"Document number has an invalid format: {document_number}")
+
+    # Dates must parse before they can be compared
+    dates = {}
+    for name in ('date_of_birth', 'issue_date', 'expiry_date'):
+        value = get_field(fields, name)
+        if value is None:
+            continue
+        parsed = parse_date(value)
+        if parsed is None and not inconsistencies:
+            return None
+        dates[name] = parsed
+
+    birth_date = dates.get('date_of_birth')
+    issue_date = dates.get('issue_date')
+    expiry_date = dates.get('expiry_date')
+
+    if birth_date:
+        check(birth_date <= today, "Date of birth is in the future")
+        if birth_date <= today:
+            age = _age_on(birth_date, today)
+            check(rule_set['min_age'] <= age <= rule_set['max_age'],
+                  f"Age {age} is outside the expected range for this document")
+    if issue_date:
+        check(issue_date <= today, "Issue date is in the future")
+        if birth_date:
+            check(issue_date >= birth_date, "Issue date is before the date of birth")
+    if expiry_date:
+        if issue_date:
+            check(expiry_date > issue_date, "Expiry date is not after the issue date")
+        if rule_set['expires']:
+            check(expiry_date >= today, f"Document expired on {expiry_date.isoformat()}")
+
+    return {
+        "is_consistent": not inconsistencies,
+        "confidence": round((checks - len(inconsistencies)) / checks, 2) if checks else 0.0,
+        "inconsistencies": inconsistencies,
+        "source": "rules"
+    }
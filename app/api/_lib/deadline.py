@@ -0,0 +1,62 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Invocation deadlines for Lambda handlers"""
+
+# lib/deadline.py
+import os
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Optional
+
+# Monotonic time by which the current invocation must have persisted its work
+DEADLINE: ContextVar[Optional[float]] = ContextVar('deadline', default=None)
+
+# Time a model step is expected to take, steps are not started with less time left
+STEP_BUDGET_SECONDS = int(os.getenv('FDP_STEP_BUDGET_MS', '4000')) / 1000
+
+class DeadlineExceeded(Exception):
+    """Raised when there is not enough time left in the invocation for a call"""
+
+def set_deadline(context, reserve_ms: Optional[int] = None):
+    """
+    Set the deadline of the current invocation from the Lambda context
+
+    The deadline is reserve_ms before the Lambda timeout, leaving time to
+    persist partial results. Without a Lambda context there is no deadline.
+    """
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        DEADLINE.set(None)
+        return
+
+    if reserve_ms is None:
+        reserve_ms = int(os.getenv('FDP_DEADLINE_RESERVE_MS', '2000'))
+    DEADLINE.set(time.monotonic() + (context.get_remaining_time_in_millis() - reserve_ms) / 1000)
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left before the deadline, None when there is no deadline"""
+    deadline = DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def has_time_for(seconds: float = STEP_BUDGET_SECONDS) -> bool:
+    """Check if a step of the given duration fits before the deadline"""
+    remaining = remaining_seconds()
+    return remaining is None or remaining >= seconds
+
+async def run_with_deadline(func, *args, **kwargs):
+    """
+    Run a blocking call in a thread, giving up at the deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed or passes during the call
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    if remaining <= 0:
+        raise DeadlineExceeded("Invocation deadline has passed")
+
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Call did not finish within {remaining:.1f}s before the deadline") from None
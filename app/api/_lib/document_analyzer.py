@@ -3,11 +3,26 @@
 """Document Analyzer"""
 
 # lib/agent-manager.py
+import os
 import json
 import uuid
+import asyncio
 from datetime import datetime, timezone
 from decimal import Decimal
-from lib.utils import extract_confidence_score, extract_document_type
+from lib.utils import extract_confidence_score, extract_document_type, prompt_version
+from lib.deadline import has_time_for, run_with_deadline
+from lib.request_logging import log_debug, timed
+from lib.bedrock import (
+    build_messages_request, build_usage_record, get_image_s3_uri,
+    get_response_text, invoke_model, summarize_usage, supports_image_input
+)
+
+# Documents of a batch analyzed at once, and the most documents per batch
+BATCH_CONCURRENCY = int(os.getenv('FDP_BATCH_CONCURRENCY', '3'))
+BATCH_MAX_ITEMS = int(os.getenv('FDP_BATCH_MAX_ITEMS', '5'))
+
+# Fewest records Bedrock accepts in a batch inference job, an adjustable service quota
+BATCH_INFERENCE_MIN_RECORDS = int(os.getenv('FDP_BATCH_MIN_RECORDS', '100'))
 
 class DocumentAnalyzer:
     """Document Analyzer"""
@@ -15,11 +30,16 @@ class DocumentAnalyzer:
         self.db_service = services['db_service']
         self.s3_service = services['s3_service']
         self.bedrock_client = services['bedrock_client']
+        self.batch_service = services.get('batch_service')
         self.logger = logger
 
-    async def analyze_document(self, image_base64: str):
-        """Main business logic for document analysis"""
-        # Get active configurations
+    async def get_analysis_config(self):
+        """
+        Get the active prompt, model and inference configurations of an analysis
+
+        Read once per batch, so all of its documents are analyzed with the
+        same configuration even if it changes while the batch runs.
+        """
         active_prompt = await self.db_service.get_active_prompt()
         if not active_prompt:
             raise ValueError('No active prompt configured')
@@ -28,44 +48,112 @@ class DocumentAnalyzer:
         if not active_model:
             raise ValueError('No active model configured')
 
-        # Get inference configurations
-        inference_configs = await self._get_inference_configs()
+        snapshot = await self.db_service.get_config_snapshot(('INFERENCE_PARAMS', 'CASCADE_PARAMS'))
+        cascade_configs = await self._get_cascade_configs(snapshot['CASCADE_PARAMS'])
+        return {
+            'prompt': active_prompt,
+            'model': active_model,
+            'inference': await self._get_inference_configs(snapshot['INFERENCE_PARAMS']),
+            'cascade': cascade_configs,
+            'tiers': await self._get_cascade_tiers(cascade_configs) if cascade_configs['enabled'] else None
+        }
+
+    async def analyze_document(self, image_base64: str, analysis_config=None):
+        """Main business logic for document analysis"""
+        # Get active configurations, unless shared by a batch
+        config = analysis_config or await self.get_analysis_config()
+        active_prompt = config['prompt']
+        active_model = config['model']
+        inference_configs = config['inference']
+        cascade_configs = config['cascade']
 
-        # Upload to S3
-        file_key = self.s3_service.upload_base64_image(image_base64)
+        # Upload to S3 off the event loop, so the documents of a batch upload concurrently
+        file_key = await run_with_deadline(self.s3_service.upload_base64_image, image_base64)
         self.logger.info(f"Image uploaded with key: {file_key}")
 
-        # Get model response
-        content_text = await self._invoke_model(
-            image_base64,
-            active_prompt,
-            active_model,
-            inference_configs
-        )
+        # Get model response, referencing the uploaded image where the model supports it
+        image_s3_uri = self.s3_service.get_s3_uri(file_key)
+        usage_log = []
+        if cascade_configs['enabled']:
+            content_text, active_model = await self._invoke_cascade(
+                image_base64,
+                active_prompt,
+                inference_configs,
+                cascade_configs,
+                usage_log,
+                image_s3_uri,
+                tiers=config['tiers']
+            )
+        else:
+            content_text = await self._invoke_model(
+                image_base64,
+                active_prompt,
+                active_model,
+                inference_configs,
+                usage_log,
+                image_s3_uri
+            )
 
         # Process and save results
-        return await self._process_and_save_results(content_text, file_key)
+        return await self._process_and_save_results(
+            content_text, file_key, active_model, active_prompt, usage_log)
+
+    async def analyze_documents(self, images, max_concurrency=None):
+        """
+        Analyze several documents concurrently with one configuration snapshot
+
+        At most max_concurrency documents, capped by BATCH_CONCURRENCY, are
+        analyzed at once. A document that fails is reported in its item and
+        does not stop the others.
+
+        Returns:
+            Dict: counts and one item per document in request order, with
+            either the analysis result or the error
+        """
+        if not images:
+            raise ValueError('No documents found in request')
+        if len(images) > BATCH_MAX_ITEMS:
+            raise ValueError(f'At most {BATCH_MAX_ITEMS} documents can be analyzed per batch')
+
+        analysis_config = await self.get_analysis_config()
+        semaphore = asyncio.Semaphore(max(1, min(max_concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)))
+
+        async def analyze(index, image_base64):
+            async with semaphore:
+                try:
+                    result = await self.analyze_document(image_base64, analysis_config)
+                    return {'index': index, 'status': 'completed', 'result': result}
+                except Exception as e: # pylint: disable=broad-except
+                    self.logger.error(f"Error analyzing batch document {index}: {str(e)}")
+                    return {'index': index, 'status': 'failed', 'error': str(e)}
+
+        items = await asyncio.gather(*(analyze(index, image) for index, image in enumerate(images)))
+        failed = sum(1 for item in items if item['status'] == 'failed')
+        return {
+            'total': len(items),
+            'succeeded': len(items) - failed,
+            'failed': failed,
+            'items': items
+        }
 
     async def get_verifications(self):
         """Retrieve all verifications"""
         try:
-            self.logger.info("Calling db_service.get_verifications()")
-            raw_verifications = await self.db_service.get_verifications()
-
-            self.logger.info(f"Raw verifications type: {type(raw_verifications)}")
-            self.logger.info(f"Raw verifications value: {raw_verifications}")
+            with timed('dynamodb'):
+                raw_verifications = await self.db_service.get_verifications()
 
             # Handle case where get_verifications returns None
             if raw_verifications is None:
                 self.logger.warning("No verifications found, returning empty list")
                 return []
 
+            # Presigning checks each object in S3, off the event loop
             result = []
             for verification in raw_verifications:
-                self.logger.info(f"Processing verification: {verification}")
-                processed = self._process_verification(verification)
+                processed = await asyncio.to_thread(self._process_verification, verification)
                 result.append(processed)
 
+            log_debug("Processed verifications", count=len(result))
             return result
         except Exception as e:
             self.logger.error(f"Error in get_verifications: {str(e)}", exc_info=True)
@@ -77,11 +165,12 @@ class DocumentAnalyzer:
         verification = await self.db_service.get_verification(verification_id)
         if not verification:
             raise ValueError("Verification not found")
-        return self._process_verification(verification)
+        return await asyncio.to_thread(self._process_verification, verification)
 
-    async def _get_inference_configs(self):
-        """Get and process inference configurations"""
-        configs = await self.db_service.get_configurations('INFERENCE_PARAMS')
+    async def _get_inference_configs(self, configs=None):
+        """Get and process inference configurations, unless given from a snapshot"""
+        if configs is None:
+            configs = await self.db_service.get_cached_configurations('INFERENCE_PARAMS')
         if not configs:
             # Return default values if no configurations found
             return {
@@ -96,44 +185,121 @@ class DocumentAnalyzer:
             for config in configs
         }
 
-    async def _invoke_model(self, image_base64, active_prompt, active_model, inference_configs):
-        """Invoke Bedrock model and get response"""
-        native_request = {
-            "schemaVersion": "messages-v1",
-            "messages": [{
-                "role": "user",
-                "content": [
-                    {
-                        "image": {
-                            "format": "png",
-                            "source": {"bytes": image_base64},
-                        }
-                    },
-                    {
-                        "text": active_prompt['tasks']
-                    }
-                ],
-            }],
-            "system": [{"text": active_prompt['role']}],
-            "inferenceConfig": {
+    async def _get_cascade_configs(self, configs=None):
+        """Get and process model cascade configurations, unless given from a snapshot"""
+        if configs is None:
+            configs = await self.db_service.get_cached_configurations('CASCADE_PARAMS')
+        configs = {config['sk']: config['value'] for config in configs}
+
+        return {
+            'enabled': str(configs.get('enabled', 'false')).lower() == 'true',
+            'tiers': [
+                tier.strip().upper()
+                for tier in configs.get('tiers', 'LITE,PRO').split(',')
+                if tier.strip()
+            ],
+            'lower_bound': float(configs.get('lower_bound', 0.4)),
+            'upper_bound': float(configs.get('upper_bound', 0.8))
+        }
+
+    async def _get_cascade_tiers(self, cascade_configs):
+        """Get the models of the cascade tiers that accept images"""
+        # Text only tiers can't analyze document images
+        tiers = [
+            model for model in await self.db_service.get_model_tiers(cascade_configs['tiers'])
+            if supports_image_input(model['value'])
+        ]
+        if not tiers:
+            raise ValueError('No model tiers configured for cascade')
+        return tiers
+
+    async def _invoke_cascade(self, image_base64, active_prompt, inference_configs, cascade_configs,
+                              usage_log=None, image_s3_uri=None, tiers=None):
+        """Invoke models from cheapest to largest until the confidence leaves the uncertainty band"""
+        tiers = tiers or await self._get_cascade_tiers(cascade_configs)
+
+        for index, model in enumerate(tiers):
+            content_text = await self._invoke_model(
+                image_base64,
+                active_prompt,
+                model,
+                inference_configs,
+                usage_log,
+                image_s3_uri
+            )
+
+            # Output without a confidence score decides nothing, the next tier is asked
+            confidence = extract_confidence_score(content_text, default=None)
+            is_uncertain = confidence is None or (
+                cascade_configs['lower_bound'] <= confidence <= cascade_configs['upper_bound'])
+            if not is_uncertain or index == len(tiers) - 1:
+                self.logger.info(f"Cascade decided on tier {model['sk']} with confidence {confidence}")
+                return content_text, model
+
+            # Escalation is optional, keep this tier's result near the invocation timeout
+            if not has_time_for():
+                self.logger.warning(f"No time left to escalate, keeping tier {model['sk']} with confidence {confidence}")
+                return content_text, model
+
+            self.logger.info(f"Confidence {confidence} on tier {model['sk']} is uncertain, escalating")
+
+    def _build_model_request(self, active_prompt, active_model, inference_configs,
+                             image_base64=None, image_s3_uri=None):
+        """Build the Bedrock request for the active prompt and model"""
+        return build_messages_request(
+            active_model['value'],
+            system=active_prompt['role'],
+            instructions=active_prompt['tasks'],
+            image_base64=image_base64,
+            image_s3_uri=image_s3_uri,
+            inference_config={
                 "max_new_tokens": int(inference_configs.get('max_new_tokens', 3000)),
                 "top_p": inference_configs.get('top_p', 0.1),
                 "top_k": int(inference_configs.get('top_k', 20)),
                 "temperature": inference_configs.get('temperature', 0.3)
-            },
-        }
+            }
+        )
 
-        # Use a synchronous call since boto3 doesn't support async natively
-        response = self.bedrock_client.invoke_model(
-            modelId=active_model['value'],
-            body=json.dumps(native_request)
+    async def _invoke_model(self, image_base64, active_prompt, active_model, inference_configs,
+                            usage_log=None, image_s3_uri=None):
+        """Invoke Bedrock model and get response"""
+        native_request = self._build_model_request(
+            active_prompt,
+            active_model,
+            inference_configs,
+            image_base64=image_base64,
+            image_s3_uri=image_s3_uri
         )
 
-        model_response = json.loads(response["body"].read())
-        return model_response["output"]["message"]["content"][0]["text"]
+        model_response = await run_with_deadline(
+            invoke_model, self.bedrock_client, active_model['value'], native_request, usage_log)
+        return get_response_text(model_response)
 
-    async def _process_and_save_results(self, content_text, file_key):
+    async def _process_and_save_results(self, content_text, file_key, active_model=None,
+                                        active_prompt=None, usage_log=None):
         """Process model response and save verification"""
+        verification_data = self._build_verification_data(
+            content_text, file_key, active_model, active_prompt, usage_log)
+
+        saved_verification = await self.db_service.save_verification(verification_data)
+        await self._record_usage(usage_log, active_prompt)
+        preview_url = await asyncio.to_thread(self.s3_service.get_presigned_url, file_key)
+
+        return {
+            'pk': saved_verification['pk'],
+            'timestamp': saved_verification['timestamp'],
+            'document_type': verification_data['document_type'],
+            'confidence': saved_verification['confidence'],
+            'content_text': content_text,
+            'file_key': file_key,
+            'model_tier': verification_data.get('model_tier'),
+            'usage_summary': verification_data.get('usage_summary'),
+            'preview_url': preview_url
+        }
+
+    def _build_verification_data(self, content_text, file_key, active_model=None,
+                                 active_prompt=None, usage_log=None):
+        """Extract verification fields from model response"""
         confidence_score = extract_confidence_score(content_text)
         document_type = extract_document_type(content_text)
 
@@ -146,17 +312,136 @@ class DocumentAnalyzer:
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
 
-        saved_verification = await self.db_service.save_verification(verification_data)
-        preview_url = self.s3_service.get_presigned_url(file_key)
+        if active_model:
+            verification_data['model_tier'] = active_model.get('sk')
+            verification_data['model_id'] = active_model.get('value')
+
+        if active_prompt:
+            verification_data['prompt_id'] = active_prompt.get('pk')
+            verification_data['prompt_version'] = prompt_version(active_prompt)
+
+        if usage_log:
+            verification_data['model_usage'] = usage_log
+            verification_data['usage_summary'] = summarize_usage(usage_log)
+
+        return verification_data
+
+    async def _record_usage(self, usage_log, active_prompt=None):
+        """Roll up usage without failing the verification"""
+        if not usage_log:
+            return
+
+        try:
+            await self.db_service.record_model_usage(
+                usage_log,
+                active_prompt.get('pk') if active_prompt else None,
+                prompt_version(active_prompt) if active_prompt else None
+            )
+        except Exception as e: # pylint: disable=broad-except
+            self.logger.error(f"Error recording model usage: {str(e)}")
+
+    async def submit_batch_verifications(self, file_keys):
+        """Submit stored documents for offline analysis via batch inference"""
+        if not self.batch_service:
+            raise ValueError('Batch inference is not configured')
+
+        if not file_keys:
+            raise ValueError('No file keys provided')
+
+        if len(file_keys) < BATCH_INFERENCE_MIN_RECORDS:
+            raise ValueError(f'Batch inference jobs need at least {BATCH_INFERENCE_MIN_RECORDS} documents')
+
+        invalid_keys = [key for key in file_keys if not key.startswith('documents/')]
+        if invalid_keys:
+            raise ValueError(f"Invalid document keys: {', '.join(invalid_keys)}")
+
+        active_prompt = await self.db_service.get_active_prompt()
+        if not active_prompt:
+            raise ValueError('No active prompt configured')
+
+        active_model = await self.db_service.get_active_model_config()
+        if not active_model:
+            raise ValueError('No active model configured')
+
+        inference_configs = await self._get_inference_configs()
+
+        # Build one record per document using the same request shape as _invoke_model
+        records = [
+            {
+                'recordId': f"{index:011d}",
+                'modelInput': self._build_model_request(
+                    active_prompt,
+                    active_model,
+                    inference_configs,
+                    image_s3_uri=self.s3_service.get_s3_uri(file_key)
+                )
+            }
+            for index, file_key in enumerate(file_keys)
+        ]
+
+        job_name = f"fdp-batch-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{str(uuid.uuid4())[:8]}"
+        input_uri = await asyncio.to_thread(self.batch_service.write_manifest, job_name, records)
+        job_arn = await asyncio.to_thread(self.batch_service.submit_job, job_name, active_model['value'], input_uri)
 
         return {
-            'pk': saved_verification['pk'],
-            'timestamp': saved_verification['timestamp'],
-            'document_type': document_type,
-            'confidence': float(saved_verification['confidence']),
-            'content_text': content_text,
-            'file_key': file_key,
-            'preview_url': preview_url
+            'job_arn': job_arn,
+            'job_name': job_name,
+            'record_count': len(records)
+        }
+
+    async def ingest_batch_verifications(self, job_arn):
+        """
+        Save the results of a completed batch inference job
+
+        Idempotent, so the job can be polled after it completes: record pks
+        derive from the job ARN and record id, records already saved are
+        skipped and their usage is not recorded again.
+        """
+        if not self.batch_service:
+            raise ValueError('Batch inference is not configured')
+
+        job = await asyncio.to_thread(self.batch_service.get_job, job_arn)
+        if job['status'] != 'Completed':
+            return {'job_arn': job_arn, 'status': job['status']}
+
+        # Resolve the model tier the job ran on
+        model_configs = await self.db_service.get_configurations('MODEL_IDS')
+        active_model = next(
+            (config for config in model_configs if config['value'] == job['model_id']),
+            {'value': job['model_id']}
+        )
+
+        verifications = []
+        errors = []
+        for record in await asyncio.to_thread(list, self.batch_service.read_output(job_arn)):
+            file_key = self.s3_service.get_file_key(get_image_s3_uri(record['modelInput']))
+            if record.get('error') or 'modelOutput' not in record:
+                errors.append({'file_key': file_key, 'error': record.get('error')})
+                continue
+
+            # Batch jobs don't report per record latency
+            usage_log = [build_usage_record(
+                job['model_id'], record['modelOutput'].get('usage', {}), None)]
+
+            verification = self._build_verification_data(
+                get_response_text(record['modelOutput']),
+                file_key,
+                active_model,
+                usage_log=usage_log
+            )
+            verification['pk'] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job_arn}#{record.get('recordId', file_key)}"))
+            verifications.append(verification)
+
+        saved = await self.db_service.save_verifications(verifications)
+        await self._record_usage([usage for item in saved for usage in item.get('model_usage', [])])
+        self.logger.info(f"Ingested {len(saved)} new batch verifications with {len(errors)} errors")
+
+        return {
+            'job_arn': job_arn,
+            'status': job['status'],
+            'saved_count': len(saved),
+            'already_saved_count': len(verifications) - len(saved),
+            'errors': errors
         }
 
     def _process_verification(self, verification):
@@ -167,9 +452,6 @@ class DocumentAnalyzer:
 
         result = dict(verification)
 
-        if isinstance(result.get('confidence'), Decimal):
-            result['confidence'] = float(result['confidence'])
-
         if result.get('file_key'):
             try:
                 result['preview_url'] = self.s3_service.get_presigned_url(
@@ -2,15 +2,182 @@
 # SPDX-License-Identifier: MIT-0
 """Document Verification Agent using Strands Agents"""
 
+import os
 import uuid
 import json
 import base64
+import time
+import functools
 from datetime import datetime, timezone
-from typing import Dict, Optional, Any, List
+from typing import TYPE_CHECKING, Dict, Optional, Any, List
+from decimal import Decimal
 import asyncio
-from strands import Agent, tool
-from strands.models import BedrockModel
-from .models import AgentRequest, VerificationStatus
+from .models import (AgentRequest, VerificationStatus, DocumentAnalysis, AuthenticityCheck,
+                     FieldExtraction, ConsistencyCheck)
+from .utils import strip_base64_prefix
+from .session_store import SessionStore, CURRENT_VERIFICATION_ID
+from .bedrock import (build_messages_request, build_output_tool, invoke_model, parse_structured_output,
+                      summarize_usage)
+from .consistency_rules import check_consistency
+from .notifications import DELIVERY_TIMEOUT_SECONDS, get_destination
+from .deadline import DEADLINE, DeadlineExceeded, STEP_BUDGET_SECONDS, has_time_for, remaining_seconds, run_with_deadline
+from .mrz import find_mrz, mrz_to_fields, mrz_document_type, compare_mrz_fields
+from .job_queue import RETRYABLE_ERRORS, is_final_attempt, is_retryable
+
+# Verification modes: LLM planned tool calls or the fixed tool DAG
+PIPELINE_MODES = ('agent', 'pipeline')
+
+# Session memory kept across a NEEDS_INFO round trip: tool results and the
+# agent conversation, the image is read back from S3
+CHECKPOINT_KEYS = (
+    "analysis_result",
+    "authentication_result",
+    "extraction_result",
+    "consistency_result",
+    "document_type",
+    "extracted_fields",
+    "mrz_result",
+    "messages"
+)
+
+# Statuses that are sent to the client's notification destination
+NOTIFY_STATUSES = (
+    VerificationStatus.COMPLETED,
+    VerificationStatus.NEEDS_INFO,
+    VerificationStatus.REJECTED,
+    VerificationStatus.FAILED
+)
+
+# Times a verification is resumed after running out of invocation time before it fails
+MAX_RESUMES = int(os.getenv('FDP_MAX_RESUMES', '3'))
+
+# Larger checkpoints are written to S3, DynamoDB items are limited to 400 KB
+CHECKPOINT_INLINE_MAX_BYTES = 100 * 1024
+
+# Tool instructions are kept static so Bedrock can cache them across requests,
+# request specific values are sent after the cache checkpoint
+TOOL_SYSTEM_PROMPT = "You are a document verification expert."
+
+ANALYZE_DOCUMENT_PROMPT = """
+Analyze this document image and determine:
+1. What type of document it is (e.g., passport, driver's license, ID card, birth certificate, etc.)
+2. The quality of the image (high, medium, low)
+3. Any noticeable features or characteristics of the document
+
+Format your response as JSON with the following format:
+{
+    "document_type": "document type",
+    "image_quality": "quality level",
+    "confidence": 0.0-1.0,
+    "details": {
+        "dimensions": "dimensions if visible",
+        "format": "color or grayscale",
+        "other_details": "any other relevant details"
+    }
+}
+"""
+
+VERIFY_AUTHENTICITY_PROMPT = """
+You are a document authentication expert. Examine the document image carefully for authenticity.
+The expected document type is given after the image.
+
+Look for security features that should be present in an authentic document of that type, such as:
+- Holograms
+- Microprinting
+- Watermarks
+- Special inks or UV reactive elements
+- Proper formatting and layout
+- Official seals and signatures
+
+Also check for signs of tampering such as:
+- Uneven text
+- Digital manipulation artifacts
+- Inconsistent fonts
+- Misaligned elements
+- Unusual colors
+
+Format your response as JSON with the following structure:
+{
+    "is_authentic": true or false,
+    "confidence": 0.0-1.0,
+    "security_features_detected": ["feature1", "feature2"...],
+    "potential_issues": ["issue1", "issue2"...]
+}
+"""
+
+EXTRACT_FIELDS_PROMPT = """
+Review the document image carefully and extract the information requested after the image.
+
+Format your response as JSON with the following structure:
+{
+    "fields": {
+        "field_name_1": "extracted value 1",
+        "field_name_2": "extracted value 2",
+        ...
+    },
+    "confidence": {
+        "field_name_1": 0.XX,
+        "field_name_2": 0.XX,
+        ...
+    }
+}
+
+Use standardized field names like: name, date_of_birth, document_number, expiry_date, issuing_country, etc.
+If the document has a machine readable zone (MRZ), copy its lines exactly into a field named mrz, one line per line.
+For each field, provide a confidence score between 0.0 and 1.0.
+"""
+
+FIELD_PROMPTS = {
+    "passport": "Extract the following fields: full name, date of birth, passport number, expiry date, issuing country, nationality, gender",
+    "driver's license": "Extract the following fields: full name, date of birth, license number, expiry date, issuing authority/state, address, license classes",
+    "id card": "Extract the following fields: full name, date of birth, ID number, expiry date, issuing authority",
+    "birth certificate": "Extract the following fields: name, date of birth, place of birth, parents' names, certificate number"
+}
+
+DEFAULT_FIELD_PROMPT = "Extract all key fields from this document including names, dates, identification numbers, and any other relevant information"
+
+CHECK_CONSISTENCY_PROMPT = """
+Check the consistency of the fields extracted from a document, listed after these instructions.
+
+Analyze these fields and check for:
+1. Inconsistencies between fields (e.g., impossible dates, conflicting information)
+2. Unusual or suspicious values
+3. Missing critical information
+
+Format your response as JSON with the following structure:
+{
+    "is_consistent": true or false,
+    "confidence": 0.0-1.0,
+    "inconsistencies": ["description of issue 1", "description of issue 2", ...]
+}
+"""
+
+# Tools the model is asked to call with its structured output
+ANALYSIS_OUTPUT_TOOL = build_output_tool(
+    "record_document_analysis", "Record the document type and image quality", DocumentAnalysis)
+AUTHENTICITY_OUTPUT_TOOL = build_output_tool(
+    "record_authenticity_check", "Record the document authenticity assessment", AuthenticityCheck)
+EXTRACTION_OUTPUT_TOOL = build_output_tool(
+    "record_extracted_fields", "Record the fields extracted from the document", FieldExtraction)
+CONSISTENCY_OUTPUT_TOOL = build_output_tool(
+    "record_consistency_check", "Record the consistency check of the extracted fields", ConsistencyCheck)
+
+# Methods exposed to the Strands agent as tools
+TOOL_METHODS = (
+    '_analyze_document_image',
+    '_verify_document_authenticity',
+    '_extract_document_fields',
+    '_check_document_consistency'
+)
+
+if TYPE_CHECKING:
+    from strands import Agent
+
+def _json_default(value):
+    """Serialize checkpoint values read back from DynamoDB"""
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
 
 class DocumentVerificationAgent:
     """Document Verification Agent using Strands Agents"""
@@ -19,19 +186,64 @@ class DocumentVerificationAgent:
         self.db_service = services['db_service']
         self.s3_service = services['s3_service']
         self.bedrock_client = services['bedrock_client']
+        self.job_queue = services.get('job_queue')
+        self.notifier = services.get('notifier')
         self.logger = logger
 
-        # Initialize agent memory
-        self.agent_memory = {}
-
-        # Initialize Strands Agent
-        self.agent = self._initialize_agent()
+        # Initialize session memory, one entry per verification in flight
+        self.sessions = SessionStore(int(os.getenv('FDP_AGENT_MAX_SESSIONS', '100')))
 
         # Nova Lite model ID for LLM tasks
         self.nova_model_id = "amazon.nova-lite-v1:0"
 
-    def _initialize_agent(self) -> Agent:
-        """Initialize the Strands Agent with tools and memory"""
+    @property
+    def agent_memory(self) -> Dict:
+        """Session memory of the verification running in the current context"""
+        return self.sessions.get(CURRENT_VERIFICATION_ID.get())
+
+    def _bind_tools(self, verification_id: str, tool_executions: List[Dict], tool_errors: List[Exception]) -> List:
+        """
+        Build the Strands tools of one verification run
+
+        Strands calls tools from its own thread pool, which does not inherit
+        context variables, so each tool is bound to the verification and the
+        deadline of the run and runs its coroutine on the run's event loop.
+        Completed calls are recorded in tool_executions, retryable errors the
+        agent only sees as tool errors in tool_errors. Strands is imported
+        on the first agent mode run instead of at module load, so pipeline
+        mode and the other endpoints never pay for it.
+        """
+        from strands import tool
+
+        loop = asyncio.get_running_loop()
+        deadline = DEADLINE.get()
+
+        def bind(method):
+            @functools.wraps(method)
+            def run_tool(**kwargs):
+                try:
+                    result = asyncio.run_coroutine_threadsafe(
+                        self._call_tool(verification_id, deadline, method, kwargs), loop).result()
+                except RETRYABLE_ERRORS as e:
+                    tool_errors.append(e)
+                    raise
+                tool_executions.append(self._tool_execution(method.__name__.lstrip('_'), kwargs, result))
+                return result
+            return tool(run_tool)
+
+        return [bind(getattr(self, name)) for name in TOOL_METHODS]
+
+    async def _call_tool(self, verification_id: str, deadline: Optional[float], method, kwargs: Dict) -> Dict:
+        """Run a tool method in the session and under the deadline of its verification"""
+        CURRENT_VERIFICATION_ID.set(verification_id)
+        DEADLINE.set(deadline)
+        return await method(**kwargs)
+
+    def _initialize_agent(self, tools: List, messages: Optional[List[Dict]] = None) -> 'Agent':
+        """Initialize a Strands Agent with tools, one per verification run"""
+        from strands import Agent
+        from strands.models import BedrockModel
+
         # Create a Bedrock model
         bedrock_model = BedrockModel(
             model_id="amazon.nova-lite-v1:0",
@@ -42,25 +254,60 @@ class DocumentVerificationAgent:
 
         # Create the agent with the Bedrock model
         agent = Agent(
-            tools=[
-                self._analyze_document_image,
-                self._verify_document_authenticity,
-                self._extract_document_fields,
-                self._check_document_consistency
-            ],
-            model=bedrock_model
+            tools=tools,
+            model=bedrock_model,
+            messages=messages
         )
 
         return agent
 
+    async def _run_agent(self, verification_id: str, task: str, context: Dict) -> Dict:
+        """
+        Run the Strands agent of a verification, resuming its previous conversation
+
+        Agent calls block until the conversation ends, so the agent runs in
+        a worker thread and the event loop stays free for the tool calls.
+
+        Returns:
+            Dict: the agent response and the tool executions of this run
+
+        Raises:
+            DeadlineExceeded: If the deadline passed during the run, tools
+            that run out of time only report it to the agent as a tool error
+            Exception: The first retryable error of a tool call, for the same
+            reason
+        """
+        tool_executions = []
+        tool_errors = []
+        agent = self._initialize_agent(
+            self._bind_tools(verification_id, tool_executions, tool_errors), self.agent_memory.get("messages"))
+        try:
+            result = await asyncio.to_thread(agent, task, context=context)
+        finally:
+            self.agent_memory["messages"] = agent.messages
+
+        if not has_time_for(0):
+            raise DeadlineExceeded("Invocation deadline passed during the agent run")
+        if tool_errors:
+            raise tool_errors[0]
+        return {
+            "response": str(result),
+            "tool_executions": tool_executions
+        }
+
     async def start_verification(self, request: AgentRequest) -> Dict:
         """Start a new document verification process"""
         try:
             # Generate a unique ID for this verification
             verification_id = str(uuid.uuid4())
 
+            # Checked before the upload, so a rejected request leaves no object behind.
+            # Callback hosts are resolved, off the event loop
+            destination = await asyncio.to_thread(get_destination, request.metadata)
+            pipeline_mode = await self._get_pipeline_mode(request.metadata)
+
             # Upload image to S3
-            file_key = self.s3_service.upload_base64_image(request.image_base64)
+            file_key = await asyncio.to_thread(self.s3_service.upload_base64_image, request.image_base64)
             self.logger.info(f"Image uploaded with key: {file_key}")
 
             # Create initial verification record
@@ -70,17 +317,26 @@ class DocumentVerificationAgent:
                 'verification_id': verification_id,
                 'status': VerificationStatus.IN_PROGRESS,
                 'document_type': request.document_type,
+                'pipeline_mode': pipeline_mode,
                 'steps': [],
                 'file_key': file_key,
                 'created_at': current_time,
                 'updated_at': current_time
             }
+            if destination:
+                verification['callback'] = destination
 
             # Save to database
             await self.db_service.save_agent_verification(verification)
 
             # Start the verification process asynchronously
-            asyncio.create_task(self._run_verification(verification_id, request.image_base64, request.document_type))
+            await self._dispatch_job({
+                'action': 'start',
+                'verification_id': verification_id,
+                'document_type': request.document_type,
+                'file_key': file_key,
+                'pipeline_mode': pipeline_mode
+            }, request.image_base64)
 
             # Return the verification ID and initial status
             return {
@@ -104,7 +360,8 @@ class DocumentVerificationAgent:
 
             # Add presigned URL for preview if file exists
             if verification.get('file_key'):
-                verification['preview_url'] = self.s3_service.get_presigned_url(verification['file_key'])
+                verification['preview_url'] = await asyncio.to_thread(
+                    self.s3_service.get_presigned_url, verification['file_key'])
 
             return verification
 
@@ -112,6 +369,36 @@ class DocumentVerificationAgent:
             self.logger.error(f"Error getting verification status: {str(e)}", exc_info=True)
             raise
 
+    async def wait_for_verification_change(self, verification_id: str, since: Optional[str] = None,
+                                           timeout: float = 0.0):
+        """
+        Wait until a verification changes or the timeout passes
+
+        Only the status and update time are read while waiting. A change is a
+        different update time than ``since`` or, without it, a status other
+        than pending or in progress.
+        """
+        deadline = time.monotonic() + timeout
+        interval = 0.5
+
+        while True:
+            state = await self.db_service.get_agent_verification_state(verification_id)
+            if not state:
+                return
+
+            if since:
+                if state.get('updated_at') != since:
+                    return
+            elif state.get('status') not in (VerificationStatus.PENDING, VerificationStatus.IN_PROGRESS):
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, 2.0)
+
     async def provide_additional_info(self, verification_id: str, additional_info: Dict) -> Dict:
         """Process additional information for a verification"""
         try:
@@ -133,7 +420,11 @@ class DocumentVerificationAgent:
             await self.db_service.update_agent_verification(verification)
 
             # Continue verification process asynchronously
-            asyncio.create_task(self._continue_verification(verification_id, additional_info))
+            await self._dispatch_job({
+                'action': 'continue',
+                'verification_id': verification_id,
+                'additional_info': additional_info
+            })
 
             return {
                 'verification_id': verification_id,
@@ -147,16 +438,155 @@ class DocumentVerificationAgent:
             self.logger.error(f"Error processing additional info: {str(e)}", exc_info=True)
             raise
 
-    async def _run_verification(self, verification_id: str, image_base64: str, document_type: Optional[str] = None):
-        """Run the verification process using Strands Agent"""
+    async def _dispatch_job(self, job: Dict, image_base64: Optional[str] = None):
+        """
+        Queue a verification job, or run it in this process when no queue is configured
+
+        A verification whose job can't be queued would stay in progress, it is
+        marked as failed before the error is raised.
+        """
+        if self.job_queue is not None:
+            try:
+                await asyncio.to_thread(self.job_queue.send_job, job)
+            except Exception as e:
+                self.logger.error(f"Error queueing {job.get('action')} job: {str(e)}", exc_info=True)
+                await self._update_verification_status(
+                    job['verification_id'], VerificationStatus.FAILED,
+                    error_message=f"Verification job could not be queued: {str(e)}")
+                self.sessions.discard(job['verification_id'])
+                raise
+        else:
+            asyncio.create_task(self.process_job(job, image_base64))
+
+    async def process_job(self, job: Dict, image_base64: Optional[str] = None):
+        """
+        Run a queued verification job
+
+        Queued jobs carry the file key instead of the image, tools reference
+        the uploaded object by its S3 location. Retryable errors are raised
+        so the queue receives the job again, until its final attempt.
+        """
+        final_attempt = is_final_attempt(job)
+        if job.get('action') == 'start':
+            await self._run_verification(
+                job['verification_id'],
+                image_base64,
+                job.get('document_type'),
+                job.get('file_key'),
+                job.get('pipeline_mode', 'agent'),
+                final_attempt=final_attempt
+            )
+        elif job.get('action') == 'continue':
+            await self._continue_verification(
+                job['verification_id'], job.get('additional_info') or {}, final_attempt=final_attempt)
+        elif job.get('action') == 'resume':
+            await self._continue_verification(job['verification_id'], final_attempt=final_attempt)
+        elif job.get('action') == 'notify':
+            await self._redeliver(job)
+        else:
+            raise ValueError(f"Unknown job action: {job.get('action')}")
+
+    async def _get_pipeline_mode(self, metadata: Optional[Dict] = None) -> str:
+        """Get the pipeline mode from request metadata or the AGENT_PARAMS configuration"""
+        if metadata and metadata.get('pipeline_mode') in PIPELINE_MODES:
+            return metadata['pipeline_mode']
+
+        try:
+            configs = await self.db_service.get_cached_configurations('AGENT_PARAMS')
+            mode = next((c['value'] for c in configs if c['sk'] == 'pipeline_mode'), None)
+            if mode in PIPELINE_MODES:
+                return mode
+        except Exception as e:
+            self.logger.error(f"Error getting pipeline mode: {str(e)}")
+
+        return 'agent'
+
+    async def _get_early_exit_policy(self) -> Dict:
+        """Get the early exit policy from the EARLY_EXIT_PARAMS configuration"""
+        configs = {}
         try:
+            configs = {
+                config['sk']: config['value']
+                for config in await self.db_service.get_cached_configurations('EARLY_EXIT_PARAMS')
+            }
+        except Exception as e:
+            self.logger.error(f"Error getting early exit policy: {str(e)}")
+
+        return {
+            'enabled': str(configs.get('enabled', 'false')).lower() == 'true',
+            'unauthentic_confidence': float(configs.get('unauthentic_confidence', 0.9)),
+            'rejected_image_quality': [
+                quality.strip().lower()
+                for quality in str(configs.get('rejected_image_quality', 'low')).split(',')
+                if quality.strip()
+            ]
+        }
+
+    def _check_early_exit(self, tool_name: str, result: Dict) -> Optional[str]:
+        """
+        Check a tool result against the early exit policy
+
+        A decisive result is recorded in session memory, the remaining tools
+        are skipped and the verification is rejected.
+        """
+        policy = self.agent_memory.get("early_exit_policy") or {}
+        if not policy.get('enabled'):
+            return None
+
+        reason = None
+        if tool_name == "analyze_document_image":
+            quality = str(result.get("image_quality", "")).lower()
+            if quality in policy['rejected_image_quality']:
+                reason = f"Image quality is {quality}"
+        elif tool_name == "verify_document_authenticity":
+            confidence = result.get("confidence")
+            if (result.get("is_authentic") is False and isinstance(confidence, (int, float, Decimal))
+                    and float(confidence) >= policy['unauthentic_confidence']):
+                reason = f"Document is not authentic (confidence {float(confidence):.2f})"
+
+        if reason:
+            self.logger.info(f"Ending verification early after {tool_name}: {reason}")
+            self.agent_memory["early_exit"] = {"step": tool_name, "reason": reason}
+        return reason
+
+    def _skipped_result(self) -> Dict:
+        """Result of a tool skipped after the verification was decided"""
+        return {
+            "skipped": True,
+            "reason": self.agent_memory["early_exit"]["reason"]
+        }
+
+    async def _run_verification(self, verification_id: str, image_base64: str, document_type: Optional[str] = None,
+                                file_key: Optional[str] = None, pipeline_mode: str = 'agent',
+                                final_attempt: bool = True):
+        """
+        Run the verification process using Strands Agent or the fixed pipeline
+
+        Raises:
+            Exception: A retryable error when this is not the final attempt of
+            the job, the verification is failed otherwise
+        """
+        try:
+            # Bind this task and the tools it calls to the verification session
+            CURRENT_VERIFICATION_ID.set(verification_id)
+
             # Reset agent memory for this new verification
             self.agent_memory.clear()
+            self.agent_memory["early_exit_policy"] = await self._get_early_exit_policy()
+
+            # Keep the image in memory once, tools reference the uploaded object where the model supports it
+            self.agent_memory["document_image"] = strip_base64_prefix(image_base64)
+            if file_key:
+                self.agent_memory["document_s3_uri"] = self.s3_service.get_s3_uri(file_key)
+
+            if pipeline_mode == 'pipeline':
+                await self._run_pipeline(verification_id, document_type)
+                return
 
             # Set up context for the agent
             context = {
                 "verification_id": verification_id,
-                "document_image": image_base64
+                "file_key": file_key
             }
             if document_type:
                 context["document_type"] = document_type
@@ -172,58 +602,218 @@ class DocumentVerificationAgent:
             4. Check the consistency of the extracted information
             5. Provide a final verification result with confidence score
 
+            If a tool reports that it was skipped, the verification has already been decided, stop and summarize.
             If you need additional information at any point, specify exactly what you need.
             """
 
             # Run the agent with context
-            result = await self.agent(task, context=context)
+            result = await self._run_agent(verification_id, task, context)
 
             # Process the result and update verification status
             await self._process_agent_result(verification_id, result)
 
+        except DeadlineExceeded as de:
+            self.logger.warning(f"Verification {verification_id} ran out of time: {str(de)}")
+            await self._suspend_verification(verification_id)
         except Exception as e:
+            if self._retry_job(verification_id, e, final_attempt):
+                raise
             self.logger.error(f"Error running verification: {str(e)}", exc_info=True)
             # Update verification status to failed
             await self._update_verification_status(
                 verification_id, VerificationStatus.FAILED, error_message=str(e))
+            self.sessions.discard(verification_id)
+
+    async def _run_pipeline(self, verification_id: str, document_type: Optional[str] = None):
+        """
+        Run the verification as a fixed DAG of tool calls
+
+        The image analysis runs first, then authenticity and field extraction,
+        then consistency is checked on the extracted fields. Steps with a
+        result in session memory, restored from a checkpoint, are not run
+        again. With the early exit policy enabled, extraction only runs after
+        the authenticity check passes, so a rejected document is not billed
+        for it. Without the policy, authenticity and extraction run
+        concurrently. A step is not started without enough invocation time for
+        it, the verification is suspended with its completed steps instead.
+        """
+        tool_executions = []
+        memory = self.agent_memory
+        early_exit_enabled = (memory.get("early_exit_policy") or {}).get("enabled", False)
+
+        analysis = memory.get("analysis_result")
+        if analysis is None:
+            if not has_time_for(STEP_BUDGET_SECONDS):
+                await self._suspend_verification(verification_id, tool_executions)
+                return
+            analysis = await self._analyze_document_image()
+            tool_executions.append(self._tool_execution("analyze_document_image", {}, analysis))
+            if "early_exit" in memory:
+                await self._finish_early(verification_id, tool_executions)
+                return
 
-    async def _continue_verification(self, verification_id: str, additional_info: Dict):
-        """Continue the verification process with additional information"""
+        document_type = document_type or analysis.get("document_type")
+        authenticity = memory.get("authentication_result")
+        extraction = memory.get("extraction_result")
+        if (authenticity is None or extraction is None) and not has_time_for(STEP_BUDGET_SECONDS):
+            await self._suspend_verification(verification_id, tool_executions)
+            return
+        if authenticity is None and extraction is None and not early_exit_enabled:
+            # Both results are needed without early exit, so both model calls run at once. Both are
+            # awaited before an error is raised, so the usage of each call is recorded.
+            results = await asyncio.gather(
+                self._verify_document_authenticity(document_type=document_type),
+                self._extract_document_fields(document_type=document_type),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            authenticity, extraction = results
+            tool_executions.append(self._tool_execution(
+                "verify_document_authenticity", {"document_type": document_type}, authenticity))
+            tool_executions.append(self._tool_execution(
+                "extract_document_fields", {"document_type": document_type}, extraction))
+        else:
+            if authenticity is None:
+                authenticity = await self._verify_document_authenticity(document_type=document_type)
+                tool_executions.append(self._tool_execution(
+                    "verify_document_authenticity", {"document_type": document_type}, authenticity))
+                if "early_exit" in memory:
+                    await self._finish_early(verification_id, tool_executions)
+                    return
+            if extraction is None:
+                if not has_time_for(STEP_BUDGET_SECONDS):
+                    await self._suspend_verification(verification_id, tool_executions)
+                    return
+                extraction = await self._extract_document_fields(document_type=document_type)
+                tool_executions.append(self._tool_execution(
+                    "extract_document_fields", {"document_type": document_type}, extraction))
+
+        consistency = memory.get("consistency_result")
+        if consistency is None:
+            fields = memory.get("extracted_fields") or extraction.get("fields", {})
+            consistency = await self._check_document_consistency(fields)
+            tool_executions.append(self._tool_execution("check_document_consistency", {}, consistency))
+
+        summary = (
+            f"Document type: {document_type}. "
+            f"Authentic: {authenticity.get('is_authentic')}. "
+            f"Consistent: {consistency.get('is_consistent')}. "
+            f"Issues: {', '.join(authenticity.get('potential_issues', []) + consistency.get('inconsistencies', [])) or 'none'}."
+        )
+
+        await self._process_agent_result(verification_id, {
+            "response": summary,
+            "tool_executions": tool_executions
+        })
+
+    async def _finish_early(self, verification_id: str, tool_executions: List[Dict]):
+        """Finish a pipeline run decided by the early exit policy"""
+        await self._process_agent_result(verification_id, {
+            "response": self.agent_memory["early_exit"]["reason"],
+            "tool_executions": tool_executions
+        })
+
+    def _tool_execution(self, tool_name: str, tool_input: Dict, result: Dict) -> Dict:
+        """Build a tool execution record in the same shape the agent returns"""
+        return {
+            "tool_name": tool_name,
+            "tool_input": tool_input,
+            "result": result
+        }
+
+    async def _continue_verification(self, verification_id: str, additional_info: Optional[Dict] = None,
+                                     final_attempt: bool = True):
+        """
+        Continue the verification process with additional information
+
+        Without additional information, a verification suspended near the
+        invocation timeout is resumed from its checkpoint. Retryable errors
+        are raised like in _run_verification.
+        """
         try:
+            # Bind this task and the tools it calls to the verification session
+            CURRENT_VERIFICATION_ID.set(verification_id)
+
             # Get current verification
             verification = await self.db_service.get_agent_verification(verification_id)
 
+            # Restore tool results and conversation when the session is not in this container
+            if verification_id not in self.sessions:
+                self.agent_memory.update(await self._load_checkpoint(verification))
+            self.agent_memory["early_exit_policy"] = await self._get_early_exit_policy()
+
+            # Fields given by the user replace the extracted values, consistency is checked again
+            if additional_info is not None:
+                if isinstance(additional_info.get("fields"), dict):
+                    self.agent_memory["extracted_fields"] = {
+                        **self.agent_memory.get("extracted_fields", {}), **additional_info["fields"]}
+                self.agent_memory.pop("consistency_result", None)
+
             # Create context with additional info and document data
             context = {
-                "additional_info": additional_info,
                 "verification_id": verification_id
             }
+            if additional_info is not None:
+                context["additional_info"] = additional_info
+
+            # Reference the uploaded document image if available
+            if verification.get("file_key"):
+                context["file_key"] = verification["file_key"]
+                self.agent_memory["document_s3_uri"] = self.s3_service.get_s3_uri(verification["file_key"])
 
-            # Add document image if available
-            if "document_image" in self.agent_memory:
-                context["document_image"] = self.agent_memory["document_image"]
+            if verification.get("pipeline_mode") == 'pipeline':
+                await self._run_pipeline(verification_id, verification.get("document_type"))
+                return
 
             # Add document type if available
             if verification.get("document_type"):
                 context["document_type"] = verification.get("document_type")
 
             # Define the continuation task
-            task = """
-            Continue the document verification process with the additional information provided.
-            Review the new information and update your verification results accordingly.
-            """
+            if additional_info is not None:
+                task = """
+                Continue the document verification process with the additional information provided.
+                Review the new information and update your verification results accordingly.
+                Tools that already completed return their previous results, only run the steps still outstanding.
+                """
+            else:
+                task = """
+                Resume the document verification process where it stopped.
+                Tools that already completed return their previous results, only run the steps still outstanding.
+                """
 
-            # Run the agent with context
-            result = await self.agent(task, context=context)
+            # Run the agent with context, resuming the previous conversation
+            result = await self._run_agent(verification_id, task, context)
 
             # Process the result and update verification status
             await self._process_agent_result(verification_id, result)
 
+        except DeadlineExceeded as de:
+            self.logger.warning(f"Verification {verification_id} ran out of time: {str(de)}")
+            await self._suspend_verification(verification_id)
         except Exception as e:
+            if self._retry_job(verification_id, e, final_attempt):
+                raise
             self.logger.error(f"Error continuing verification: {str(e)}", exc_info=True)
             # Update verification status to failed
             await self._update_verification_status(
                 verification_id, VerificationStatus.FAILED, error_message=str(e))
+            self.sessions.discard(verification_id)
+
+    def _retry_job(self, verification_id: str, error: Exception, final_attempt: bool) -> bool:
+        """
+        Check if a failed verification job is left to the queue to retry
+
+        The session is dropped, a retried start runs again from the image and
+        a retried continue or resume restores the checkpoint.
+        """
+        if final_attempt or not is_retryable(error):
+            return False
+        self.logger.warning(f"Verification {verification_id} failed with a retryable error: {str(error)}")
+        self.sessions.discard(verification_id)
+        return True
 
     async def _process_agent_result(self, verification_id: str, result: Dict):
         """Process the result from the agent and update verification status"""
@@ -255,10 +845,21 @@ class DocumentVerificationAgent:
                 needs_info = True
                 info_request = agent_response
 
-            if needs_info:
+            early_exit = self.agent_memory.get("early_exit")
+            if early_exit:
+                # A decisive tool result ended the verification
+                verification['status'] = VerificationStatus.REJECTED
+                verification['early_exit'] = early_exit
+                verification['result_summary'] = early_exit['reason']
+                if self.agent_memory.get("document_type"):
+                    verification['document_type'] = self.agent_memory["document_type"]
+                verification.pop('checkpoint', None)
+                verification.pop('checkpoint_key', None)
+            elif needs_info:
                 # Agent needs more information
                 verification['status'] = VerificationStatus.NEEDS_INFO
                 verification['needs_info'] = info_request
+                await self._save_checkpoint(verification)
             else:
                 # Extract results from tool executions and response
                 verification['status'] = VerificationStatus.COMPLETED
@@ -266,11 +867,15 @@ class DocumentVerificationAgent:
                 # Try to extract a confidence score
                 confidence = 0.0
                 for execution in tool_executions:
-                    if execution.get("result", {}).get("confidence"):
-                        confidence = max(confidence, float(execution["result"]["confidence"]))
+                    # Field extraction reports confidence per field
+                    value = execution.get("result", {}).get("confidence")
+                    if isinstance(value, (int, float, Decimal)):
+                        confidence = max(confidence, float(value))
 
                 verification['confidence'] = confidence
                 verification['result_summary'] = agent_response
+                verification.pop('checkpoint', None)
+                verification.pop('checkpoint_key', None)
 
                 # Try to extract document type if available
                 for execution in tool_executions:
@@ -284,28 +889,172 @@ class DocumentVerificationAgent:
                         if "fields" in execution["result"]:
                             verification['extracted_fields'] = execution["result"]["fields"]
 
+            # Steps skipped for lack of time leave the result partial
+            consistency = self.agent_memory.get("consistency_result") or {}
+            if consistency.get("skipped") and not early_exit:
+                verification['partial'] = True
+            verification.pop('resumable', None)
+
             # Add tool executions as steps
-            for execution in tool_executions:
-                step_record = {
-                    'step_id': str(uuid.uuid4()),
-                    'name': execution.get('tool_name', 'Unknown tool'),
-                    'description': execution.get('tool_input', {}),
-                    'status': 'completed',
-                    'details': execution.get('result', {}),
-                    'timestamp': datetime.now(timezone.utc).isoformat()
-                }
-                verification['steps'].append(step_record)
+            self._append_steps(verification, tool_executions)
+
+            # Add model usage of the tool calls
+            usage_log = self._add_model_usage(verification)
 
             verification['updated_at'] = datetime.now(timezone.utc).isoformat()
 
             # Save updated verification
             await self.db_service.update_agent_verification(verification)
 
+            # Roll up usage without failing the verification
+            await self._record_model_usage(usage_log)
+
+            await self._notify(verification)
+
+            # Keep the session only while waiting for additional information
+            if verification['status'] != VerificationStatus.NEEDS_INFO:
+                self.sessions.discard(verification_id)
+
         except Exception as e:
+            # The run decides whether the job is retried
+            if is_retryable(e):
+                raise
             self.logger.error(f"Error processing agent result: {str(e)}", exc_info=True)
             # Update verification status to failed
             await self._update_verification_status(
                 verification_id, VerificationStatus.FAILED, error_message=str(e))
+            self.sessions.discard(verification_id)
+
+    def _append_steps(self, verification: Dict, tool_executions: List[Dict]):
+        """Add tool executions to the verification as steps"""
+        for execution in tool_executions:
+            step_record = {
+                'step_id': str(uuid.uuid4()),
+                'name': execution.get('tool_name', 'Unknown tool'),
+                'description': execution.get('tool_input', {}),
+                'status': 'completed',
+                'details': execution.get('result', {}),
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }
+            verification['steps'].append(step_record)
+
+    def _add_model_usage(self, verification: Dict) -> List[Dict]:
+        """Move the model usage of the tool calls from session memory to the verification"""
+        usage_log = self.agent_memory.pop("model_usage", [])
+        if usage_log:
+            verification['model_usage'] = verification.get('model_usage', []) + usage_log
+            verification['usage_summary'] = summarize_usage(verification['model_usage'])
+        return usage_log
+
+    async def _record_model_usage(self, usage_log: List[Dict]):
+        """Roll up usage without failing the verification"""
+        try:
+            await self.db_service.record_model_usage(usage_log)
+        except Exception as e: # pylint: disable=broad-except
+            self.logger.error(f"Error recording model usage: {str(e)}")
+
+    async def _suspend_verification(self, verification_id: str, tool_executions: Optional[List[Dict]] = None):
+        """
+        Persist the completed steps of a verification that is running out of time
+
+        The verification stays in progress and is marked resumable, a resume
+        job is queued so a new invocation continues from the checkpoint.
+        Without a job queue nothing would resume it, so it fails instead.
+        """
+        try:
+            if self.job_queue is None:
+                raise DeadlineExceeded("Verification ran out of time and no job queue is configured to resume it")
+
+            verification = await self.db_service.get_agent_verification(verification_id)
+            resume_count = int(verification.get('resume_count', 0))
+            if resume_count >= MAX_RESUMES:
+                raise DeadlineExceeded(f"Verification did not finish after {resume_count} resumes")
+
+            self._append_steps(verification, tool_executions or [])
+            usage_log = self._add_model_usage(verification)
+            await self._save_checkpoint(verification)
+            verification['resumable'] = True
+            verification['resume_count'] = resume_count + 1
+            verification['updated_at'] = datetime.now(timezone.utc).isoformat()
+            await self.db_service.update_agent_verification(verification)
+            await self._record_model_usage(usage_log)
+
+            self.logger.info(f"Suspended verification {verification_id}, resume {resume_count + 1} of {MAX_RESUMES}")
+
+        except Exception as e:
+            self.logger.error(f"Error suspending verification: {str(e)}", exc_info=True)
+            await self._update_verification_status(
+                verification_id, VerificationStatus.FAILED, error_message=str(e))
+            self.sessions.discard(verification_id)
+            return
+
+        self.sessions.discard(verification_id)
+        try:
+            await self._dispatch_job({'action': 'resume', 'verification_id': verification_id})
+        except Exception: # pylint: disable=broad-except
+            # The verification was failed when its resume job could not be queued
+            pass
+
+    async def _save_checkpoint(self, verification: Dict):
+        """
+        Checkpoint tool results and the agent conversation on the verification record
+
+        Large checkpoints are written to S3 and referenced by key.
+        """
+        checkpoint = {key: self.agent_memory[key] for key in CHECKPOINT_KEYS if key in self.agent_memory}
+        body = json.dumps(checkpoint, default=_json_default)
+
+        verification.pop('checkpoint', None)
+        verification.pop('checkpoint_key', None)
+        if len(body.encode('utf-8')) <= CHECKPOINT_INLINE_MAX_BYTES:
+            verification['checkpoint'] = checkpoint
+        else:
+            checkpoint_key = f"checkpoints/{verification['verification_id']}.json"
+            await asyncio.to_thread(self.s3_service.put_text, checkpoint_key, body)
+            verification['checkpoint_key'] = checkpoint_key
+
+    async def _load_checkpoint(self, verification: Dict) -> Dict:
+        """Load the checkpoint of a verification from its record or S3"""
+        if verification.get('checkpoint_key'):
+            body = await asyncio.to_thread(self.s3_service.get_text, verification['checkpoint_key'])
+            return json.loads(body)
+        return dict(verification.get('checkpoint') or {})
+
+    async def _notify(self, verification: Dict):
+        """
+        Send the saved result to the client's destination and record the delivery
+
+        The delivery is bounded by the time left in the invocation, so it
+        can't time out a queue job and have the verification run again.
+        Never fails the verification.
+        """
+        if (self.notifier is None or not verification.get('callback')
+                or verification.get('status') not in NOTIFY_STATUSES):
+            return
+
+        remaining = remaining_seconds()
+        timeout = DELIVERY_TIMEOUT_SECONDS if remaining is None else min(DELIVERY_TIMEOUT_SECONDS, remaining)
+        try:
+            verification['callback_result'] = await asyncio.to_thread(
+                self.notifier.notify, verification['callback'], verification, timeout)
+            await self.db_service.update_agent_verification(verification)
+        except Exception as e: # pylint: disable=broad-except
+            self.logger.error(f"Error sending completion notification: {str(e)}", exc_info=True)
+
+    async def _redeliver(self, job: Dict):
+        """Retry a notification queued after a failed delivery and record the new delivery"""
+        if self.notifier is None:
+            raise ValueError("Notifications are not configured")
+
+        remaining = remaining_seconds()
+        timeout = DELIVERY_TIMEOUT_SECONDS if remaining is None else min(DELIVERY_TIMEOUT_SECONDS, remaining)
+        result = await asyncio.to_thread(
+            self.notifier.deliver, job['destination'], job['body'], job['attempts'] + 1, timeout)
+
+        verification = await self.db_service.get_agent_verification(job['verification_id'])
+        if verification:
+            verification['callback_result'] = result
+            await self.db_service.update_agent_verification(verification)
 
     async def _update_verification_status(self, verification_id: str, status: VerificationStatus, 
                                         error_message: Optional[str] = None):
@@ -328,19 +1077,25 @@ class DocumentVerificationAgent:
             # Save updated verification
             await self.db_service.update_agent_verification(verification)
 
+            await self._notify(verification)
+
         except Exception as e:
             self.logger.error(f"Error updating verification status: {str(e)}", exc_info=True)
 
     # Tool implementations using Amazon Nova
-    @tool
-    async def _analyze_document_image(self, image_base64: str) -> Dict:
+    async def _analyze_document_image(self, image_base64: str = "") -> Dict:
         """Analyze a document image to determine its type and basic properties using Nova Lite"""
         try:
+            # Reuse the result of a completed step
+            if "analysis_result" in self.agent_memory:
+                return self.agent_memory["analysis_result"]
+
             # Get image from memory if not provided directly
             if not image_base64 and "document_image" in self.agent_memory:
                 image_base64 = self.agent_memory["document_image"]
+            image_s3_uri = self.agent_memory.get("document_s3_uri")
 
-            if not image_base64:
+            if not image_base64 and not image_s3_uri:
                 return {
                     "document_type": "unknown",
                     "image_quality": "unknown",
@@ -348,101 +1103,37 @@ class DocumentVerificationAgent:
                     "error": "No image provided"
                 }
 
-            # Prepare prompt for Nova Lite multimodal model
-            prompt = """
-            Analyze this document image and determine:
-            1. What type of document it is (e.g., passport, driver's license, ID card, birth certificate, etc.)
-            2. The quality of the image (high, medium, low)
-            3. Any noticeable features or characteristics of the document
-
-            Format your response as JSON with the following format:
-            {
-                "document_type": "document type",
-                "image_quality": "quality level",
-                "confidence": 0.0-1.0,
-                "details": {
-                    "dimensions": "dimensions if visible",
-                    "format": "color or grayscale",
-                    "other_details": "any other relevant details"
-                }
-            }
-            """
-
-            # Prepare request for Nova Lite
-            request_data = {
-                "prompt": prompt,
-                "temperature": 0.2,
-                "max_tokens": 500,
-                "image_base64": image_base64
-            }
+            # Prepare request for Nova Lite multimodal model
+            request_data = build_messages_request(
+                self.nova_model_id,
+                system=TOOL_SYSTEM_PROMPT,
+                instructions=ANALYZE_DOCUMENT_PROMPT,
+                image_base64=image_base64,
+                image_s3_uri=image_s3_uri,
+                inference_config={"temperature": 0.2, "max_new_tokens": 500},
+                output_tool=ANALYSIS_OUTPUT_TOOL
+            )
 
             # Invoke Nova Lite through Bedrock
-            response = await self.bedrock_client.invoke_model(
-                modelId=self.nova_model_id,
-                body=json.dumps(request_data)
-            )
-            response_body = json.loads(await response["body"].read())
+            response_body = await run_with_deadline(
+                invoke_model, self.bedrock_client, self.nova_model_id, request_data,
+                self.agent_memory.setdefault("model_usage", []))
 
-            # Extract response content - Nova Lite returns differently structured response
-            response_text = response_body.get("generation", "")
+            # Validate the structured output
+            analysis_result = parse_structured_output(response_body, DocumentAnalysis)
 
-            # Parse the JSON from Nova's response
-            try:
-                # Handle possible text before or after JSON
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = response_text[json_start:json_end]
-                    analysis_result = json.loads(json_content)
-                else:
-                    # If no JSON is found, create structured data from text analysis
-                    if "passport" in response_text.lower():
-                        document_type = "passport"
-                    elif "driver" in response_text.lower() and "license" in response_text.lower():
-                        document_type = "driver's license"
-                    elif "id" in response_text.lower() or "identification" in response_text.lower():
-                        document_type = "identification card"
-                    else:
-                        document_type = "unknown document"
-
-                    analysis_result = {
-                        "document_type": document_type,
-                        "image_quality": "medium",
-                        "confidence": 0.7,
-                        "details": {
-                            "dimensions": "unknown",
-                            "format": "color"
-                        }
-                    }
-
-                # Ensure required fields are present
-                if "document_type" not in analysis_result:
-                    analysis_result["document_type"] = "unknown"
-                if "image_quality" not in analysis_result:
-                    analysis_result["image_quality"] = "medium"
-                if "confidence" not in analysis_result:
-                    analysis_result["confidence"] = 0.7
-                if "details" not in analysis_result:
-                    analysis_result["details"] = {}
-
-                # Store document type in memory for future use
-                self.agent_memory["document_type"] = analysis_result["document_type"]
-
-                return analysis_result
-
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create a structured response
-                self.logger.warning("Failed to parse JSON from Nova's response")
-                return {
-                    "document_type": "unknown",
-                    "image_quality": "medium",
-                    "confidence": 0.5,
-                    "details": {
-                        "dimensions": "unknown",
-                        "format": "unknown"
-                    }
-                }
+            # Store document type and analysis in memory for future use
+            self.agent_memory["document_type"] = analysis_result["document_type"]
+            self.agent_memory["analysis_result"] = analysis_result
+            self._check_early_exit("analyze_document_image", analysis_result)
+
+            return analysis_result
 
+        except DeadlineExceeded:
+            raise
+        except RETRYABLE_ERRORS:
+            # Fails the job, so the queue retries it
+            raise
         except Exception as e:
             self.logger.error(f"Error analyzing document with Nova: {str(e)}", exc_info=True)
             return {
@@ -452,18 +1143,26 @@ class DocumentVerificationAgent:
                 "error": str(e)
             }
 
-    @tool
-    async def _verify_document_authenticity(self, image_base64: str, document_type: str) -> Dict:
+    async def _verify_document_authenticity(self, image_base64: str = "", document_type: str = "") -> Dict:
         """Verify if a document appears authentic using Amazon Nova Lite"""
         try:
+            # Skip the step once the verification has been decided
+            if "early_exit" in self.agent_memory:
+                return self._skipped_result()
+
+            # Reuse the result of a completed step
+            if "authentication_result" in self.agent_memory:
+                return self.agent_memory["authentication_result"]
+
             # Get image and document type from memory if not provided directly
             if not image_base64 and "document_image" in self.agent_memory:
                 image_base64 = self.agent_memory["document_image"]
+            image_s3_uri = self.agent_memory.get("document_s3_uri")
 
             if not document_type and "document_type" in self.agent_memory:
                 document_type = self.agent_memory["document_type"]
 
-            if not image_base64:
+            if not image_base64 and not image_s3_uri:
                 return {
                     "is_authentic": False,
                     "confidence": 0.0,
@@ -474,110 +1173,37 @@ class DocumentVerificationAgent:
             if not document_type:
                 document_type = "unknown document"
 
-            # Prepare prompt for Nova Lite
-            prompt = f"""
-            You are a document authentication expert. Examine this {document_type} image carefully for authenticity.
-
-            Look for security features that should be present in an authentic {document_type}, such as:
-            - Holograms
-            - Microprinting
-            - Watermarks
-            - Special inks or UV reactive elements
-            - Proper formatting and layout
-            - Official seals and signatures
-
-            Also check for signs of tampering such as:
-            - Uneven text
-            - Digital manipulation artifacts
-            - Inconsistent fonts
-            - Misaligned elements
-            - Unusual colors
-
-            Format your response as JSON with the following structure:
-            {{
-                "is_authentic": true or false,
-                "confidence": 0.0-1.0,
-                "security_features_detected": ["feature1", "feature2"...],
-                "potential_issues": ["issue1", "issue2"...]
-            }}
-            """
-
             # Prepare request for Nova Lite
-            request_data = {
-                "prompt": prompt,
-                "temperature": 0.2,
-                "max_tokens": 500,
-                "image_base64": image_base64
-            }
-
-            # Invoke Nova Lite through Bedrock
-            response = await self.bedrock_client.invoke_model(
-                modelId=self.nova_model_id,
-                body=json.dumps(request_data)
+            request_data = build_messages_request(
+                self.nova_model_id,
+                system=TOOL_SYSTEM_PROMPT,
+                instructions=VERIFY_AUTHENTICITY_PROMPT,
+                image_base64=image_base64,
+                image_s3_uri=image_s3_uri,
+                text=f"Document type: {document_type}",
+                inference_config={"temperature": 0.2, "max_new_tokens": 500},
+                output_tool=AUTHENTICITY_OUTPUT_TOOL
             )
-            response_body = json.loads(await response["body"].read())
 
-            # Extract response content
-            response_text = response_body.get("generation", "")
+            # Invoke Nova Lite through Bedrock
+            response_body = await run_with_deadline(
+                invoke_model, self.bedrock_client, self.nova_model_id, request_data,
+                self.agent_memory.setdefault("model_usage", []))
 
-            # Parse the JSON from Nova's response
-            try:
-                # Handle possible text before or after JSON
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = response_text[json_start:json_end]
-                    authentication_result = json.loads(json_content)
-                else:
-                    raise ValueError("Could not find valid JSON in response")
-
-                # Ensure required fields are present
-                if "is_authentic" not in authentication_result:
-                    authentication_result["is_authentic"] = True
-                if "confidence" not in authentication_result:
-                    authentication_result["confidence"] = 0.8
-                if "security_features_detected" not in authentication_result:
-                    authentication_result["security_features_detected"] = ["standard security features"]
-                if "potential_issues" not in authentication_result:
-                    authentication_result["potential_issues"] = []
-
-                # Store authentication result in memory
-                self.agent_memory["authentication_result"] = authentication_result
-
-                return authentication_result
-
-            except (json.JSONDecodeError, ValueError):
-                # If JSON parsing fails, attempt to determine authenticity from text response
-                is_authentic = "not authentic" not in response_text.lower() and "fake" not in response_text.lower()
-
-                # Extract potential security features mentioned
-                security_features = []
-                if "hologram" in response_text.lower():
-                    security_features.append("hologram")
-                if "microprint" in response_text.lower():
-                    security_features.append("microprinting")
-                if "watermark" in response_text.lower():
-                    security_features.append("watermark")
-
-                # Extract potential issues mentioned
-                potential_issues = []
-                if "tamper" in response_text.lower():
-                    potential_issues.append("signs of tampering")
-                if "inconsistent" in response_text.lower():
-                    potential_issues.append("inconsistent elements")
-
-                authentication_result = {
-                    "is_authentic": is_authentic,
-                    "confidence": 0.7,
-                    "security_features_detected": security_features if security_features else ["standard security features"],
-                    "potential_issues": potential_issues
-                }
+            # Validate the structured output
+            authentication_result = parse_structured_output(response_body, AuthenticityCheck)
 
-                # Store authentication result in memory
-                self.agent_memory["authentication_result"] = authentication_result
+            # Store authentication result in memory
+            self.agent_memory["authentication_result"] = authentication_result
+            self._check_early_exit("verify_document_authenticity", authentication_result)
 
-                return authentication_result
+            return authentication_result
 
+        except DeadlineExceeded:
+            raise
+        except RETRYABLE_ERRORS:
+            # Fails the job, so the queue retries it
+            raise
         except Exception as e:
             self.logger.error(f"Error verifying document authenticity: {str(e)}", exc_info=True)
             return {
@@ -587,18 +1213,26 @@ class DocumentVerificationAgent:
                 "potential_issues": [f"Error during verification: {str(e)}"]
             }
 
-    @tool
-    async def _extract_document_fields(self, image_base64: str, document_type: str) -> Dict:
+    async def _extract_document_fields(self, image_base64: str = "", document_type: str = "") -> Dict:
         """Extract fields from a document based on its type using Amazon Nova Lite"""
         try:
+            # Skip the step once the verification has been decided
+            if "early_exit" in self.agent_memory:
+                return self._skipped_result()
+
+            # Reuse the result of a completed step
+            if "extraction_result" in self.agent_memory:
+                return self.agent_memory["extraction_result"]
+
             # Get image and document type from memory if not provided directly
             if not image_base64 and "document_image" in self.agent_memory:
                 image_base64 = self.agent_memory["document_image"]
+            image_s3_uri = self.agent_memory.get("document_s3_uri")
 
             if not document_type and "document_type" in self.agent_memory:
                 document_type = self.agent_memory["document_type"]
 
-            if not image_base64:
+            if not image_base64 and not image_s3_uri:
                 return {
                     "fields": {},
                     "confidence": {},
@@ -609,114 +1243,48 @@ class DocumentVerificationAgent:
                 document_type = "unknown document"
 
             # Customize prompt based on document type
-            field_prompts = {
-                "passport": "Extract the following fields: full name, date of birth, passport number, expiry date, issuing country, nationality, gender",
-                "driver's license": "Extract the following fields: full name, date of birth, license number, expiry date, issuing authority/state, address, license classes",
-                "id card": "Extract the following fields: full name, date of birth, ID number, expiry date, issuing authority",
-                "birth certificate": "Extract the following fields: name, date of birth, place of birth, parents' names, certificate number"
-            }
+            extraction_prompt = FIELD_PROMPTS.get(document_type.lower(), DEFAULT_FIELD_PROMPT)
 
-            # Default prompt if document type doesn't match
-            extraction_prompt = field_prompts.get(
-                document_type.lower(), 
-                "Extract all key fields from this document including names, dates, identification numbers, and any other relevant information"
+            # Prepare request for Nova Lite
+            request_data = build_messages_request(
+                self.nova_model_id,
+                system=TOOL_SYSTEM_PROMPT,
+                instructions=EXTRACT_FIELDS_PROMPT,
+                image_base64=image_base64,
+                image_s3_uri=image_s3_uri,
+                text=extraction_prompt,
+                inference_config={"temperature": 0.2, "max_new_tokens": 1000},
+                output_tool=EXTRACTION_OUTPUT_TOOL
             )
 
-            # Prepare prompt for Nova Lite
-            prompt = f"""
-            {extraction_prompt}
-
-            Review the document image carefully and extract the requested information.
-
-            Format your response as JSON with the following structure:
-            {{
-                "fields": {{
-                    "field_name_1": "extracted value 1",
-                    "field_name_2": "extracted value 2",
-                    ...
-                }},
-                "confidence": {{
-                    "field_name_1": 0.XX,
-                    "field_name_2": 0.XX,
-                    ...
-                }}
-            }}
-
-            Use standardized field names like: name, date_of_birth, document_number, expiry_date, issuing_country, etc.
-            For each field, provide a confidence score between 0.0 and 1.0.
-            """
+            # Invoke Nova Lite through Bedrock
+            response_body = await run_with_deadline(
+                invoke_model, self.bedrock_client, self.nova_model_id, request_data,
+                self.agent_memory.setdefault("model_usage", []))
 
-            # Prepare request for Nova Lite
-            request_data = {
-                "prompt": prompt,
-                "temperature": 0.2,
-                "max_tokens": 1000,
-                "image_base64": image_base64
-            }
+            # Validate the structured output
+            extraction_result = parse_structured_output(response_body, FieldExtraction)
 
-            # Invoke Nova Lite through Bedrock
-            response = await self.bedrock_client.invoke_model(
-                modelId=self.nova_model_id,
-                body=json.dumps(request_data)
-            )
-            response_body = json.loads(await response["body"].read())
+            # Fields of an MRZ with valid check digits replace the model's reading
+            mrz = find_mrz(extraction_result["fields"])
+            if mrz:
+                extraction_result["mrz"] = mrz
+                if mrz["valid"]:
+                    mrz["mismatches"] = compare_mrz_fields(extraction_result["fields"], mrz)
+                    extraction_result["fields"].update(mrz_to_fields(mrz))
+                    self.agent_memory["mrz_result"] = mrz
 
-            # Extract response content
-            response_text = response_body.get("generation", "")
+            # Store extracted fields in memory for future use
+            self.agent_memory["extracted_fields"] = extraction_result["fields"]
+            self.agent_memory["extraction_result"] = extraction_result
 
-            # Parse the JSON from Nova's response
-            try:
-                # Handle possible text before or after JSON
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = response_text[json_start:json_end]
-                    extraction_result = json.loads(json_content)
-                else:
-                    # If no JSON structure, try to parse fields from text
-                    fields = {}
-                    confidences = {}
-
-                    # Simple parsing of key-value lines
-                    lines = response_text.split('\n')
-                    for line in lines:
-                        if ':' in line:
-                            parts = line.split(':', 1)
-                            key = parts[0].strip().lower().replace(' ', '_')
-                            value = parts[1].strip()
-                            if key and value:
-                                fields[key] = value
-                                confidences[key] = 0.7  # Default confidence
-
-                    extraction_result = {
-                        "fields": fields,
-                        "confidence": confidences
-                    }
-
-                # Ensure required fields are present
-                if "fields" not in extraction_result:
-                    extraction_result["fields"] = {}
-                if "confidence" not in extraction_result:
-                    extraction_result["confidence"] = {}
-                    # Add default confidences if missing
-                    for field in extraction_result["fields"]:
-                        if field not in extraction_result["confidence"]:
-                            extraction_result["confidence"][field] = 0.8
-
-                # Store extracted fields in memory for future use
-                self.agent_memory["extracted_fields"] = extraction_result["fields"]
-
-                return extraction_result
-
-            except json.JSONDecodeError:
-                # If JSON parsing fails completely, return empty with error indication
-                self.logger.warning("Failed to parse fields from Nova's response")
-                return {
-                    "fields": {},
-                    "confidence": {},
-                    "error": "Could not parse fields from response"
-                }
+            return extraction_result
 
+        except DeadlineExceeded:
+            raise
+        except RETRYABLE_ERRORS:
+            # Fails the job, so the queue retries it
+            raise
         except Exception as e:
             self.logger.error(f"Error extracting document fields: {str(e)}", exc_info=True)
             return {
@@ -725,10 +1293,13 @@ class DocumentVerificationAgent:
                 "error": str(e)
             }
 
-    @tool
     async def _check_document_consistency(self, fields: Dict) -> Dict:
         """Check if document fields are consistent with each other using Amazon Nova Lite"""
         try:
+            # Skip the step once the verification has been decided
+            if "early_exit" in self.agent_memory:
+                return self._skipped_result()
+
             # Get fields from memory if not provided directly
             if not fields and "extracted_fields" in self.agent_memory:
                 fields = self.agent_memory["extracted_fields"]
@@ -740,91 +1311,65 @@ class DocumentVerificationAgent:
                     "inconsistencies": ["No fields provided for consistency check"]
                 }
 
-            # Prepare fields for the prompt
-            fields_text = "\n".join([f"{key}: {value}" for key, value in fields.items()])
-
-            # Prepare prompt for Nova Lite
-            prompt = f"""
-            You are a document verification expert. Check the consistency of the following fields extracted from a document:
-
-            {fields_text}
+            # A validated MRZ is checked locally, differences with the visual zone are inconsistencies
+            mrz = self.agent_memory.get("mrz_result")
+            if mrz and mrz.get("valid"):
+                consistency_result = check_consistency(
+                    mrz_to_fields(mrz), mrz_document_type(mrz), mismatches=mrz.get("mismatches", []))
+                if consistency_result is not None:
+                    consistency_result["source"] = "mrz"
+                    self.agent_memory["consistency_result"] = consistency_result
+                    return consistency_result
+
+            # Deterministic rules first, the model is only asked when they are inconclusive
+            consistency_result = check_consistency(fields, self.agent_memory.get("document_type"))
+            if consistency_result is not None:
+                self.agent_memory["consistency_result"] = consistency_result
+                return consistency_result
 
-            Analyze these fields and check for:
-            1. Inconsistencies between fields (e.g., impossible dates, conflicting information)
-            2. Unusual or suspicious values
-            3. Missing critical information
+            # The model check is optional, it is skipped near the invocation timeout
+            if not has_time_for(STEP_BUDGET_SECONDS):
+                consistency_result = {
+                    "is_consistent": None,
+                    "confidence": 0.0,
+                    "inconsistencies": [],
+                    "skipped": True,
+                    "reason": "Not enough invocation time left for the model consistency check"
+                }
+                self.agent_memory["consistency_result"] = consistency_result
+                return consistency_result
 
-            Format your response as JSON with the following structure:
-            {{
-                "is_consistent": true or false,
-                "confidence": 0.0-1.0,
-                "inconsistencies": ["description of issue 1", "description of issue 2", ...]
-            }}
-            """
+            # Prepare fields for the prompt
+            fields_text = "\n".join([f"{key}: {value}" for key, value in fields.items()])
 
             # Prepare request for Nova Lite
-            request_data = {
-                "prompt": prompt,
-                "temperature": 0.2,
-                "max_tokens": 500
-            }
-
-            # Invoke Nova Lite through Bedrock
-            response = await self.bedrock_client.invoke_model(
-                modelId=self.nova_model_id,
-                body=json.dumps(request_data)
+            request_data = build_messages_request(
+                self.nova_model_id,
+                system=TOOL_SYSTEM_PROMPT,
+                instructions=CHECK_CONSISTENCY_PROMPT,
+                text=fields_text,
+                inference_config={"temperature": 0.2, "max_new_tokens": 500},
+                output_tool=CONSISTENCY_OUTPUT_TOOL
             )
-            response_body = json.loads(await response["body"].read())
-
-            # Extract response content
-            response_text = response_body.get("generation", "")
-
-            # Parse the JSON from Nova's response
-            try:
-                # Handle possible text before or after JSON
-                json_start = response_text.find("{")
-                json_end = response_text.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = response_text[json_start:json_end]
-                    consistency_result = json.loads(json_content)
-                else:
-                    # Default values based on text analysis
-                    is_consistent = "inconsistent" not in response_text.lower() and "issue" not in response_text.lower()
-
-                    consistency_result = {
-                        "is_consistent": is_consistent,
-                        "confidence": 0.7,
-                        "inconsistencies": []
-                    }
-
-                # Ensure required fields are present
-                if "is_consistent" not in consistency_result:
-                    consistency_result["is_consistent"] = True
-                if "confidence" not in consistency_result:
-                    consistency_result["confidence"] = 0.8
-                if "inconsistencies" not in consistency_result:
-                    consistency_result["inconsistencies"] = []
-
-                # Store consistency result in memory
-                self.agent_memory["consistency_result"] = consistency_result
 
-                return consistency_result
+            # Invoke Nova Lite through Bedrock
+            response_body = await run_with_deadline(
+                invoke_model, self.bedrock_client, self.nova_model_id, request_data,
+                self.agent_memory.setdefault("model_usage", []))
 
-            except json.JSONDecodeError:
-                # If JSON parsing fails, determine consistency from response text
-                is_consistent = "inconsistent" not in response_text.lower() and "issue" not in response_text.lower()
+            # Validate the structured output
+            consistency_result = parse_structured_output(response_body, ConsistencyCheck)
 
-                consistency_result = {
-                    "is_consistent": is_consistent,
-                    "confidence": 0.6,
-                    "inconsistencies": ["Could not properly analyze consistency"]
-                }
+            # Store consistency result in memory
+            self.agent_memory["consistency_result"] = consistency_result
 
-                # Store consistency result in memory
-                self.agent_memory["consistency_result"] = consistency_result
-
-                return consistency_result
+            return consistency_result
 
+        except DeadlineExceeded:
+            raise
+        except RETRYABLE_ERRORS:
+            # Fails the job, so the queue retries it
+            raise
         except Exception as e:
             self.logger.error(f"Error checking document consistency: {str(e)}", exc_info=True)
             return {
@@ -3,24 +3,26 @@
 
 # lib/dynamodb.py
 import boto3
+import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 from decimal import Decimal
 import os
-from dotenv import load_dotenv
 import logging
 from .s3 import S3Service
 from botocore.exceptions import ClientError
 import uuid
-from .models import Configuration
-from functools import lru_cache
+from .utils import load_local_env
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_local_env()
+
+# Configuration groups read at runtime by the analyzer and the agent
+CONFIG_SNAPSHOT_IDS = ('MODEL_IDS', 'INFERENCE_PARAMS', 'CASCADE_PARAMS', 'AGENT_PARAMS', 'EARLY_EXIT_PARAMS')
 
 class DynamoDBService:
     def __init__(self):
@@ -228,10 +230,71 @@ class DynamoDBService:
                 }
             ]
 
+            # Model cascade configurations
+            cascade_configs = [
+                {
+                    'pk': 'CASCADE_PARAMS',
+                    'sk': 'enabled',
+                    'value': 'false',
+                    'description': 'Escalate uncertain results to larger models'
+                },
+                {
+                    'pk': 'CASCADE_PARAMS',
+                    'sk': 'tiers',
+                    'value': 'LITE,PRO',
+                    'description': 'Model tiers in escalation order'
+                },
+                {
+                    'pk': 'CASCADE_PARAMS',
+                    'sk': 'lower_bound',
+                    'value': '0.4',
+                    'description': 'Lower bound of the uncertainty band'
+                },
+                {
+                    'pk': 'CASCADE_PARAMS',
+                    'sk': 'upper_bound',
+                    'value': '0.8',
+                    'description': 'Upper bound of the uncertainty band'
+                }
+            ]
+
+            # Strands agent configurations
+            agent_configs = [
+                {
+                    'pk': 'AGENT_PARAMS',
+                    'sk': 'pipeline_mode',
+                    'value': 'agent',
+                    'description': 'Verification mode: agent (LLM planned) or pipeline (fixed DAG)'
+                }
+            ]
+
+            # Strands agent early exit policy
+            early_exit_configs = [
+                {
+                    'pk': 'EARLY_EXIT_PARAMS',
+                    'sk': 'enabled',
+                    'value': 'false',
+                    'description': 'End verifications early on decisive tool results'
+                },
+                {
+                    'pk': 'EARLY_EXIT_PARAMS',
+                    'sk': 'unauthentic_confidence',
+                    'value': '0.9',
+                    'description': 'Minimum confidence of a not authentic result to reject the document'
+                },
+                {
+                    'pk': 'EARLY_EXIT_PARAMS',
+                    'sk': 'rejected_image_quality',
+                    'value': 'low',
+                    'description': 'Image quality levels that reject the document'
+                }
+            ]
+
             # Write all configurations to the table using batch writer
             current_time = datetime.now(timezone.utc).isoformat()
             with self.configs_table.batch_writer() as batch:
-                for config in model_configs + inference_configs:
+                for config in (model_configs + inference_configs + cascade_configs + agent_configs
+                               + early_exit_configs):
                     config['created_at'] = current_time
                     config['updated_at'] = current_time
                     batch.put_item(Item=config)
@@ -241,40 +304,51 @@ class DynamoDBService:
             logger.error(f"Error initializing default configurations: {repr(e)}")
             raise
 
-    async def save_verification(self, verification_data: Dict) -> Dict:
-        """Save a verification record with optimized handling"""
-        try:
-            aware_datetime = datetime.now(timezone.utc)
-            timestamp = aware_datetime.isoformat()
+    def _build_verification_item(self, verification_data: Dict) -> Dict:
+        """Build and validate a verification item for DynamoDB"""
+        aware_datetime = datetime.now(timezone.utc)
+        timestamp = aware_datetime.isoformat()
 
-            # Convert confidence to Decimal for DynamoDB
-            confidence = Decimal(str(verification_data.get('confidence', 0)))
+        # Convert confidence to Decimal for DynamoDB
+        confidence = Decimal(str(verification_data.get('confidence', 0)))
 
-            # Create item for DynamoDB
-            item = {
-                'pk': verification_data.get('pk'),
-                'timestamp': timestamp,
-                'document_type': verification_data.get('document_type'),
-                'confidence': confidence,
-                'content_text': verification_data.get('content_text'),
-                'file_key': verification_data.get('file_key')
-            }
+        # Create item for DynamoDB
+        item = {
+            'pk': verification_data.get('pk'),
+            'timestamp': timestamp,
+            'document_type': verification_data.get('document_type'),
+            'confidence': confidence,
+            'content_text': verification_data.get('content_text'),
+            'file_key': verification_data.get('file_key')
+        }
+
+        # Validate required fields
+        missing_fields = [key for key, value in item.items() if value is None]
+        if missing_fields:
+            raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
 
-            # Validate required fields
-            missing_fields = [key for key, value in item.items() if value is None]
-            if missing_fields:
-                raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+        # Add optional fields
+        for key in ('model_tier', 'model_id', 'prompt_id', 'prompt_version', 'model_usage', 'usage_summary'):
+            if verification_data.get(key) is not None:
+                item[key] = verification_data[key]
+
+        return item
+
+    async def save_verification(self, verification_data: Dict) -> Dict:
+        """Save a verification record with optimized handling"""
+        try:
+            item = self._build_verification_item(verification_data)
 
             # Save to DynamoDB
-            self.verifications_table.put_item(Item=item)
+            await asyncio.to_thread(self.verifications_table.put_item, Item=item)
 
             # Process item for response
             response_item = item.copy()
-            response_item['confidence'] = float(response_item['confidence'])
 
             # Generate a fresh presigned URL if file exists
             if response_item.get('file_key'):
-                response_item['preview_url'] = self.s3_service.get_presigned_url(response_item['file_key'])
+                response_item['preview_url'] = await asyncio.to_thread(
+                    self.s3_service.get_presigned_url, response_item['file_key'])
 
             logger.info(f"Successfully saved verification: {response_item['pk']}")
             return response_item
@@ -283,6 +357,33 @@ class DynamoDBService:
             logger.error(f"Error saving verification: {repr(e)}")
             raise
 
+    async def save_verifications(self, verifications: List[Dict]) -> List[Dict]:
+        """
+        Save verification records that don't exist yet
+
+        Each put is conditional on the pk being new, so saving records with
+        deterministic pks again is a no-op. Returns only the saved items.
+        """
+        try:
+            saved = []
+            for item in (self._build_verification_item(data) for data in verifications):
+                try:
+                    await asyncio.to_thread(self.verifications_table.put_item,
+                        Item=item,
+                        ConditionExpression='attribute_not_exists(pk)'
+                    )
+                    saved.append(item)
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+
+            logger.info(f"Successfully saved {len(saved)} of {len(verifications)} verifications")
+            return saved
+
+        except Exception as e:
+            logger.error(f"Error saving verifications: {repr(e)}")
+            raise
+
     async def get_verifications(self) -> List[Dict]:
         """Get all verifications with pagination support"""
         try:
@@ -295,7 +396,7 @@ class DynamoDBService:
                 if last_evaluated_key:
                     scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
-                response = self.verifications_table.scan(**scan_kwargs)
+                response = await asyncio.to_thread(self.verifications_table.scan, **scan_kwargs)
                 items.extend(response.get('Items', []))
 
                 last_evaluated_key = response.get('LastEvaluatedKey')
@@ -308,17 +409,17 @@ class DynamoDBService:
                     'pk': item.get('pk'),
                     'timestamp': item.get('timestamp'),
                     'document_type': item.get('document_type'),
-                    'confidence': float(item.get('confidence', 0)),
+                    'confidence': item.get('confidence', 0),
                     'content_text': item.get('content_text', ''),
                     'file_key': item.get('file_key'),
+                    'model_tier': item.get('model_tier'),
                     'preview_url': None
                 }
 
                 if processed_item['file_key']:
                     try:
-                        processed_item['preview_url'] = self.s3_service.get_presigned_url(
-                            processed_item['file_key']
-                        )
+                        processed_item['preview_url'] = await asyncio.to_thread(
+                            self.s3_service.get_presigned_url, processed_item['file_key'])
                     except Exception as e:
                         logger.error(f"Error generating preview URL: {repr(e)}")
 
@@ -335,7 +436,7 @@ class DynamoDBService:
         """Get a specific verification by ID"""
         try:
             logger.info(f"Getting verification with id: {verification_id}")
-            response = self.verifications_table.get_item(
+            response = await asyncio.to_thread(self.verifications_table.get_item,
                 Key={'pk': verification_id}
             )
 
@@ -357,7 +458,7 @@ class DynamoDBService:
                 prompt['is_active'] = False
                 prompt['updated_at'] = datetime.now(timezone.utc).isoformat()
                 # Direct put_item without conditional expression
-                self.prompts_table.put_item(Item=prompt)
+                await asyncio.to_thread(self.prompts_table.put_item, Item=prompt)
                 logger.info(f"Successfully deactivated prompt {prompt_id}")
         except Exception as e:
             logger.error(f"Error deactivating prompt: {repr(e)}")
@@ -366,7 +467,7 @@ class DynamoDBService:
     async def _deactivate_other_prompts(self, current_prompt_id: Optional[str] = None):
         """Helper method to deactivate all prompts except the current one"""
         try:
-            response = self.prompts_table.scan(
+            response = await asyncio.to_thread(self.prompts_table.scan,
                 FilterExpression='is_active = :true',
                 ExpressionAttributeValues={':true': True}
             )
@@ -392,7 +493,7 @@ class DynamoDBService:
                 if last_evaluated_key:
                     scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
-                response = self.prompts_table.scan(**scan_kwargs)
+                response = await asyncio.to_thread(self.prompts_table.scan, **scan_kwargs)
                 items.extend(response.get('Items', []))
 
                 last_evaluated_key = response.get('LastEvaluatedKey')
@@ -409,7 +510,7 @@ class DynamoDBService:
         """Get a specific prompt by ID"""
         try:
             logger.info(f"Getting prompt with id: {prompt_id}")
-            response = self.prompts_table.get_item(
+            response = await asyncio.to_thread(self.prompts_table.get_item,
                 Key={'pk': prompt_id}
             )
 
@@ -441,7 +542,7 @@ class DynamoDBService:
                 await self._deactivate_other_prompts(item['pk'])
 
             logger.info(f"Saving new prompt with id: {item['pk']}")
-            self.prompts_table.put_item(
+            await asyncio.to_thread(self.prompts_table.put_item,
                 Item=item,
                 ConditionExpression='attribute_not_exists(pk)'
             )
@@ -469,7 +570,7 @@ class DynamoDBService:
             }
 
             logger.info(f"Updating prompt without locking, id: {item['pk']}")
-            self.prompts_table.put_item(Item=item)
+            await asyncio.to_thread(self.prompts_table.put_item, Item=item)
             return item
         except Exception as e:
             logger.error(f"Error updating prompt without locking: {repr(e)}")
@@ -479,7 +580,7 @@ class DynamoDBService:
         """Delete a prompt with validation"""
         try:
             logger.info(f"Deleting prompt with id: {repr(prompt_id)}")
-            self.prompts_table.delete_item(
+            await asyncio.to_thread(self.prompts_table.delete_item,
                 Key={'pk': prompt_id},
                 ConditionExpression='attribute_exists(pk)'
             )
@@ -506,7 +607,7 @@ class DynamoDBService:
             return self._active_prompt_cache
             
         try:
-            response = self.prompts_table.scan(
+            response = await asyncio.to_thread(self.prompts_table.scan,
                 FilterExpression='is_active = :true',
                 ExpressionAttributeValues={':true': True}
             )
@@ -533,7 +634,7 @@ class DynamoDBService:
     async def get_configurations(self, config_id: str):
         """Get all configurations for a specific ID with error handling"""
         try:
-            response = self.configs_table.query(
+            response = await asyncio.to_thread(self.configs_table.query,
                 KeyConditionExpression='pk = :pk',
                 ExpressionAttributeValues={':pk': config_id}
             )
@@ -542,6 +643,31 @@ class DynamoDBService:
             logger.error(f"Error getting configurations: {repr(e)}")
             raise
 
+    # Cache for configuration groups read at runtime, by config_id
+    _configurations_cache = None
+
+    async def get_cached_configurations(self, config_id: str):
+        """Get all configurations for a specific ID with caching"""
+        # Simple time-based cache (30 seconds), like the active prompt and model
+        current_time = datetime.now(timezone.utc)
+        if self._configurations_cache is None:
+            self._configurations_cache = {}
+
+        cached = self._configurations_cache.get(config_id)
+        if cached is not None and (current_time - cached[0]).total_seconds() < 30:
+            return cached[1]
+
+        items = await self.get_configurations(config_id)
+        self._configurations_cache[config_id] = (current_time, items)
+        return items
+
+    async def get_config_snapshot(self, config_ids=CONFIG_SNAPSHOT_IDS) -> Dict[str, List[Dict]]:
+        """Get the cached configurations of several IDs at once"""
+        return {
+            config_id: await self.get_cached_configurations(config_id)
+            for config_id in config_ids
+        }
+
     async def update_configuration(self, config):
         """Update a configuration value with optimistic locking"""
         try:
@@ -560,7 +686,7 @@ class DynamoDBService:
                 'updated_at = :old_timestamp'
             )
 
-            self.configs_table.put_item(
+            await asyncio.to_thread(self.configs_table.put_item,
                 Item=config_dict,
                 ConditionExpression=condition_expression,
                 ExpressionAttributeValues={
@@ -589,7 +715,7 @@ class DynamoDBService:
             current_time = datetime.now(timezone.utc).isoformat()
             config_dict['updated_at'] = current_time
 
-            self.configs_table.put_item(Item=config_dict)
+            await asyncio.to_thread(self.configs_table.put_item, Item=config_dict)
             return config_dict
         except Exception as e:
             logger.error(f"Error updating configuration without locking: {repr(e)}")
@@ -609,7 +735,7 @@ class DynamoDBService:
                 config_dict['created_at'] = current_time
             config_dict['updated_at'] = current_time
 
-            self.configs_table.put_item(Item=config_dict)
+            await asyncio.to_thread(self.configs_table.put_item, Item=config_dict)
             return config_dict
         except Exception as e:
             logger.error(f"Error saving configuration: {repr(e)}")
@@ -629,7 +755,7 @@ class DynamoDBService:
             return self._active_model_config_cache
             
         try:
-            response = self.configs_table.query(
+            response = await asyncio.to_thread(self.configs_table.query,
                 KeyConditionExpression='pk = :pk',
                 FilterExpression='is_active = :true',
                 ExpressionAttributeValues={
@@ -641,7 +767,7 @@ class DynamoDBService:
             items = response.get('Items', [])
             if not items:
                 # If no active model, return the LITE model as default
-                response = self.configs_table.query(
+                response = await asyncio.to_thread(self.configs_table.query,
                     KeyConditionExpression='pk = :pk AND #sk = :sk',
                     ExpressionAttributeNames={'#sk': 'sk'},
                     ExpressionAttributeValues={
@@ -664,9 +790,84 @@ class DynamoDBService:
             logger.error(f"Error getting active model config: {repr(e)}")
             raise
 
+    async def record_model_usage(self, usage_log: List[Dict], prompt_id: Optional[str] = None,
+                                 prompt_version: Optional[str] = None):
+        """Roll up model usage records per model and per prompt version"""
+        try:
+            # Sum records in memory first so each aggregate is written once
+            totals = {}
+            for record in usage_log:
+                sort_keys = [f"MODEL#{record['model_id']}"]
+                if prompt_id:
+                    # Prompts are updated in place, the version keeps their edits apart
+                    sort_keys.append(f"PROMPT#{prompt_id}#{prompt_version}" if prompt_version
+                                     else f"PROMPT#{prompt_id}")
+
+                for sort_key in sort_keys:
+                    total = totals.setdefault(sort_key, {
+                        ':one': 0, ':input': 0, ':output': 0, ':cache_read': 0, ':cache_write': 0,
+                        ':latency': 0, ':latency_samples': 0
+                    })
+                    total[':one'] += 1
+                    total[':input'] += record.get('input_tokens', 0)
+                    total[':output'] += record.get('output_tokens', 0)
+                    total[':cache_read'] += record.get('cache_read_input_tokens', 0)
+                    total[':cache_write'] += record.get('cache_write_input_tokens', 0)
+                    # Batch inference doesn't measure latency, keep it out of the average
+                    if record.get('latency_ms') is not None:
+                        total[':latency'] += record['latency_ms']
+                        total[':latency_samples'] += 1
+
+            current_time = datetime.now(timezone.utc).isoformat()
+            for sort_key, total in totals.items():
+                await asyncio.to_thread(self.configs_table.update_item,
+                    Key={'pk': 'USAGE_STATS', 'sk': sort_key},
+                    UpdateExpression=(
+                        'ADD invocations :one, input_tokens :input, output_tokens :output, '
+                        'cache_read_input_tokens :cache_read, cache_write_input_tokens :cache_write, '
+                        'latency_ms :latency, latency_samples :latency_samples '
+                        'SET updated_at = :now'
+                    ),
+                    ExpressionAttributeValues={**total, ':now': current_time}
+                )
+        except Exception as e:
+            logger.error(f"Error recording model usage: {repr(e)}")
+            raise
+
+    async def get_usage_stats(self) -> List[Dict]:
+        """Get model usage aggregates per model and per prompt version"""
+        items = await self.get_configurations('USAGE_STATS')
+        for item in items:
+            # Prompt aggregates written before versions were recorded have none
+            kind, _, key = item['sk'].partition('#')
+            if kind == 'MODEL':
+                item['model_id'] = key
+            elif kind == 'PROMPT':
+                item['prompt_id'], _, version = key.partition('#')
+                item['prompt_version'] = version or None
+            # Aggregates written before latency samples were counted have one per invocation
+            latency_samples = int(item.get('latency_samples', item.get('invocations', 0)))
+            for key in ('invocations', 'input_tokens', 'output_tokens', 'cache_read_input_tokens',
+                        'cache_write_input_tokens', 'latency_ms', 'latency_samples'):
+                item[key] = int(item.get(key, 0))
+            item['latency_samples'] = latency_samples
+            item['avg_latency_ms'] = item['latency_ms'] / latency_samples if latency_samples else 0
+        return items
+
+    async def get_model_tiers(self, tiers: List[str]) -> List[Dict]:
+        """Get model configurations for the given tiers in the requested order"""
+        try:
+            configs = await self.get_configurations('MODEL_IDS')
+            configs_by_tier = {config['sk']: config for config in configs}
+            return [configs_by_tier[tier] for tier in tiers if tier in configs_by_tier]
+        except Exception as e:
+            logger.error(f"Error getting model tiers: {repr(e)}")
+            raise
+
     def clear_caches(self):
         """Clear all cached data"""
         self._active_prompt_cache = None
         self._active_prompt_timestamp = None
         self._active_model_config_cache = None
         self._active_model_config_timestamp = None
+        self._configurations_cache = None
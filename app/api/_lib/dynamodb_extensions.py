@@ -3,8 +3,11 @@
 """DynamoDB extensions for Strands Agent"""
 
 import boto3
+import asyncio
 import os
+import json
 import logging
+from decimal import Decimal
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 from botocore.exceptions import ClientError
@@ -13,6 +16,12 @@ from botocore.exceptions import ClientError
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _json_default(value):
+    """Serialize values read back from DynamoDB"""
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
 class AgentDynamoDBService:
     """DynamoDB service extensions for Strands Agent"""
 
@@ -57,6 +66,10 @@ class AgentDynamoDBService:
                 logger.error(f"Error checking/creating agent verifications table: {repr(e)}")
                 raise
 
+    def _to_item(self, verification: Dict) -> Dict:
+        """Convert floats in tool results to Decimal, DynamoDB rejects float values"""
+        return json.loads(json.dumps(verification, default=_json_default), parse_float=Decimal)
+
     async def save_agent_verification(self, verification: Dict) -> Dict:
         """Save a new agent verification"""
         try:
@@ -65,7 +78,7 @@ class AgentDynamoDBService:
                 verification['created_at'] = current_time
             verification['updated_at'] = current_time
 
-            self.agent_verifications_table.put_item(Item=verification)
+            await asyncio.to_thread(self.agent_verifications_table.put_item, Item=self._to_item(verification))
             return verification
         except Exception as e:
             logger.error(f"Error saving agent verification: {repr(e)}")
@@ -75,7 +88,7 @@ class AgentDynamoDBService:
         """Update an existing agent verification"""
         try:
             verification['updated_at'] = datetime.now(timezone.utc).isoformat()
-            self.agent_verifications_table.put_item(Item=verification)
+            await asyncio.to_thread(self.agent_verifications_table.put_item, Item=self._to_item(verification))
             return verification
         except Exception as e:
             logger.error(f"Error updating agent verification: {repr(e)}")
@@ -85,7 +98,7 @@ class AgentDynamoDBService:
         """Get a specific agent verification by ID"""
         try:
             logger.info(f"Getting agent verification with id: {verification_id}")
-            response = self.agent_verifications_table.get_item(
+            response = await asyncio.to_thread(self.agent_verifications_table.get_item,
                 Key={'pk': verification_id}  # Use pk instead of verification_id
             )
 
@@ -99,6 +112,19 @@ class AgentDynamoDBService:
             logger.error(f"Error getting agent verification: {repr(e)}")
             raise
 
+    async def get_agent_verification_state(self, verification_id: str) -> Optional[Dict]:
+        """Get only the status and update time of an agent verification"""
+        try:
+            response = await asyncio.to_thread(self.agent_verifications_table.get_item,
+                Key={'pk': verification_id},
+                ProjectionExpression='#status, updated_at',
+                ExpressionAttributeNames={'#status': 'status'}
+            )
+            return response.get('Item')
+        except Exception as e:
+            logger.error(f"Error getting agent verification state: {repr(e)}")
+            raise
+
     async def get_agent_verifications(self) -> List[Dict]:
         """Get all agent verifications"""
         try:
@@ -111,7 +137,7 @@ class AgentDynamoDBService:
                 if last_evaluated_key:
                     scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
-                response = self.agent_verifications_table.scan(**scan_kwargs)
+                response = await asyncio.to_thread(self.agent_verifications_table.scan, **scan_kwargs)
                 items.extend(response.get('Items', []))
 
                 last_evaluated_key = response.get('LastEvaluatedKey')
@@ -133,6 +159,7 @@ def extend_dynamodb_service(db_service):
     db_service.save_agent_verification = agent_db_service.save_agent_verification
     db_service.update_agent_verification = agent_db_service.update_agent_verification
     db_service.get_agent_verification = agent_db_service.get_agent_verification
+    db_service.get_agent_verification_state = agent_db_service.get_agent_verification_state
     db_service.get_agent_verifications = agent_db_service.get_agent_verifications
 
     return db_service
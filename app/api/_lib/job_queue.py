@@ -0,0 +1,125 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Job queues for durable agent verifications"""
+
+# lib/job_queue.py
+import os
+import boto3
+import json
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Times a job is received before SQS moves it to the dead-letter queue, the
+# queue's maxReceiveCount
+MAX_RECEIVES = int(os.getenv('FDP_JOB_MAX_RECEIVES', '3'))
+
+# Transient errors a job is received again for: throttling, timeouts and
+# connection errors of AWS calls
+RETRYABLE_ERRORS = (ClientError, BotoCoreError, TimeoutError, ConnectionError)
+
+class SQSJobQueue:
+    """Send verification jobs to an Amazon SQS queue"""
+
+    def __init__(self, queue_url: str):
+        if not queue_url:
+            raise ValueError("Queue URL is not set")
+
+        self.queue_url = queue_url
+        self.sqs = boto3.client('sqs',
+            config=Config(
+                retries = dict(
+                    max_attempts = 3
+                )
+            )
+        )
+
+    def send_job(self, job: Dict, delay_seconds: int = 0) -> str:
+        """Send a job, received after delay_seconds, and return its message ID"""
+        response = self.sqs.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps(job),
+            DelaySeconds=delay_seconds
+        )
+        logger.info(f"Queued {job.get('action')} job for verification: {job.get('verification_id')}")
+        return response['MessageId']
+
+class InMemoryJobQueue:
+    """In-memory stand-in for SQS, records are shaped like an SQS event"""
+
+    def __init__(self):
+        self.messages = deque()
+
+    def send_job(self, job: Dict, delay_seconds: int = 0) -> str:
+        """Append a job and return its message ID, delays are not simulated"""
+        message_id = str(uuid.uuid4())
+        self.messages.append({
+            'messageId': message_id,
+            'eventSource': 'aws:sqs',
+            'body': json.dumps(job)
+        })
+        return message_id
+
+    def receive(self, max_messages: int = 10) -> List[Dict]:
+        """Remove and return up to max_messages records"""
+        records = []
+        while self.messages and len(records) < max_messages:
+            records.append(self.messages.popleft())
+        return records
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+def is_queue_event(event: Dict) -> bool:
+    """Check if a Lambda event was delivered by the SQS event source mapping"""
+    records = event.get('Records') if isinstance(event, dict) else None
+    return bool(records) and records[0].get('eventSource') == 'aws:sqs'
+
+def is_retryable(error: BaseException) -> bool:
+    """Check if a job that failed with this error is worth receiving again"""
+    return isinstance(error, RETRYABLE_ERRORS)
+
+def is_final_attempt(job: Dict) -> bool:
+    """Check if a job is not received again after it fails, jobs run in process are never retried"""
+    receive_count = job.get('receive_count')
+    return receive_count is None or receive_count >= MAX_RECEIVES
+
+async def process_records(records: List[Dict], process_job: Callable[[Dict], Awaitable[None]],
+                          parallelism: int = 4) -> Dict:
+    """
+    Process queue records concurrently and report partial batch failures
+
+    Each job gets the receive count of its record, so it can tell whether a
+    failure is retried by SQS or is final.
+
+    Returns:
+        Dict: batchItemFailures response, failed messages are retried by SQS
+    """
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def process_record(record):
+        async with semaphore:
+            try:
+                job = json.loads(record['body'])
+                job['receive_count'] = int((record.get('attributes') or {}).get('ApproximateReceiveCount', 1))
+                await process_job(job)
+                return None
+            except Exception as e: # pylint: disable=broad-except
+                logger.error(f"Error processing message {record.get('messageId')}: {str(e)}", exc_info=True)
+                return record.get('messageId')
+
+    failed_ids = await asyncio.gather(*(process_record(record) for record in records))
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': message_id}
+            for message_id in failed_ids if message_id
+        ]
+    }
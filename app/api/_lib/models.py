@@ -11,6 +11,11 @@ class DocumentAnalysisRequest(BaseModel):
     image_base64: str
     model_type: str = 'LITE'
 
+class BatchAnalysisRequest(BaseModel):
+    """Request model for analyzing several documents at once"""
+    documents: List[DocumentAnalysisRequest] = Field(..., min_length=1, description="Documents to analyze")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Documents analyzed at once (capped)")
+
 class DocumentAnalysisResponse(BaseModel):
     pk: str
     timestamp: str
@@ -18,6 +23,7 @@ class DocumentAnalysisResponse(BaseModel):
     confidence: float
     content_text: str
     file_key: Optional[str] = None
+    model_tier: Optional[str] = None
     preview_url: Optional[str] = None
 
     class Config:
@@ -50,6 +56,7 @@ class VerificationStatus(str, Enum):
     IN_PROGRESS = "in_progress"
     NEEDS_INFO = "needs_info"
     COMPLETED = "completed"
+    REJECTED = "rejected"
     FAILED = "failed"
 
 class AgentRequest(BaseModel):
@@ -81,3 +88,29 @@ class VerificationResult(BaseModel):
     preview_url: Optional[str] = None
     created_at: str
     updated_at: str
+
+# Structured outputs of the Strands tools
+class DocumentAnalysis(BaseModel):
+    """Output of the document image analysis"""
+    document_type: str = Field(..., description="Type of document, e.g. passport, driver's license, id card")
+    image_quality: str = Field(..., description="Quality of the image: high, medium or low")
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    details: Dict[str, Any] = Field(default_factory=dict, description="Dimensions, color format and other details")
+
+class AuthenticityCheck(BaseModel):
+    """Output of the document authenticity check"""
+    is_authentic: bool
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    security_features_detected: List[str] = Field(default_factory=list)
+    potential_issues: List[str] = Field(default_factory=list)
+
+class FieldExtraction(BaseModel):
+    """Output of the document field extraction"""
+    fields: Dict[str, Any] = Field(..., description="Extracted values by standardized field name")
+    confidence: Dict[str, float] = Field(default_factory=dict, description="Confidence by field name, 0.0-1.0")
+
+class ConsistencyCheck(BaseModel):
+    """Output of the extracted fields consistency check"""
+    is_consistent: bool
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    inconsistencies: List[str] = Field(default_factory=list)
@@ -0,0 +1,200 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Machine readable zone (ICAO 9303) parser and check digit validator"""
+
+# lib/mrz.py
+import re
+from datetime import date
+from typing import Dict, List, Optional
+from .consistency_rules import get_field, parse_date
+
+# Line length and line count of each MRZ format
+MRZ_FORMATS = {
+    'TD1': (30, 3),
+    'TD2': (36, 2),
+    'TD3': (44, 2)
+}
+
+CHECK_DIGIT_WEIGHTS = (7, 3, 1)
+
+MRZ_LINE_PATTERN = re.compile(r'^[A-Z0-9<]+$')
+
+def check_digit(value: str) -> str:
+    """Compute the ICAO 9303 check digit of an MRZ field"""
+    total = 0
+    for index, char in enumerate(value):
+        if char.isdigit():
+            number = int(char)
+        elif char.isalpha():
+            number = ord(char) - ord('A') + 10
+        else:
+            number = 0
+        total += number * CHECK_DIGIT_WEIGHTS[index % 3]
+    return str(total % 10)
+
+def find_mrz_lines(text: str) -> Optional[List[str]]:
+    """Find the lines of a TD1, TD2 or TD3 machine readable zone in text"""
+    lines = []
+    for line in str(text).upper().replace('«', '<').splitlines():
+        line = re.sub(r'\s+', '', line)
+        if line and MRZ_LINE_PATTERN.match(line):
+            lines.append(line)
+
+    for line_length, line_count in MRZ_FORMATS.values():
+        for start in range(len(lines) - line_count + 1):
+            candidate = lines[start:start + line_count]
+            if all(len(line) == line_length for line in candidate):
+                return candidate
+    return None
+
+def _parse_date(value: str, is_expiry: bool, today: date) -> Optional[str]:
+    """Convert a YYMMDD date to ISO format, birth dates are never in the future"""
+    if not value.isdigit():
+        return None
+    year, month, day = int(value[0:2]), int(value[2:4]), int(value[4:6])
+    century = 2000 if is_expiry or year <= today.year % 100 else 1900
+    try:
+        return date(century + year, month, day).isoformat()
+    except ValueError:
+        return None
+
+def _parse_names(value: str) -> Dict:
+    surname, _, given_names = value.partition('<<')
+    return {
+        'surname': surname.replace('<', ' ').strip(),
+        'given_names': given_names.replace('<', ' ').strip()
+    }
+
+def _clean(value: str) -> str:
+    return value.replace('<', ' ').strip()
+
+def parse_mrz(text: str, today: Optional[date] = None) -> Optional[Dict]:
+    """
+    Parse a machine readable zone and validate its check digits
+
+    Returns:
+        Dict: MRZ fields with ISO dates and per field check digit results,
+        ``valid`` is True when every check digit and date is correct.
+        None when the text has no MRZ.
+    """
+    lines = find_mrz_lines(text)
+    if not lines:
+        return None
+
+    today = today or date.today()
+    line_length = len(lines[0])
+
+    if line_length == 30:
+        mrz_format = 'TD1'
+        first, second, third = lines
+        fields = {
+            'document_code': first[0:2],
+            'issuing_country': first[2:5],
+            'document_number': first[5:14],
+            'birth_date': second[0:6],
+            'sex': second[7],
+            'expiry_date': second[8:14],
+            'nationality': second[15:18],
+            'optional_data': first[15:30] + second[18:29],
+            **_parse_names(third)
+        }
+        check_digits = {
+            'document_number': (first[5:14], first[14]),
+            'date_of_birth': (second[0:6], second[6]),
+            'expiry_date': (second[8:14], second[14]),
+            'composite': (first[5:30] + second[0:7] + second[8:15] + second[18:29], second[29])
+        }
+    else:
+        mrz_format = 'TD2' if line_length == 36 else 'TD3'
+        first, second = lines
+        optional_end = 35 if mrz_format == 'TD2' else 42
+        fields = {
+            'document_code': first[0:2],
+            'issuing_country': first[2:5],
+            'document_number': second[0:9],
+            'nationality': second[10:13],
+            'birth_date': second[13:19],
+            'sex': second[20],
+            'expiry_date': second[21:27],
+            'optional_data': second[28:optional_end],
+            **_parse_names(first[5:])
+        }
+        check_digits = {
+            'document_number': (second[0:9], second[9]),
+            'date_of_birth': (second[13:19], second[19]),
+            'expiry_date': (second[21:27], second[27]),
+            'composite': (second[0:10] + second[13:20] + second[21:line_length - 1], second[line_length - 1])
+        }
+        if mrz_format == 'TD3' and second[28:42].strip('<'):
+            check_digits['optional_data'] = (second[28:42], second[42])
+
+    check_results = {
+        name: check_digit(value) == digit
+        for name, (value, digit) in check_digits.items()
+    }
+
+    date_of_birth = _parse_date(fields.pop('birth_date'), False, today)
+    expiry_date = _parse_date(fields['expiry_date'], True, today)
+
+    return {
+        'format': mrz_format,
+        'document_code': _clean(fields['document_code']),
+        'issuing_country': _clean(fields['issuing_country']),
+        'document_number': _clean(fields['document_number']),
+        'nationality': _clean(fields['nationality']),
+        'date_of_birth': date_of_birth,
+        'sex': _clean(fields['sex']),
+        'expiry_date': expiry_date,
+        'surname': fields['surname'],
+        'given_names': fields['given_names'],
+        'optional_data': _clean(fields['optional_data']),
+        'check_digits': check_results,
+        'valid': all(check_results.values()) and bool(date_of_birth) and bool(expiry_date)
+    }
+
+def find_mrz(fields: Dict, today: Optional[date] = None) -> Optional[Dict]:
+    """Parse the MRZ from extracted fields, preferring an explicit mrz field"""
+    values = sorted(fields.items(), key=lambda item: str(item[0]).lower() != 'mrz')
+    for _, value in values:
+        if isinstance(value, list):
+            value = "\n".join(str(line) for line in value)
+        if isinstance(value, str) and '<' in value:
+            mrz = parse_mrz(value, today)
+            if mrz:
+                return mrz
+    return None
+
+def mrz_to_fields(mrz: Dict) -> Dict:
+    """Map MRZ values to the standard extracted field names"""
+    fields = {
+        'name': f"{mrz['given_names']} {mrz['surname']}".strip(),
+        'surname': mrz['surname'],
+        'given_names': mrz['given_names'],
+        'document_number': mrz['document_number'],
+        'date_of_birth': mrz['date_of_birth'],
+        'expiry_date': mrz['expiry_date'],
+        'nationality': mrz['nationality'],
+        'issuing_country': mrz['issuing_country'],
+        'gender': mrz['sex']
+    }
+    return {key: value for key, value in fields.items() if value}
+
+def mrz_document_type(mrz: Dict) -> str:
+    """Document type of the rule set that applies to an MRZ document code"""
+    return 'passport' if mrz['document_code'].startswith('P') else 'id card'
+
+def compare_mrz_fields(fields: Dict, mrz: Dict) -> List[str]:
+    """List differences between the visual zone fields and the MRZ"""
+    mismatches = []
+
+    document_number = get_field(fields, 'document_number')
+    if document_number and re.sub(r'[^A-Z0-9]', '', document_number.upper()) != mrz['document_number'].replace(' ', ''):
+        mismatches.append(f"Document number {document_number} does not match the MRZ")
+
+    for name in ('date_of_birth', 'expiry_date'):
+        value = get_field(fields, name)
+        parsed = parse_date(value) if value else None
+        if parsed and mrz.get(name) and parsed.isoformat() != mrz[name]:
+            mismatches.append(f"{name.replace('_', ' ').capitalize()} {value} does not match the MRZ")
+
+    return mismatches
@@ -0,0 +1,271 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Completion notifications for API clients"""
+
+# lib/notifications.py
+import boto3
+import hmac
+import json
+import os
+import time
+import socket
+import hashlib
+import logging
+import ipaddress
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+from botocore.config import Config
+from .utils import json_default
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Metadata keys of the supported destinations
+DESTINATION_KEYS = ('callback_url', 'sns_topic_arn', 'sqs_queue_url')
+
+SIGNATURE_HEADER = 'X-FDP-Signature'
+TIMESTAMP_HEADER = 'X-FDP-Timestamp'
+
+# Longest a delivery may take, it is shortened near the invocation deadline
+DELIVERY_TIMEOUT_SECONDS = 5.0
+
+# Delivery attempts of a notification, failed ones are queued again with
+# exponential backoff before the notification is dead-lettered
+MAX_DELIVERY_ATTEMPTS = int(os.getenv('FDP_CALLBACK_ATTEMPTS', '5'))
+RETRY_BASE_DELAY_SECONDS = 30
+# Longest delay SQS allows for a message
+MAX_RETRY_DELAY_SECONDS = 900
+
+def _env_list(name: str) -> Tuple[str, ...]:
+    return tuple(item.strip() for item in os.getenv(name, '').split(',') if item.strip())
+
+# SNS topic and SQS queue ARNs clients may choose, no others are accepted
+NOTIFY_TOPICS = _env_list('FDP_NOTIFY_TOPICS')
+NOTIFY_QUEUES = _env_list('FDP_NOTIFY_QUEUES')
+
+# Callback hosts clients may choose, any public host when empty
+CALLBACK_HOSTS = tuple(host.lower() for host in _env_list('FDP_CALLBACK_HOSTS'))
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Fail on redirects, they could point the callback at a private address"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+def _queue_matches(queue_url: str, queue_arn: str) -> bool:
+    """Check if a queue URL is the queue of an ARN"""
+    parts = queue_arn.split(':')
+    if len(parts) != 6:
+        return False
+    region, account, name = parts[3:]
+    parsed = urlparse(queue_url)
+    return (parsed.scheme == 'https' and parsed.path.rstrip('/') == f"/{account}/{name}"
+            and region in (parsed.hostname or '').split('.'))
+
+def check_callback_url(callback_url: str, allowed_hosts: Sequence[str] = CALLBACK_HOSTS):
+    """
+    Check that a callback URL is an https URL of a public host
+
+    The host must be in allowed_hosts when given, and every address it
+    resolves to must be public, so callbacks can't reach private, link-local
+    or instance metadata addresses.
+
+    Raises:
+        ValueError: If the callback URL is not allowed
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme != 'https' or not parsed.hostname:
+        raise ValueError("callback_url must be an https URL")
+    if allowed_hosts and parsed.hostname.lower() not in allowed_hosts:
+        raise ValueError("callback_url host is not allowed")
+
+    try:
+        addresses = {
+            info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or 443, proto=socket.IPPROTO_TCP)
+        }
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise ValueError("callback_url host can't be resolved") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%', 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError("callback_url must resolve to a public address")
+
+def get_destination(metadata: Optional[Dict], topics: Sequence[str] = NOTIFY_TOPICS,
+                    queues: Sequence[str] = NOTIFY_QUEUES) -> Optional[Dict]:
+    """
+    Get the notification destination from request metadata
+
+    SNS topics and SQS queues must be in the configured topics and queues.
+
+    Returns:
+        Dict: the single destination given, None when there is none
+
+    Raises:
+        ValueError: If more than one destination is given or the destination is not allowed
+    """
+    destination = {
+        key: metadata[key]
+        for key in DESTINATION_KEYS
+        if metadata and metadata.get(key)
+    }
+    if not destination:
+        return None
+    if len(destination) > 1:
+        raise ValueError(f"Only one of {', '.join(DESTINATION_KEYS)} can be given")
+
+    if destination.get('callback_url'):
+        check_callback_url(destination['callback_url'])
+    elif destination.get('sns_topic_arn') and destination['sns_topic_arn'] not in topics:
+        raise ValueError("sns_topic_arn is not an allowed notification topic")
+    elif destination.get('sqs_queue_url') and not any(
+            _queue_matches(destination['sqs_queue_url'], queue_arn) for queue_arn in queues):
+        raise ValueError("sqs_queue_url is not an allowed notification queue")
+
+    return destination
+
+class CompletionNotifier:
+    """Send signed verification results to a callback URL, SNS topic or SQS queue"""
+
+    def __init__(self, secret_id: Optional[str] = None, dead_letter_queue_url: Optional[str] = None,
+                 job_queue=None):
+        self.secret_id = secret_id
+        self.dead_letter_queue_url = dead_letter_queue_url
+        # Failed deliveries are queued as notify jobs, dead-lettered at once without a queue
+        self.job_queue = job_queue
+        self.secret_ttl = int(os.getenv('SECRETS_MANAGER_TTL', '300'))
+        self._secret = None
+        self._secret_loaded_at = 0.0
+
+        config = Config(
+            retries=dict(max_attempts=1),
+            connect_timeout=DELIVERY_TIMEOUT_SECONDS,
+            read_timeout=DELIVERY_TIMEOUT_SECONDS
+        )
+        self.sns = boto3.client('sns', config=config)
+        self.sqs = boto3.client('sqs', config=config)
+        self.secrets = boto3.client('secretsmanager', config=config) if secret_id else None
+
+    def _get_secret(self) -> Optional[bytes]:
+        """Get the signing secret, cached for SECRETS_MANAGER_TTL seconds"""
+        if not self.secrets:
+            return None
+        if self._secret is None or time.monotonic() - self._secret_loaded_at > self.secret_ttl:
+            response = self.secrets.get_secret_value(SecretId=self.secret_id)
+            self._secret = response['SecretString'].encode('utf-8')
+            self._secret_loaded_at = time.monotonic()
+        return self._secret
+
+    def build_payload(self, verification: Dict) -> Dict:
+        """Build the notification payload of a verification"""
+        payload = {
+            'verification_id': verification.get('verification_id'),
+            'status': verification.get('status'),
+            'updated_at': verification.get('updated_at')
+        }
+        for key in ('document_type', 'confidence', 'result_summary', 'needs_info', 'error'):
+            if verification.get(key) is not None:
+                payload[key] = verification[key]
+        return payload
+
+    def sign(self, body: str, timestamp: str) -> Optional[str]:
+        """HMAC-SHA256 signature of the timestamp and body"""
+        secret = self._get_secret()
+        if secret is None:
+            return None
+        digest = hmac.new(secret, f"{timestamp}.{body}".encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"sha256={digest}"
+
+    def _deliver(self, destination: Dict, body: str, timestamp: str, signature: Optional[str],
+                 timeout: float = DELIVERY_TIMEOUT_SECONDS):
+        """Deliver a notification once, raising on failure"""
+        if destination.get('callback_url'):
+            # Checked again, the host may resolve differently than when the verification started
+            check_callback_url(destination['callback_url'])
+            headers = {'Content-Type': 'application/json', TIMESTAMP_HEADER: timestamp}
+            if signature:
+                headers[SIGNATURE_HEADER] = signature
+            request = urllib.request.Request(
+                destination['callback_url'], data=body.encode('utf-8'), headers=headers, method='POST')
+            with _opener.open(request, timeout=timeout) as response: # nosec B310 - https only
+                if response.status >= 300:
+                    raise RuntimeError(f"Callback returned HTTP {response.status}")
+            return
+
+        attributes = {TIMESTAMP_HEADER: {'DataType': 'String', 'StringValue': timestamp}}
+        if signature:
+            attributes[SIGNATURE_HEADER] = {'DataType': 'String', 'StringValue': signature}
+
+        if destination.get('sns_topic_arn'):
+            self.sns.publish(TopicArn=destination['sns_topic_arn'], Message=body, MessageAttributes=attributes)
+        else:
+            self.sqs.send_message(QueueUrl=destination['sqs_queue_url'], MessageBody=body,
+                                  MessageAttributes=attributes)
+
+    def notify(self, destination: Dict, verification: Dict, timeout: float = DELIVERY_TIMEOUT_SECONDS) -> Dict:
+        """
+        Send a notification in a first attempt of at most timeout seconds
+
+        Returns:
+            Dict: delivery record with the status, attempts and last error
+        """
+        body = json.dumps(self.build_payload(verification), default=json_default)
+        if timeout <= 0:
+            return self._retry(destination, body, 0, "No time left in the invocation")
+        return self.deliver(destination, body, 1, timeout)
+
+    def deliver(self, destination: Dict, body: str, attempt: int, timeout: float = DELIVERY_TIMEOUT_SECONDS) -> Dict:
+        """
+        Make a delivery attempt, signed with the time of the attempt
+
+        A failed attempt is queued again with exponential backoff, up to
+        MAX_DELIVERY_ATTEMPTS attempts, then the notification goes to the
+        dead-letter queue.
+
+        Returns:
+            Dict: delivery record with the status, attempts and last error
+        """
+        timestamp = datetime.now(timezone.utc).isoformat()
+        try:
+            if timeout <= 0:
+                raise TimeoutError("No time left in the invocation")
+            self._deliver(destination, body, timestamp, self.sign(body, timestamp), timeout)
+        except Exception as e: # pylint: disable=broad-except
+            logger.warning(f"Notification delivery attempt {attempt} failed: {str(e)}")
+            return self._retry(destination, body, attempt, str(e))
+
+        logger.info(f"Delivered notification for verification: {json.loads(body).get('verification_id')}")
+        return {'status': 'delivered', 'attempts': attempt, 'timestamp': timestamp}
+
+    def _retry(self, destination: Dict, body: str, attempts: int, error: str) -> Dict:
+        """Queue the next delivery attempt, or dead-letter the notification after the last one"""
+        timestamp = datetime.now(timezone.utc).isoformat()
+        if self.job_queue is not None and attempts < MAX_DELIVERY_ATTEMPTS:
+            delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY_SECONDS)
+            try:
+                self.job_queue.send_job({
+                    'action': 'notify',
+                    'verification_id': json.loads(body).get('verification_id'),
+                    'destination': destination,
+                    'body': body,
+                    'attempts': attempts
+                }, delay_seconds=delay)
+                return {'status': 'retrying', 'attempts': attempts, 'error': error, 'timestamp': timestamp,
+                        'retry_in_seconds': delay}
+            except Exception as e: # pylint: disable=broad-except
+                logger.error(f"Error queueing notification retry: {str(e)}")
+
+        result = {'status': 'dead_letter', 'attempts': attempts, 'error': error, 'timestamp': timestamp}
+        if self.dead_letter_queue_url:
+            try:
+                self.sqs.send_message(
+                    QueueUrl=self.dead_letter_queue_url,
+                    MessageBody=json.dumps({'destination': destination, 'body': body, **result})
+                )
+            except Exception as e: # pylint: disable=broad-except
+                logger.error(f"Error sending notification to the dead-letter queue: {str(e)}")
+        return result
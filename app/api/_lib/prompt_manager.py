@@ -31,7 +31,10 @@ class PromptManager:
             if prompt_data.get('is_active'):
                 await self._deactivate_other_prompts()
 
-            return await self.db_service.save_prompt(prompt_data)
+            result = await self.db_service.save_prompt(prompt_data)
+            # Handlers sharing this service see the new active prompt at once
+            self.db_service.clear_caches()
+            return result
         except Exception as e:
             self.logger.error("Error creating prompt: %s", str(e))
             raise
@@ -59,7 +62,9 @@ class PromptManager:
                         await self.db_service.deactivate_prompt(prompt.get('pk'))
 
             # Use update_prompt_without_locking instead of update_prompt
-            return await self.db_service.update_prompt_without_locking(prompt_data)
+            result = await self.db_service.update_prompt_without_locking(prompt_data)
+            self.db_service.clear_caches()
+            return result
         except Exception as e:
             self.logger.error("Error updating prompt: %s", str(e))
             raise
@@ -77,6 +82,7 @@ class PromptManager:
                 self.logger.warning(f"Deleting active prompt {prompt_id}")
 
             await self.db_service.delete_prompt(prompt_id)
+            self.db_service.clear_caches()
         except Exception as e:
             self.logger.error("Error deleting prompt: %s", str(e))
             raise
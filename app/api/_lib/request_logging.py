@@ -0,0 +1,189 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Structured, redacted and sampled request logging"""
+
+# lib/request_logging.py
+import os
+import json
+import time
+import random
+import hashlib
+import binascii
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv('FDP_LOGGING', 'INFO'))
+
+# Strings longer than this are replaced by their length and hash
+MAX_FIELD_CHARS = int(os.getenv('FDP_LOG_MAX_FIELD_CHARS', '256'))
+
+# Fraction of requests that also log the redacted event and debug records
+DEBUG_SAMPLE_RATE = float(os.getenv('FDP_LOG_SAMPLE_RATE', '0.01'))
+
+# Keys whose values are personal data or credentials, compared in lower case
+REDACTED_KEYS = frozenset({
+    'authorization', 'cookie', 'x-api-key', 'x-amz-security-token', 'password', 'token',
+    'id_token', 'access_token', 'refresh_token', 'claims', 'email', 'phone', 'phone_number',
+    'name', 'full_name', 'surname', 'given_names', 'first_name', 'last_name',
+    'date_of_birth', 'dob', 'birth_date', 'address', 'document_number', 'mrz',
+    'passport_number', 'license_number', 'id_number', 'personal_number', 'nationality', 'optional_data',
+    'sourceip', 'ssn', 'additional_info', 'fields', 'extracted_fields'
+})
+
+REDACTED = '[REDACTED]'
+
+# Request log of the current invocation
+CURRENT_REQUEST: ContextVar[Optional['RequestLog']] = ContextVar('current_request', default=None)
+
+_cold_start = True
+
+def _digest(value: str) -> Dict:
+    return {
+        'length': len(value),
+        'sha256': hashlib.sha256(value.encode('utf-8', 'replace')).hexdigest()[:16]
+    }
+
+def scrub(value: Any, max_chars: int = MAX_FIELD_CHARS) -> Any:
+    """
+    Copy a value for logging with personal data redacted
+
+    Values of REDACTED_KEYS are replaced, strings longer than max_chars (such
+    as base64 images) are replaced by their length and a short hash.
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_KEYS else scrub(item, max_chars)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [scrub(item, max_chars) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'length': len(value)}
+    if isinstance(value, str) and len(value) > max_chars:
+        return _digest(value)
+    return value
+
+def scrub_body(body: Any, base64_encoded: bool = False) -> Any:
+    """
+    Copy a request or message body for logging with personal data redacted
+
+    JSON bodies are parsed and scrubbed, so short bodies are redacted too.
+    Other bodies are replaced by their length and a short hash.
+    """
+    if not body:
+        return body
+    try:
+        if base64_encoded:
+            body = binascii.a2b_base64(body)
+        parsed = json.loads(body)
+    except (ValueError, TypeError, binascii.Error):
+        return _digest(body) if isinstance(body, str) else {'length': len(body)}
+    # Only keys tell personal data apart, a bare value is never logged
+    return scrub(parsed) if isinstance(parsed, (dict, list)) else _digest(str(parsed))
+
+def scrub_event(event: Any) -> Any:
+    """Copy an API Gateway or SQS event for logging, with its bodies parsed and redacted"""
+    if not isinstance(event, dict):
+        return scrub(event)
+    scrubbed = scrub({key: value for key, value in event.items() if key not in ('body', 'Records')})
+    if 'body' in event:
+        scrubbed['body'] = scrub_body(event['body'], event.get('isBase64Encoded', False))
+    if isinstance(event.get('Records'), list):
+        scrubbed['Records'] = [scrub_event(record) for record in event['Records']]
+    return scrubbed
+
+def summarize_event(event: Optional[Dict]) -> Dict:
+    """Request fields worth logging for every API Gateway or SQS event"""
+    event = event or {}
+    if 'Records' in event:
+        return {'source': 'sqs', 'records': len(event['Records'])}
+
+    request_context = event.get('requestContext') or {}
+    query_params = event.get('queryStringParameters') or {}
+    body = event.get('body')
+    return {
+        'method': event.get('httpMethod'),
+        'path': event.get('path'),
+        'action': query_params.get('action'),
+        'request_id': request_context.get('requestId'),
+        'body_bytes': len(body) if body else 0
+    }
+
+class RequestLog:
+    """Timings and fields of one request, emitted as a single JSON line"""
+
+    def __init__(self, event: Optional[Dict] = None, context=None):
+        global _cold_start # pylint: disable=global-statement
+        self.started = time.perf_counter()
+        self.cold_start = _cold_start
+        _cold_start = False
+        self.sampled = random.random() < DEBUG_SAMPLE_RATE
+        self.fields = summarize_event(event)
+        self.timings: Dict[str, float] = {}
+        if context is not None and hasattr(context, 'aws_request_id'):
+            self.fields['invocation_id'] = context.aws_request_id
+        if self.sampled:
+            self.fields['event'] = scrub_event(event)
+
+    def add_timing(self, name: str, milliseconds: float):
+        """Add time spent in a named step, repeated steps are summed"""
+        self.timings[name] = round(self.timings.get(name, 0.0) + milliseconds, 1)
+
+    def set(self, **fields):
+        """Add fields to the request line"""
+        self.fields.update(fields)
+
+    def debug(self, message: str, **fields):
+        """Log a redacted debug record when this request is sampled"""
+        if self.sampled:
+            logger.info(json.dumps({'message': message, **scrub(fields)}, default=str))
+
+    def emit(self):
+        """Log the request line"""
+        record = {
+            **self.fields,
+            'cold_start': self.cold_start,
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'timings_ms': self.timings
+        }
+        logger.info(json.dumps(record, default=str))
+
+@contextmanager
+def log_request(event: Optional[Dict], context=None):
+    """Collect a request log for the duration of an invocation and emit it at the end"""
+    request_log = RequestLog(event, context)
+    token = CURRENT_REQUEST.set(request_log)
+    try:
+        yield request_log
+    except Exception as e:
+        request_log.set(error=type(e).__name__)
+        raise
+    finally:
+        CURRENT_REQUEST.reset(token)
+        request_log.emit()
+
+@contextmanager
+def timed(name: str):
+    """Add the time spent in a block to the current request log"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, (time.perf_counter() - started) * 1000)
+
+def add_timing(name: str, milliseconds: float):
+    """Add a timing to the current request log, ignored outside a request"""
+    request_log = CURRENT_REQUEST.get()
+    if request_log is not None:
+        request_log.add_timing(name, milliseconds)
+
+def log_debug(message: str, **fields):
+    """Log a redacted debug record when the current request is sampled"""
+    request_log = CURRENT_REQUEST.get()
+    if request_log is not None:
+        request_log.debug(message, **fields)
@@ -0,0 +1,75 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Conditional GET of API Gateway responses
+
+Responses are compressed by API Gateway, see
+x-amazon-apigateway-minimum-compression-size in the API definition, and by
+the gzip middleware in container mode.
+"""
+
+# lib/responses.py
+import time
+import hashlib
+from typing import Any, Dict, Optional
+from .utils import dumps_json
+
+# Fields that identify the version of a stored item, in order of preference
+VERSION_KEYS = ('version', 'updated_at', 'timestamp')
+
+def get_header(event: Dict, name: str) -> Optional[str]:
+    """Get a request header, ignoring case"""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def compute_etag(value: Any, max_age: Optional[int] = None) -> str:
+    """
+    Compute a weak ETag for a response body
+
+    The ETag is built from the key and version of each item when every item
+    has one, so volatile fields such as presigned URLs do not change it, and
+    from the whole body otherwise. With max_age the ETag also changes every
+    max_age seconds, before URLs embedded in the body expire.
+    """
+    items = value if isinstance(value, list) else [value]
+    versions = []
+    for item in items:
+        version = next((item[key] for key in VERSION_KEYS if item.get(key)), None) \
+            if isinstance(item, dict) else None
+        if version is None:
+            versions = [dumps_json(value)]
+            break
+        versions.append(f"{item.get('pk')}:{item.get('sk')}:{version}")
+
+    if max_age:
+        versions.append(str(int(time.time() // max_age)))
+
+    digest = hashlib.sha256("\n".join(versions).encode('utf-8')).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    # Weak comparison, W/ prefixes are ignored
+    return '*' in candidates or etag.removeprefix('W/') in [
+        candidate.removeprefix('W/') for candidate in candidates
+    ]
+
+def finalize_response(event: Dict, response: Dict) -> Dict:
+    """
+    Apply conditional GET to a handler response
+
+    A GET whose If-None-Match matches the response ETag gets an empty 304.
+    """
+    headers = response.setdefault('headers', {})
+    etag = headers.get('ETag')
+
+    if (etag and event.get('httpMethod') == 'GET' and response.get('statusCode') == 200
+            and _etag_matches(get_header(event, 'If-None-Match'), etag)):
+        response['statusCode'] = 304
+        response['body'] = ''
+        headers.pop('Content-Type', None)
+    return response
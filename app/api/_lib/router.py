@@ -0,0 +1,131 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Route table and persistent event loop for the Lambda handlers"""
+
+# lib/router.py
+import re
+import time
+import binascii
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from .utils import create_api_response
+from .deadline import set_deadline
+from .request_logging import log_request
+from .responses import finalize_response
+from .warmup import is_warmup_event
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict, object], Awaitable[Dict]]
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the event loop of this process, created once and reused across warm invocations
+
+    Tasks still pending when a handler returns continue on the next invocation.
+    """
+    global _loop # pylint: disable=global-statement
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+def run(coro: Awaitable):
+    """Run a coroutine to completion on the persistent event loop"""
+    return get_loop().run_until_complete(coro)
+
+class Route:
+    """HTTP method, path pattern and optional action query parameter of a handler"""
+
+    def __init__(self, method: str, path: str, handler: Handler, action: Optional[str] = None):
+        self.method = method
+        self.path = path
+        self.handler = handler
+        self.action = action
+        # {name} matches one path segment, the path may start with one stage or base path segment
+        self.pattern = re.compile(
+            r'(?:/[^/]+)?' + re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', re.escape(path.rstrip('/'))) + r'/?')
+
+    def match(self, method: str, path: str, action: Optional[str]) -> Optional[Dict]:
+        """Return the path parameters when the request matches this route"""
+        if method != self.method or (self.action and action != self.action):
+            return None
+        match = self.pattern.fullmatch(path)
+        return match.groupdict() if match else None
+
+class Router:
+    """Dispatch API Gateway proxy events to async handlers through a route table"""
+
+    def __init__(self, routes: Optional[List[Route]] = None,
+                 warmup: Optional[Callable[[], Awaitable]] = None):
+        self.routes = []
+        self.warmup = warmup
+        for route in routes or []:
+            self.add(route)
+
+    def add(self, route: Route):
+        """Add a route, routes with an action are tried before routes without one"""
+        self.routes.append(route)
+        self.routes.sort(key=lambda item: item.action is None)
+
+    def resolve(self, event: Dict) -> Optional[Route]:
+        """Find the route of an event and fill in its path parameters"""
+        query_params = event.get('queryStringParameters') or {}
+        for route in self.routes:
+            params = route.match(event.get('httpMethod'), event.get('path') or '', query_params.get('action'))
+            if params is not None:
+                event['pathParameters'] = {**params, **(event.get('pathParameters') or {})}
+                return route
+        return None
+
+    def warm_up(self) -> Dict:
+        """Initialize clients and caches without doing any business work"""
+        started = time.perf_counter()
+        try:
+            if self.warmup:
+                run(self.warmup())
+        except Exception as e: # pylint: disable=broad-except
+            logger.error("Error warming up: %s", str(e), exc_info=True)
+            return {'warm': False, 'error': str(e)}
+        return {'warm': True, 'duration_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def dispatch(self, event: Dict, context) -> Dict:
+        """Handle an API Gateway proxy event in Lambda"""
+        if is_warmup_event(event):
+            return self.warm_up()
+
+        set_deadline(context)
+        return run(self.handle(event, context))
+
+    async def handle(self, event: Dict, context=None) -> Dict:
+        """Handle an API Gateway proxy event on a running event loop, logging one structured line"""
+        with log_request(event, context) as request_log:
+            response = finalize_response(event, await self._handle(event, context))
+            request_log.set(status=response.get('statusCode'))
+            return response
+
+    async def _handle(self, event: Dict, context) -> Dict:
+        # Binary request bodies arrive base64 encoded, they are kept as bytes
+        # since handlers parse JSON from bytes directly
+        if event.get('isBase64Encoded') and event.get('body'):
+            event['body'] = binascii.a2b_base64(event['body'])
+            event['isBase64Encoded'] = False
+
+        # CORS preflight is answered the same way for every route
+        if event.get('httpMethod') == 'OPTIONS':
+            return create_api_response(200, {})
+
+        route = self.resolve(event)
+        if route is None:
+            return create_api_response(404, {'detail': 'Not Found'})
+
+        try:
+            return await route.handler(event, context)
+        except Exception as e: # pylint: disable=broad-except
+            logger.error("Error processing request: %s", str(e), exc_info=True)
+            return create_api_response(500, {'detail': str(e)})
@@ -3,22 +3,20 @@
 
 # lib/s3.py
 import boto3
-import base64
-from io import BytesIO
 import uuid
 from datetime import datetime
 import os
-from dotenv import load_dotenv
 import logging
 from botocore.exceptions import ClientError
 from botocore.config import Config
+from .utils import decode_base64_image, load_local_env
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_local_env()
 
 class S3Service:
     def __init__(self):
@@ -115,45 +113,45 @@ class S3Service:
             ClientError: If there's an error uploading to S3
         """
         try:
-            # Remove the base64 prefix if it exists
-            if ',' in base64_string:
-                base64_string = base64_string.split(',')[1]
+            image_data = decode_base64_image(base64_string)
+        except ValueError as e:
+            logger.error(f"Base64 decode error: {repr(e.__cause__)}")
+            raise
+        return self.upload_image(image_data)
 
-            # Remove any whitespace
-            base64_string = base64_string.strip()
+    def upload_image(self, image_data: bytes) -> str:
+        """
+        Upload image bytes to S3
 
-            try:
-                # Decode base64 string
-                image_data = base64.b64decode(base64_string)
-                logger.info("Successfully decoded base64 image data")
-            except Exception as e:
-                logger.error(f"Base64 decode error: {repr(e)}")
-                raise ValueError("Invalid base64 image data")
+        The bytes are sent as the request body as is, without the file
+        object wrapper and chunk copies of a managed transfer.
 
-            # Generate a unique file name with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-            file_name = f"documents/{timestamp}-{str(uuid.uuid4())}.jpg"
+        Args:
+            image_data: Image bytes, or any bytes-like buffer
 
-            try:
-                # Upload to S3 with server-side encryption
-                self.s3.upload_fileobj(
-                    BytesIO(image_data),
-                    self.bucket_name,
-                    file_name,
-                    ExtraArgs={
-                        'ContentType': 'image/jpeg',
-                        'ServerSideEncryption': 'AES256'
-                    }
-                )
-                logger.info(f"Successfully uploaded file to S3: {file_name}")
-                return file_name
+        Returns:
+            str: The S3 file key of the uploaded image
 
-            except ClientError as e:
-                logger.error(f"S3 upload error: {repr(e)}")
-                raise
+        Raises:
+            ClientError: If there's an error uploading to S3
+        """
+        # Generate a unique file name with timestamp
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        file_name = f"documents/{timestamp}-{str(uuid.uuid4())}.jpg"
 
-        except Exception as e:
-            logger.error(f"Error in upload_base64_image: {repr(e)}")
+        try:
+            # Upload to S3 with server-side encryption
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=file_name,
+                Body=image_data,
+                ContentType='image/jpeg',
+                ServerSideEncryption='AES256'
+            )
+            logger.info(f"Successfully uploaded file to S3: {file_name}")
+            return file_name
+        except ClientError as e:
+            logger.error(f"S3 upload error: {repr(e)}")
             raise
 
     def get_presigned_url(self, file_key: str, expiry: int = 3600) -> str:
@@ -176,7 +174,7 @@ class S3Service:
                 logger.error("File key is empty")
                 raise ValueError("File key cannot be empty")
 
-            logger.info(f"Generating presigned URL for file key: {repr(file_key)}")
+            logger.debug("Generating presigned URL for file key: %r", file_key)
 
             try:
                 # Check if object exists before generating URL
@@ -191,7 +189,7 @@ class S3Service:
                     ExpiresIn=expiry
                 )
 
-                logger.info(f"Successfully generated presigned URL for {repr(file_key)}")
+                logger.debug("Successfully generated presigned URL for %r", file_key)
                 return presigned_url
 
             except ClientError as e:
@@ -203,3 +201,86 @@ class S3Service:
         except Exception as e:
             logger.error(f"Error generating presigned URL: {repr(e)}")
             raise
+
+    def warm_up(self) -> None:
+        """
+        Resolve credentials and load the presign signer without calling S3
+
+        The first presigned URL of a container otherwise pays for both.
+        """
+        self.s3.generate_presigned_url(
+            ClientMethod='get_object',
+            Params={'Bucket': self.bucket_name, 'Key': 'warmup'},
+            ExpiresIn=60
+        )
+
+    def get_s3_uri(self, file_key: str) -> str:
+        """
+        Build the S3 URI for an object in the bucket
+
+        Args:
+            file_key: The S3 object key
+
+        Returns:
+            str: S3 URI of the object
+        """
+        return f"s3://{self.bucket_name}/{file_key}"
+
+    def get_file_key(self, s3_uri: str) -> str:
+        """
+        Get the object key from an S3 URI in the bucket
+
+        Args:
+            s3_uri: S3 URI of the object
+
+        Returns:
+            str: The S3 object key
+        """
+        return s3_uri.replace(f"s3://{self.bucket_name}/", '', 1) if s3_uri else None
+
+    def put_text(self, file_key: str, body: str) -> str:
+        """
+        Upload a text object to S3
+
+        Args:
+            file_key: The S3 object key
+            body: Text content of the object
+
+        Returns:
+            str: The S3 file key of the uploaded object
+
+        Raises:
+            ClientError: If there's an error uploading to S3
+        """
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                Body=body.encode('utf-8'),
+                ServerSideEncryption='AES256'
+            )
+            logger.info(f"Successfully uploaded text object to S3: {file_key}")
+            return file_key
+        except ClientError as e:
+            logger.error(f"Error uploading text object: {repr(e)}")
+            raise
+
+    def get_text(self, file_key: str) -> str:
+        """
+        Download a text object from S3
+
+        Args:
+            file_key: The S3 object key
+
+        Returns:
+            str: Text content of the object
+
+        Raises:
+            ClientError: If there's an error downloading from S3
+        """
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=file_key)
+            return response['Body'].read().decode('utf-8')
+        except ClientError as e:
+            logger.error(f"Error downloading text object: {repr(e)}")
+            raise
@@ -0,0 +1,108 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Container mode HTTP server hosting all API handlers
+
+Serves the agent, configuration, prompt and strands routes from one ASGI
+app for ECS, EKS or local runs. Run it from a function directory, for
+example ``uvicorn lib.server:create_app --factory --port 8080`` in
+app/api/strands-agent.
+
+The handlers are loaded into one process, so they share boto3 clients,
+connection pools and configuration caches (see lib/services.py), and
+requests are served concurrently on the uvicorn event loop. Service calls
+that block on AWS run in worker threads, so a slow request does not stall
+the others.
+"""
+
+# lib/server.py
+import os
+import uuid
+import base64
+import logging
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from .router import Router
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directory of the function folders, lib links to _lib inside each of them
+API_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# First path segment served by each function
+FUNCTIONS = {
+    'verifications': 'agent-manager',
+    'configurations': 'configuration-manager',
+    'prompts': 'prompt-manager',
+    'strands': 'strands-agent'
+}
+
+HTTP_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+
+# Same threshold as the API Gateway minimum compression size
+COMPRESSION_MIN_BYTES = 1024
+
+def load_router(function_name: str) -> Router:
+    """Import the handler module of a function and return its router"""
+    path = os.path.join(API_DIR, function_name, 'function.py')
+    spec = importlib.util.spec_from_file_location(function_name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ROUTER
+
+async def build_event(request: Request) -> Dict:
+    """Build an API Gateway proxy event from an HTTP request"""
+    body = await request.body()
+    return {
+        'httpMethod': request.method,
+        'path': request.url.path,
+        'headers': dict(request.headers),
+        'queryStringParameters': dict(request.query_params) or None,
+        'pathParameters': None,
+        'requestContext': {'requestId': str(uuid.uuid4())},
+        'body': body or None,
+        'isBase64Encoded': False
+    }
+
+def to_response(result: Dict) -> Response:
+    """Convert an API Gateway proxy response to an HTTP response"""
+    body = result.get('body') or ''
+    content = base64.b64decode(body) if result.get('isBase64Encoded') else body.encode('utf-8')
+    return Response(content=content, status_code=result['statusCode'], headers=result.get('headers') or {})
+
+def create_app(routers: Optional[Dict[str, Router]] = None) -> FastAPI:
+    """Create the ASGI app with the routes of every function, or of the given routers"""
+    if routers is None:
+        routers = {segment: load_router(function_name) for segment, function_name in FUNCTIONS.items()}
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        # Prime shared clients and caches before the first request
+        for segment, router in routers.items():
+            try:
+                if router.warmup:
+                    await router.warmup()
+            except Exception as e: # pylint: disable=broad-except
+                logger.error(f"Error warming up {segment}: {str(e)}")
+        yield
+
+    app = FastAPI(title='FDP API', lifespan=lifespan)
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok'}
+
+    @app.api_route('/{resource}', methods=HTTP_METHODS)
+    @app.api_route('/{resource}/{path:path}', methods=HTTP_METHODS)
+    async def proxy(resource: str, request: Request):
+        router = routers.get(resource)
+        if router is None:
+            return Response(status_code=404)
+        return to_response(await router.handle(await build_event(request)))
+
+    return app
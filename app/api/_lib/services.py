@@ -0,0 +1,32 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Process-wide registry of services shared by the handlers"""
+
+# lib/services.py
+import os
+import boto3
+from typing import Any, Callable, Dict
+from botocore.config import Config
+
+# Connections per boto3 client, sized for the concurrent requests of the container mode server
+MAX_POOL_CONNECTIONS = int(os.getenv('FDP_MAX_POOL_CONNECTIONS', '10'))
+
+_services: Dict[str, Any] = {}
+
+def get_service(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Get a service, created once per process
+
+    Handlers loaded into the same process, such as by the container mode
+    server, share clients, connection pools and caches.
+    """
+    if name not in _services:
+        _services[name] = factory()
+    return _services[name]
+
+def get_client(service_name: str) -> Any:
+    """Get a shared boto3 client"""
+    return get_service(
+        f"client:{service_name}",
+        lambda: boto3.client(service_name, config=Config(max_pool_connections=MAX_POOL_CONNECTIONS))
+    )
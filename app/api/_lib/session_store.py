@@ -0,0 +1,56 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Session store for concurrent agent verifications"""
+
+# lib/session_store.py
+import logging
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Verification running in the current asyncio task, copied into child tasks and
+# asyncio.to_thread calls but not into threads of other executors such as the
+# Strands tool pool, tools get it bound explicitly
+CURRENT_VERIFICATION_ID: ContextVar[Optional[str]] = ContextVar('current_verification_id', default=None)
+
+class SessionStore:
+    """Bounded LRU of session memory keyed by verification ID"""
+
+    def __init__(self, max_sessions: int = 100):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, verification_id: Optional[str]) -> Dict:
+        """Get the session memory for a verification, creating it if needed"""
+        if not verification_id:
+            # Outside of a verification there is nothing to share
+            return {}
+
+        with self._lock:
+            if verification_id in self._sessions:
+                self._sessions.move_to_end(verification_id)
+                return self._sessions[verification_id]
+
+            memory = {}
+            self._sessions[verification_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                logger.warning(f"Evicted session memory for verification: {evicted_id}")
+            return memory
+
+    def discard(self, verification_id: str):
+        """Remove the session memory of a finished verification"""
+        with self._lock:
+            self._sessions.pop(verification_id, None)
+
+    def __contains__(self, verification_id: str) -> bool:
+        with self._lock:
+            return verification_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -2,58 +2,80 @@
 # SPDX-License-Identifier: MIT-0
 
 # lib/utils.py
+import os
 import re
 import logging
 import json
+import binascii
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional, Type, TypeVar, Union
+
+try:
+    import orjson
+except ImportError: # optional, the standard library encoder is used without it
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
-def extract_confidence_score(text: str) -> float:
+ModelT = TypeVar('ModelT')
+
+def load_local_env():
+    """Load a .env file for local runs, Lambda gets its environment from the function configuration"""
+    if os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# Compiled at import so the first request does not pay for it, tried in order
+CONFIDENCE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'\*{0,2}Confidence Score:\*{0,2}\s*(\d+(?:\.\d+)?)',
+        r'\*{0,2}confidence:?\*{0,2}\s*(\d+(?:\.\d+)?)',
+        r'\*{0,2}confidence level:?\*{0,2}\s*(\d+(?:\.\d+)?)',
+        r'\*{0,2}confidence rating:?\*{0,2}\s*(\d+(?:\.\d+)?)',
+        r'\*{0,2}Confidence Score for Check Authenticity:?\*{0,2}\s*(\d+(?:\.\d+)?)',
+        r'\*{0,2}Confidence Score for Document Authenticity:?\*{0,2}\s*(\d+(?:\.\d+)?)'
+    )
+]
+
+DOCUMENT_TYPE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'\*{0,2}Document Type:\*{0,2}\s*([^\n]+)',
+        r'\*{0,2}type of document:?\*{0,2}\s*([^\n]+)',
+        r'\*{0,2}document:?\*{0,2}\s*([^\n]+)',
+        r'\*{0,2}identified as:?\*{0,2}\s*([^\n]+)'
+    )
+]
+
+def prompt_version(prompt: Dict) -> str:
+    """Short hash of the role and tasks of a prompt, prompts are updated in place"""
+    text = f"{prompt.get('role', '')}\n{prompt.get('tasks', '')}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+def extract_confidence_score(text: str, default: Optional[float] = 0.0) -> Optional[float]:
+    """Extract the confidence score as a fraction, default when the text has none"""
     try:
-        # First try to find the exact pattern
-        pattern = r'\*{0,2}Confidence Score:\*{0,2}\s*(\d+(?:\.\d+)?)'
-        match = re.search(pattern, text, re.IGNORECASE)
-
-        if match:
-            value = float(match.group(1))
-            return value / 100 if value > 1 else value
-
-        patterns = [
-            r'\*{0,2}confidence:?\*{0,2}\s*(\d+(?:\.\d+)?)',
-            r'\*{0,2}confidence level:?\*{0,2}\s*(\d+(?:\.\d+)?)',
-            r'\*{0,2}confidence rating:?\*{0,2}\s*(\d+(?:\.\d+)?)',
-            r'\*{0,2}Confidence Score for Check Authenticity:?\*{0,2}\s*(\d+(?:\.\d+)?)',
-            r'\*{0,2}Confidence Score for Document Authenticity:?\*{0,2}\s*(\d+(?:\.\d+)?)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in CONFIDENCE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 value = float(match.group(1))
                 return value / 100 if value > 1 else value
 
-        return 0.0
+        return default
 
     except Exception as e:
         logger.error(f"Error extracting confidence score: {str(e)}")
-        return 0.0
+        return default
 
 def extract_document_type(text: str) -> str:
     try:
-        pattern = r'\*{0,2}Document Type:\*{0,2}\s*([^\n]+)'
-        match = re.search(pattern, text, re.IGNORECASE)
-
-        if match:
-            return match.group(1).strip().replace('*', '')
-
-        patterns = [
-            r'\*{0,2}type of document:?\*{0,2}\s*([^\n]+)',
-            r'\*{0,2}document:?\*{0,2}\s*([^\n]+)',
-            r'\*{0,2}identified as:?\*{0,2}\s*([^\n]+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in DOCUMENT_TYPE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip().replace('*', '')
 
@@ -63,15 +85,125 @@ def extract_document_type(text: str) -> str:
         logger.error(f"Error extracting document type: {str(e)}")
         return "Unknown Document"
 
-def create_api_response(status_code: int, body: dict) -> dict:
+def strip_base64_prefix(base64_string: str) -> str:
+    """Remove the data URL prefix and surrounding whitespace from a base64 string"""
+    if not base64_string:
+        return base64_string
+    if ',' in base64_string:
+        base64_string = base64_string.split(',', 1)[1]
+    return base64_string.strip()
+
+def decode_base64_image(base64_string: Union[str, bytes, memoryview]) -> bytes:
+    """
+    Decode a base64 image, with or without a data URL prefix
+
+    binascii reads the buffer of an ASCII string directly, so unlike
+    base64.b64decode no encoded copy of the image is made. Whitespace is
+    skipped while decoding. The prefix is sliced off only when present.
+
+    Raises:
+        ValueError: If the base64 data is invalid
+    """
+    if isinstance(base64_string, str) and base64_string.startswith('data:'):
+        base64_string = base64_string[base64_string.find(',') + 1:]
+    try:
+        return binascii.a2b_base64(base64_string)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Invalid base64 image data") from e
+
+def validate_body(event: Dict, model: Type[ModelT]) -> ModelT:
+    """
+    Validate the body of an API Gateway event into a pydantic model
+
+    The raw JSON is validated directly with model_validate_json, without an
+    intermediate dict, and is dropped from the event afterwards so only the
+    validated fields stay in memory for the rest of the request.
+
+    Raises:
+        ValueError: If the body is missing or invalid, pydantic's
+        ValidationError is a ValueError
+    """
+    body = event.get('body')
+    if not body:
+        raise ValueError("No body found in request")
+    if isinstance(body, (str, bytes, bytearray)):
+        request = model.model_validate_json(body)
+    else:
+        request = model.model_validate(body)
+    event['body'] = None
+    return request
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """
+    Extract the first balanced JSON object from model output in a single pass
+
+    Text around the object, such as markdown fences or explanations, is
+    ignored, braces inside strings are not counted. Returns None when the
+    text has no valid JSON object.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+
+    for index, char in enumerate(text or ''):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = depth > 0
+        elif char == '{':
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                try:
+                    value = json.loads(text[start:index + 1])
+                    if isinstance(value, dict):
+                        return value
+                except json.JSONDecodeError:
+                    pass
+    return None
+
+def json_default(value: Any) -> Any:
+    """Serialize DynamoDB Decimals, datetimes, enums and pydantic models"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_json(value: Any) -> str:
+    """Encode a response body as compact JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, default=json_default, separators=(',', ':'))
+
+def create_api_response(status_code: int, body: Any, etag: Optional[str] = None) -> dict:
     """Create standardized API Gateway response"""
-    return {
+    response = {
         'statusCode': status_code,
         'headers': {
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Amz-Security-Token,X-Api-Key',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Amz-Date,X-Amz-Security-Token,X-Api-Key,If-None-Match',
+            'Access-Control-Expose-Headers': 'ETag',
         },
-        'body': json.dumps(body)
+        'body': dumps_json(body)
     }
+    if etag:
+        response['headers']['ETag'] = etag
+    return response
@@ -0,0 +1,52 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Warm-up events and snapshot-safe initialization of Lambda containers"""
+
+# lib/warmup.py
+import random
+import logging
+from typing import Callable, Dict, Optional
+
+try:
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError: # only available in runtimes with SnapStart
+    register_after_restore = register_before_snapshot = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def is_warmup_event(event) -> bool:
+    """
+    Check if an event is a warm-up invocation
+
+    Warm-up events are {"warmup": true} sent by a direct invoke, or an
+    EventBridge scheduled event.
+    """
+    if not isinstance(event, dict):
+        return False
+    if event.get('warmup') is True:
+        return True
+    return event.get('source') == 'aws.events' and event.get('detail-type') == 'Scheduled Event'
+
+def register_snapshot_hooks(warm_up: Callable[[], Dict], after_restore: Optional[Callable[[], None]] = None):
+    """
+    Run the warm-up before a SnapStart snapshot is taken, and reset state after restore
+
+    Everything primed by the warm-up is captured in the snapshot. After a
+    restore the random generator is reseeded so restored containers do not
+    share a sequence, and after_restore drops state that may be stale, such
+    as cached configurations. Without SnapStart this does nothing.
+    """
+    if register_before_snapshot is None:
+        return
+
+    @register_before_snapshot
+    def _before_snapshot():
+        logger.info("Warming up before snapshot: %s", warm_up())
+
+    @register_after_restore
+    def _after_restore():
+        random.seed()
+        if after_restore:
+            after_restore()
@@ -4,32 +4,39 @@
 
 import json
 import logging
-import boto3
-from dotenv import load_dotenv
-from lib.utils import create_api_response
+from lib.utils import create_api_response, load_local_env, validate_body
 from lib.dynamodb import DynamoDBService
 from lib.s3 import S3Service
-from lib.models import DocumentAnalysisRequest
 from lib.document_analyzer import DocumentAnalyzer
-import asyncio
+from lib.batch_inference import BatchInferenceService
+from lib.deadline import DeadlineExceeded
+from lib.router import Route, Router
+from lib.responses import compute_etag
+from lib.warmup import register_snapshot_hooks
+from lib.services import get_client, get_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_local_env()
+
+# Verification ETags change within the lifetime of their presigned preview URLs
+PREVIEW_URL_ETAG_SECONDS = 1800
 
 def initialize_services():
     """Initialize services at module level"""
-    bedrock_client = boto3.client("bedrock-runtime")
-    s3_service = S3Service()
-    db_service = DynamoDBService()
+    bedrock_client = get_client("bedrock-runtime")
+    s3_service = get_service('s3_service', S3Service)
+    db_service = get_service('db_service', DynamoDBService)
+    batch_service = get_service('batch_service', lambda: BatchInferenceService(s3_service))
 
     return {
         'bedrock_client': bedrock_client,
         's3_service': s3_service,
-        'db_service': db_service
+        'db_service': db_service,
+        'batch_service': batch_service
     }
 
 # Initialize services at module level
@@ -40,26 +47,25 @@ MANAGER = DocumentAnalyzer(SERVICES, LOGGER)
 
 async def create_verifications(event, context):
     """POST method for /verifications"""
-    LOGGER.info("Received create verifications request")
+    LOGGER.debug("Received create verifications request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Parse request body
         body = event.get('body')
         if not body:
             return create_api_response(400, {'detail': 'No body found in request'})
 
-        if isinstance(body, str):
-            body = json.loads(body)
-
-        request = DocumentAnalysisRequest(**body)
+        # Validated from the raw JSON, imported here so GET requests do not load pydantic
+        from lib.models import DocumentAnalysisRequest
+        request = validate_body(event, DocumentAnalysisRequest)
 
         # Process document - create a fresh coroutine each time
         result = await MANAGER.analyze_document(request.image_base64)
         return create_api_response(200, result)
 
+    except DeadlineExceeded as de:
+        LOGGER.error("Deadline exceeded: %s", str(de))
+        return create_api_response(504, {'detail': str(de)})
     except ValueError as ve:
         LOGGER.error("Validation error: %s", str(ve))
         return create_api_response(400, {'detail': str(ve)})
@@ -70,12 +76,9 @@ async def create_verifications(event, context):
 
 async def get_verifications(event, context):
     """GET method for /verifications"""
-    LOGGER.info("Received get verifications request")
+    LOGGER.debug("Received get verifications request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Check for verification_id in query parameters
         query_params = event.get('queryStringParameters') or {}
         verification_id = query_params.get('verification_id')
@@ -85,13 +88,13 @@ async def get_verifications(event, context):
             result = await MANAGER.get_verification(verification_id)
             if result is None:
                 return create_api_response(404, {'detail': 'Verification not found'})
-            return create_api_response(200, result)
+            return create_api_response(200, result, etag=compute_etag(result, PREVIEW_URL_ETAG_SECONDS))
         else:
             # Get all verifications
             result = await MANAGER.get_verifications()
             if result is None:
                 result = []
-            return create_api_response(200, result)
+            return create_api_response(200, result, etag=compute_etag(result, PREVIEW_URL_ETAG_SECONDS))
 
     except ValueError as ve:
         return create_api_response(404, {'detail': str(ve)})
@@ -99,35 +102,102 @@ async def get_verifications(event, context):
         LOGGER.error("Error: %s", str(e))
         return create_api_response(500, {'detail': str(e)})
 
-def handler(event, context):
-    """Main handler function for Lambda"""
-    LOGGER.info("Received event: %s", json.dumps(event))
+async def create_verifications_batch(event, context):
+    """POST method for /verifications/batch"""
+    LOGGER.debug("Received create verifications batch request")
+
+    try:
+        # Parse request body
+        body = event.get('body')
+        if not body:
+            return create_api_response(400, {'detail': 'No body found in request'})
+
+        # Validated from the raw JSON, imported here so GET requests do not load pydantic
+        from lib.models import BatchAnalysisRequest
+        request = validate_body(event, BatchAnalysisRequest)
+
+        # Documents are analyzed concurrently, failed ones are reported per item
+        result = await MANAGER.analyze_documents(
+            [document.image_base64 for document in request.documents],
+            request.max_concurrency
+        )
+        return create_api_response(200, result)
+
+    except ValueError as ve:
+        LOGGER.error("Validation error: %s", str(ve))
+        return create_api_response(400, {'detail': str(ve)})
+    except Exception as e: # pylint: disable=broad-except
+        LOGGER.error("Error: %s", str(e), exc_info=True)
+        return create_api_response(500, {'detail': str(e)})
+
+async def create_batch_verifications(event, context):
+    """POST method for /verifications?action=bulk"""
+    LOGGER.debug("Received create batch verifications request")
+
+    try:
+        # Parse request body
+        body = event.get('body')
+        if not body:
+            return create_api_response(400, {'detail': 'No body found in request'})
 
-    # Get HTTP method and path
-    http_method = event['httpMethod']
-    path = event['path']
+        if isinstance(body, (str, bytes)):
+            body = json.loads(body)
+
+        result = await MANAGER.submit_batch_verifications(body.get('file_keys') or [])
+        return create_api_response(202, result)
 
-    # Create a new event loop for each request
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    except ValueError as ve:
+        LOGGER.error("Validation error: %s", str(ve))
+        return create_api_response(400, {'detail': str(ve)})
+    except Exception as e: # pylint: disable=broad-except
+        LOGGER.error("Error: %s", str(e), exc_info=True)
+        return create_api_response(500, {'detail': str(e)})
+
+async def ingest_batch_verifications(event, context):
+    """POST method for /verifications?action=ingest"""
+    LOGGER.debug("Received ingest batch verifications request")
 
     try:
-        # Route requests to appropriate handler
-        if http_method == 'GET' and path.startswith('/verifications'):
-            # Create a fresh coroutine object
-            coro = get_verifications(event, context)
-            result = loop.run_until_complete(coro)
-            return result
-        if http_method == 'POST' and path.startswith('/verifications'):
-            # Create a fresh coroutine object
-            coro = create_verifications(event, context)
-            result = loop.run_until_complete(coro)
-            return result
-
-        return create_api_response(404, {'detail': 'Not Found'})
-    except Exception as e:
-        LOGGER.error("Error processing request: %s", str(e), exc_info=True)
+        # Parse request body
+        body = event.get('body')
+        if not body:
+            return create_api_response(400, {'detail': 'No body found in request'})
+
+        if isinstance(body, (str, bytes)):
+            body = json.loads(body)
+
+        job_arn = body.get('job_arn')
+
+        if not job_arn:
+            return create_api_response(400, {'detail': 'No job_arn found in request'})
+
+        result = await MANAGER.ingest_batch_verifications(job_arn)
+        return create_api_response(200, result)
+
+    except ValueError as ve:
+        return create_api_response(400, {'detail': str(ve)})
+    except Exception as e: # pylint: disable=broad-except
+        LOGGER.error("Error: %s", str(e), exc_info=True)
         return create_api_response(500, {'detail': str(e)})
-    finally:
-        # Clean up the event loop
-        loop.close()
+
+async def warm_up():
+    """Prime the config snapshot, the presign signer and the request model"""
+    import lib.models
+    await SERVICES['db_service'].get_active_prompt()
+    await SERVICES['db_service'].get_active_model_config()
+    await SERVICES['db_service'].get_config_snapshot()
+    SERVICES['s3_service'].warm_up()
+
+ROUTER = Router([
+    Route('POST', '/verifications', create_batch_verifications, action='bulk'),
+    Route('POST', '/verifications', ingest_batch_verifications, action='ingest'),
+    Route('POST', '/verifications/batch', create_verifications_batch),
+    Route('GET', '/verifications', get_verifications),
+    Route('POST', '/verifications', create_verifications)
+], warmup=warm_up)
+
+register_snapshot_hooks(ROUTER.warm_up, SERVICES['db_service'].clear_caches)
+
+def handler(event, context):
+    """Main handler function for Lambda"""
+    return ROUTER.dispatch(event, context)
@@ -2,7 +2,6 @@
 # SPDX-License-Identifier: MIT-0
 """Pre-Token Generator"""
 
-import json
 import logging
 
 # Configure logging
@@ -11,7 +10,8 @@ LOGGER = logging.getLogger(__name__)
 
 def handler(event, context):
     """Main handler function for Lambda"""
-    LOGGER.info("Received event: %s", json.dumps(event))
+    LOGGER.info("Received %s event for client %s", event.get('triggerSource'),
+                (event.get('callerContext') or {}).get('clientId'))
 
     # this allows us to override claims in the access token
     # "claimsAndScopeOverrideDetails" is the important part
@@ -2,25 +2,25 @@
 # SPDX-License-Identifier: MIT-0
 """Prompt Manager Function"""
 
-import json
 import logging
-from dotenv import load_dotenv
-from lib.utils import create_api_response
+from lib.utils import create_api_response, load_local_env, validate_body
 from lib.dynamodb import DynamoDBService
-from lib.models import Prompt
 from lib.prompt_manager import PromptManager
-import asyncio
+from lib.router import Route, Router
+from lib.responses import compute_etag
+from lib.warmup import register_snapshot_hooks
+from lib.services import get_service
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_local_env()
 
 def initialize_services():
     """Initialize services at module level"""
-    db_service = DynamoDBService()
+    db_service = get_service('db_service', DynamoDBService)
     return {
         'db_service': db_service
     }
@@ -33,36 +33,29 @@ MANAGER = PromptManager(SERVICES, LOGGER)
 
 async def get_prompts(event, context):
     """GET method for /prompts"""
-    LOGGER.info("Received get prompts request")
+    LOGGER.debug("Received get prompts request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         results = await MANAGER.get_prompts()
-        return create_api_response(200, results)
+        return create_api_response(200, results, etag=compute_etag(results))
     except Exception as e: # pylint: disable=broad-except
         LOGGER.error("Error: %s", str(e))
         return create_api_response(500, {'detail': str(e)})
 
 async def create_prompt(event, context):
     """POST method for /prompts"""
-    LOGGER.info("Received create prompt request")
+    LOGGER.debug("Received create prompt request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Parse request body
         body = event.get('body')
         if not body:
             return create_api_response(400, {'detail': 'No body found in request'})
 
-        if isinstance(body, str):
-            body = json.loads(body)
-
-        # Validate through pydantic model
-        prompt_data = Prompt(**body).dict(exclude_unset=True)
+        # Validate the raw JSON through pydantic model
+        # Imported here so GET requests do not load pydantic
+        from lib.models import Prompt
+        prompt_data = validate_body(event, Prompt).dict(exclude_unset=True)
 
         result = await MANAGER.create_prompt(prompt_data)
         return create_api_response(201, result)
@@ -74,12 +67,9 @@ async def create_prompt(event, context):
 
 async def update_prompt(event, context):
     """PUT method for /prompts?prompt_id=xxx"""
-    LOGGER.info("Received update prompt request")
+    LOGGER.debug("Received update prompt request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Get query parameters
         query_params = event.get('queryStringParameters') or {}
         prompt_id = query_params.get('prompt_id')
@@ -92,11 +82,10 @@ async def update_prompt(event, context):
         if not body:
             return create_api_response(400, {'detail': 'No body found in request'})
 
-        if isinstance(body, str):
-            body = json.loads(body)
-
-        # Validate through pydantic model
-        prompt_data = Prompt(**body).dict(exclude_unset=True)
+        # Validate the raw JSON through pydantic model
+        # Imported here so GET requests do not load pydantic
+        from lib.models import Prompt
+        prompt_data = validate_body(event, Prompt).dict(exclude_unset=True)
 
         result = await MANAGER.update_prompt(prompt_id, prompt_data)
         return create_api_response(200, result)
@@ -108,12 +97,9 @@ async def update_prompt(event, context):
 
 async def delete_prompt(event, context):
     """DELETE method for /prompts?prompt_id=xxx"""
-    LOGGER.info("Received delete prompt request")
+    LOGGER.debug("Received delete prompt request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Get query parameters
         query_params = event.get('queryStringParameters') or {}
         prompt_id = query_params.get('prompt_id')
@@ -129,32 +115,24 @@ async def delete_prompt(event, context):
         LOGGER.error("Error deleting prompt: %s", str(e))
         return create_api_response(500, {'detail': str(e)})
 
-def handler(event, context):
-    """Main handler function for Lambda"""
-    LOGGER.info("Received event: %s", json.dumps(event))
+async def warm_up():
+    """Open the DynamoDB connection, prime the active prompt cache and load the request model"""
+    import lib.models
+    await SERVICES['db_service'].get_active_prompt()
 
-    # Get HTTP method and path
-    http_method = event['httpMethod']
-    path = event['path']
+ROUTER = Router([
+    Route('GET', '/prompts', get_prompts),
+    Route('POST', '/prompts', create_prompt),
+    Route('PUT', '/prompts', update_prompt),
+    Route('DELETE', '/prompts', delete_prompt)
+], warmup=warm_up)
 
-    # Create an event loop
-    loop = asyncio.get_event_loop()
+register_snapshot_hooks(ROUTER.warm_up, SERVICES['db_service'].clear_caches)
+
+def handler(event, context):
+    """Main handler function for Lambda"""
+    return ROUTER.dispatch(event, context)
 
-    try:
-        # Route requests to appropriate handler
-        if http_method == 'GET' and path.startswith('/prompts'):
-            return loop.run_until_complete(get_prompts(event, context))
-        if http_method == 'POST' and path.startswith('/prompts'):
-            return loop.run_until_complete(create_prompt(event, context))
-        if http_method == 'PUT' and path.startswith('/prompts'):
-            return loop.run_until_complete(update_prompt(event, context))
-        if http_method == 'DELETE' and path.startswith('/prompts'):
-            return loop.run_until_complete(delete_prompt(event, context))
-
-        return create_api_response(404, {'detail': 'Not Found'})
-    except Exception as e:
-        LOGGER.error("Error processing request: %s", str(e))
-        return create_api_response(500, {'detail': str(e)})
 
 if __name__ == '__main__':
     handler(event=None, context=None)
@@ -2,14 +2,19 @@
 # SPDX-License-Identifier: MIT-0
 """Strands Agent for Document Verification"""
 
+import os
 import json
 import logging
-from dotenv import load_dotenv
-import boto3
-import asyncio
-from lib.utils import create_api_response
+from lib.utils import create_api_response, load_local_env, validate_body
 from lib.document_verification_agent import DocumentVerificationAgent
 from lib.models import AgentRequest
+from lib.job_queue import SQSJobQueue, is_queue_event, process_records
+from lib.notifications import CompletionNotifier
+from lib.deadline import set_deadline
+from lib.router import Route, Router, run
+from lib.request_logging import log_request
+from lib.warmup import register_snapshot_hooks
+from lib.services import get_client, get_service
 
 # Import the extend_dynamodb_service function
 from lib.dynamodb_extensions import extend_dynamodb_service
@@ -19,27 +24,39 @@ logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_local_env()
 
 def initialize_services():
     """Initialize services at module level"""
 
-    bedrock_client = boto3.client("bedrock-runtime")
+    bedrock_client = get_client("bedrock-runtime")
 
     # Import these here to avoid circular imports
     from lib.dynamodb import DynamoDBService
     from lib.s3 import S3Service
 
-    s3_service = S3Service()
-    db_service = DynamoDBService()
+    s3_service = get_service('s3_service', S3Service)
 
     # Extend the DynamoDBService with agent verification methods
-    db_service = extend_dynamodb_service(db_service)
+    db_service = extend_dynamodb_service(get_service('db_service', DynamoDBService))
+
+    # Queue verification jobs when a queue is configured
+    queue_url = os.getenv('FDP_SQS_STRANDS')
+    job_queue = get_service('job_queue', lambda: SQSJobQueue(queue_url)) if queue_url else None
+
+    # Send signed results to the destinations given by API clients
+    notifier = get_service('notifier', lambda: CompletionNotifier(
+        os.getenv('FDP_CALLBACK_SECRET_ID'),
+        os.getenv('FDP_SQS_CALLBACK_DLQ'),
+        job_queue
+    ))
 
     return {
         'bedrock_client': bedrock_client,
         's3_service': s3_service,
-        'db_service': db_service
+        'db_service': db_service,
+        'job_queue': job_queue,
+        'notifier': notifier
     }
 
 # Initialize services at module level
@@ -50,21 +67,16 @@ AGENT = DocumentVerificationAgent(SERVICES, LOGGER)
 
 async def start_verification(event, context):
     """POST method for /strands"""
-    LOGGER.info("Received start verification request")
+    LOGGER.debug("Received start verification request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Parse request body
         body = event.get('body')
         if not body:
             return create_api_response(400, {'detail': 'No body found in request'})
 
-        if isinstance(body, str):
-            body = json.loads(body)
-
-        request = AgentRequest(**body)
+        # Validated from the raw JSON, without an intermediate dict
+        request = validate_body(event, AgentRequest)
 
         # Start the verification process
         result = await AGENT.start_verification(request)
@@ -77,14 +89,29 @@ async def start_verification(event, context):
         LOGGER.error("Error: %s", str(e), exc_info=True)
         return create_api_response(500, {'detail': str(e)})
 
+def get_wait_seconds(wait, context) -> float:
+    """Get the long poll wait, capped by FDP_MAX_WAIT_SECONDS and the remaining invocation time"""
+    try:
+        wait = float(wait or 0)
+    except ValueError:
+        return 0.0
+
+    wait = min(wait, float(os.getenv('FDP_MAX_WAIT_SECONDS', '10')))
+    if context is not None:
+        # Leave time to read the verification and return the response
+        wait = min(wait, context.get_remaining_time_in_millis() / 1000 - 2)
+    return max(wait, 0.0)
+
 async def get_verification_status(event, context):
-    """GET method for /strands/{verification_id}"""
-    LOGGER.info("Received get verification status request")
+    """
+    GET method for /strands/{verification_id}
 
-    try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
+    With ?wait=<seconds> the request is held until the verification changes,
+    ?since=<updated_at> sets the version the client already has.
+    """
+    LOGGER.debug("Received get verification status request")
 
+    try:
         # Get verification_id from path parameters
         path_params = event.get('pathParameters') or {}
         verification_id = path_params.get('verification_id')
@@ -92,6 +119,12 @@ async def get_verification_status(event, context):
         if not verification_id:
             return create_api_response(400, {'detail': 'No verification_id found in request'})
 
+        # Hold the request until the verification changes when asked to wait
+        query_params = event.get('queryStringParameters') or {}
+        wait = get_wait_seconds(query_params.get('wait'), context)
+        if wait > 0:
+            await AGENT.wait_for_verification_change(verification_id, query_params.get('since'), wait)
+
         # Get verification status
         result = await AGENT.get_verification_status(verification_id)
         if not result:
@@ -105,12 +138,9 @@ async def get_verification_status(event, context):
 
 async def provide_additional_info(event, context):
     """PUT method for /strands/{verification_id}"""
-    LOGGER.info("Received provide additional info request")
+    LOGGER.debug("Received provide additional info request")
 
     try:
-        if event.get('httpMethod') == 'OPTIONS':
-            return create_api_response(200, {})
-
         # Get verification_id from path parameters
         path_params = event.get('pathParameters') or {}
         verification_id = path_params.get('verification_id')
@@ -123,7 +153,7 @@ async def provide_additional_info(event, context):
         if not body:
             return create_api_response(400, {'detail': 'No body found in request'})
 
-        if isinstance(body, str):
+        if isinstance(body, (str, bytes)):
             body = json.loads(body)
 
         # Process additional information
@@ -134,43 +164,36 @@ async def provide_additional_info(event, context):
         LOGGER.error("Error: %s", str(e), exc_info=True)
         return create_api_response(500, {'detail': str(e)})
 
-def handler(event, context):
-    """Main handler function for Lambda"""
-    LOGGER.info("Received event: %s", json.dumps(event))
+async def process_jobs(event, context):
+    """SQS worker for queued verification jobs"""
+    records = event.get('Records', [])
+    LOGGER.info("Received %d verification jobs", len(records))
 
-    # Get HTTP method and path
-    http_method = event['httpMethod']
-    path = event['path']
+    parallelism = int(os.getenv('FDP_WORKER_PARALLELISM', '4'))
+    return await process_records(records, AGENT.process_job, parallelism)
 
-    # Create a new event loop for each request
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+async def warm_up():
+    """Prime the config snapshot, the presign signer and the Strands imports"""
+    import strands.models # pylint: disable=import-outside-toplevel,unused-import
+    await SERVICES['db_service'].get_config_snapshot()
+    SERVICES['s3_service'].warm_up()
 
-    try:
-        # Route requests to appropriate handler
-        if http_method == 'POST' and path.endswith('/strands'):
-            # Create a fresh coroutine object
-            coro = start_verification(event, context)
-            result = loop.run_until_complete(coro)
-            return result
-        elif http_method == 'GET' and '/strands/' in path:
-            # Create a fresh coroutine object
-            coro = get_verification_status(event, context)
-            result = loop.run_until_complete(coro)
-            return result
-        elif http_method == 'PUT' and '/strands/' in path:
-            # Create a fresh coroutine object
-            coro = provide_additional_info(event, context)
-            result = loop.run_until_complete(coro)
-            return result
-
-        return create_api_response(404, {'detail': 'Not Found'})
-    except Exception as e:
-        LOGGER.error("Error processing request: %s", str(e), exc_info=True)
-        return create_api_response(500, {'detail': str(e)})
-    finally:
-        # Clean up the event loop
-        loop.close()
+ROUTER = Router([
+    Route('POST', '/strands', start_verification),
+    Route('GET', '/strands/{verification_id}', get_verification_status),
+    Route('PUT', '/strands/{verification_id}', provide_additional_info)
+], warmup=warm_up)
+
+register_snapshot_hooks(ROUTER.warm_up, SERVICES['db_service'].clear_caches)
+
+def handler(event, context):
+    """Main handler function for Lambda"""
+    if is_queue_event(event):
+        set_deadline(context)
+        with log_request(event, context):
+            return run(process_jobs(event, context))
+
+    return ROUTER.dispatch(event, context)
 
 if __name__ == '__main__':
     handler(event=None, context=None)
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { 
   Box, 
   Button, 
@@ -68,6 +68,10 @@ const ConfidenceIndicator = styled(Box)(({ theme, value }) => ({
   }
 }));
 
+// Seconds the status endpoint holds a poll open until the verification changes
+const LONG_POLL_WAIT_SECONDS = 10;
+const FINAL_STATUSES = ['completed', 'rejected', 'failed'];
+
 const StrandsVerification = ({ accessToken }) => {
   const [file, setFile] = useState(null);
   const [preview, setPreview] = useState('');
@@ -75,7 +79,8 @@ const StrandsVerification = ({ accessToken }) => {
   const [verificationId, setVerificationId] = useState(null);
   const [verificationStatus, setVerificationStatus] = useState(null);
   const [additionalInfo, setAdditionalInfo] = useState('');
-  const [statusPolling, setStatusPolling] = useState(null);
+  // Verification being long polled, cleared to stop polling
+  const pollingRef = useRef(null);
 
   const { getRootProps, getInputProps } = useDropzone({
     accept: {
@@ -95,12 +100,10 @@ const StrandsVerification = ({ accessToken }) => {
 
   useEffect(() => {
     return () => {
-      // Clean up polling when component unmounts
-      if (statusPolling) {
-        clearInterval(statusPolling);
-      }
+      // Stop polling when component unmounts
+      pollingRef.current = null;
     };
-  }, [statusPolling]);
+  }, []);
 
   const handleStartVerification = async () => {
     if (!file) return;
@@ -124,12 +127,8 @@ const StrandsVerification = ({ accessToken }) => {
         
         setVerificationId(response.verification_id);
         
-        // Start polling for status updates
-        const interval = setInterval(() => {
-          fetchVerificationStatus(response.verification_id);
-        }, 3000);
-        
-        setStatusPolling(interval);
+        // Start long polling for status updates
+        pollVerificationStatus(response.verification_id);
       };
     } catch (error) {
       console.error('Error starting verification:', error);
@@ -138,16 +137,40 @@ const StrandsVerification = ({ accessToken }) => {
     }
   };
 
+  const pollVerificationStatus = async (id) => {
+    // One request at a time, each held open by the API until the verification
+    // changes from the version we already have
+    pollingRef.current = id;
+    let since = null;
+    while (pollingRef.current === id) {
+      try {
+        const params = new URLSearchParams({ wait: LONG_POLL_WAIT_SECONDS });
+        if (since) {
+          params.set('since', since);
+        }
+        const status = await apiGet(`/agent/verify/${id}?${params}`, accessToken, {});
+        if (pollingRef.current !== id) {
+          break;
+        }
+        setVerificationStatus(status);
+        since = status.updated_at || since;
+
+        // Stop polling if verification is complete or failed
+        if (FINAL_STATUSES.includes(status.status)) {
+          pollingRef.current = null;
+        }
+      } catch (error) {
+        console.error('Error fetching verification status:', error);
+        // Back off before polling again
+        await new Promise(resolve => setTimeout(resolve, 3000));
+      }
+    }
+  };
+
   const fetchVerificationStatus = async (id) => {
     try {
       const status = await apiGet(`/agent/verify/${id}`, accessToken, {});
       setVerificationStatus(status);
-      
-      // Stop polling if verification is complete or failed
-      if (status.status === 'completed' || status.status === 'failed') {
-        clearInterval(statusPolling);
-        setStatusPolling(null);
-      }
     } catch (error) {
       console.error('Error fetching verification status:', error);
     }
@@ -56,6 +56,11 @@ data "terraform_remote_state" "vpc" {
   }
 }
 
+data "aws_secretsmanager_random_password" "callbacks" {
+  password_length     = 64
+  exclude_punctuation = true
+}
+
 data "aws_iam_policy_document" "this" {
   statement {
     effect  = "Allow"
@@ -107,4 +112,72 @@ data "aws_iam_policy_document" "this" {
       format("arn:%s:bedrock:%s::foundation-model/*", data.aws_partition.this.id, data.aws_region.this.region),
     ]
   }
+
+  statement {
+    effect  = "Allow"
+    actions = [
+      "bedrock:CreateModelInvocationJob",
+      "bedrock:GetModelInvocationJob",
+    ]
+    resources = [
+      format("arn:%s:bedrock:%s::foundation-model/*", data.aws_partition.this.id, data.aws_region.this.region),
+      format("arn:%s:bedrock:%s:%s:model-invocation-job/*", data.aws_partition.this.id, data.aws_region.this.region, data.aws_caller_identity.this.account_id),
+    ]
+  }
+
+  statement {
+    effect  = "Allow"
+    actions = [
+      "sqs:SendMessage",
+      "sqs:ReceiveMessage",
+      "sqs:DeleteMessage",
+      "sqs:GetQueueAttributes",
+    ]
+    resources = [aws_sqs_queue.jobs.arn]
+  }
+
+  statement {
+    effect    = "Allow"
+    actions   = ["secretsmanager:GetSecretValue"]
+    resources = [aws_secretsmanager_secret.callbacks.arn]
+  }
+
+  statement {
+    effect    = "Allow"
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.callbacks.arn]
+  }
+
+  dynamic "statement" {
+    for_each = length(local.notify_topics) > 0 ? [local.notify_topics] : []
+    content {
+      effect    = "Allow"
+      actions   = ["sns:Publish"]
+      resources = statement.value
+    }
+  }
+
+  dynamic "statement" {
+    for_each = length(local.notify_queues) > 0 ? [local.notify_queues] : []
+    content {
+      effect    = "Allow"
+      actions   = ["sqs:SendMessage"]
+      resources = statement.value
+    }
+  }
+
+  dynamic "statement" {
+    for_each = lookup(var.q, "batch_role_arn", "") != "" ? [var.q.batch_role_arn] : []
+    content {
+      effect    = "Allow"
+      actions   = ["iam:PassRole"]
+      resources = [statement.value]
+
+      condition {
+        test     = "StringEquals"
+        variable = "iam:PassedToService"
+        values   = ["bedrock.amazonaws.com"]
+      }
+    }
+  }
 }
@@ -6,21 +6,37 @@ locals {
     try(trimspace(var.fdp_gid), "") == ""
     ? data.terraform_remote_state.s3.outputs.fdp_gid : var.fdp_gid
   )
+  notify_topics = compact([for arn in split(",", lookup(var.q, "notify_topics", "")) : trimspace(arn)])
+  notify_queues = compact([for arn in split(",", lookup(var.q, "notify_queues", "")) : trimspace(arn)])
   env_vars = {
-    FDP_ID              = local.fdp_gid
-    FDP_LOGGING         = var.q.logging
-    FDP_ACCOUNT         = data.aws_caller_identity.this.account_id
-    FDP_REGION          = data.aws_region.this.region
-    FDP_CHECK_REGION    = data.terraform_remote_state.s3.outputs.region2
-    FDP_API_URL         = data.terraform_remote_state.cognito.outputs.api_url
-    FDP_AUTH_URL        = data.terraform_remote_state.cognito.outputs.auth_url
-    FDP_DDB_TABLES      = jsonencode(data.terraform_remote_state.dynamodb.outputs.id)
-    FDP_DDB_AGENT       = lookup(data.terraform_remote_state.dynamodb.outputs.id, "agent", null)
-    FDP_DDB_CONFIG      = lookup(data.terraform_remote_state.dynamodb.outputs.id, "config", null)
-    FDP_DDB_PROMPT      = lookup(data.terraform_remote_state.dynamodb.outputs.id, "prompt", null)
-    FDP_DDB_STRANDS     = lookup(data.terraform_remote_state.dynamodb.outputs.id, "strands", null)
-    FDP_S3_BUCKET       = data.terraform_remote_state.s3.outputs.id
-    SECRETS_MANAGER_TTL = var.q.secrets_manager_ttl
+    FDP_ID                 = local.fdp_gid
+    FDP_LOGGING            = var.q.logging
+    FDP_LOG_SAMPLE_RATE    = var.q.log_debug_sample_rate
+    FDP_ACCOUNT            = data.aws_caller_identity.this.account_id
+    FDP_REGION             = data.aws_region.this.region
+    FDP_CHECK_REGION       = data.terraform_remote_state.s3.outputs.region2
+    FDP_API_URL            = data.terraform_remote_state.cognito.outputs.api_url
+    FDP_AUTH_URL           = data.terraform_remote_state.cognito.outputs.auth_url
+    FDP_DDB_TABLES         = jsonencode(data.terraform_remote_state.dynamodb.outputs.id)
+    FDP_DDB_AGENT          = lookup(data.terraform_remote_state.dynamodb.outputs.id, "agent", null)
+    FDP_DDB_CONFIG         = lookup(data.terraform_remote_state.dynamodb.outputs.id, "config", null)
+    FDP_DDB_PROMPT         = lookup(data.terraform_remote_state.dynamodb.outputs.id, "prompt", null)
+    FDP_DDB_STRANDS        = lookup(data.terraform_remote_state.dynamodb.outputs.id, "strands", null)
+    FDP_S3_BUCKET          = data.terraform_remote_state.s3.outputs.id
+    FDP_BATCH_ROLE_ARN     = lookup(var.q, "batch_role_arn", "")
+    FDP_BATCH_CONCURRENCY  = var.q.batch_concurrency
+    FDP_BATCH_MAX_ITEMS    = var.q.batch_max_items
+    FDP_BATCH_MIN_RECORDS  = var.q.batch_min_records
+    FDP_SQS_STRANDS        = aws_sqs_queue.jobs.url
+    FDP_SQS_CALLBACK_DLQ   = aws_sqs_queue.callbacks.url
+    FDP_CALLBACK_SECRET_ID = aws_secretsmanager_secret.callbacks.id
+    FDP_CALLBACK_HOSTS     = lookup(var.q, "callback_hosts", "")
+    FDP_CALLBACK_ATTEMPTS  = var.q.callback_max_attempts
+    FDP_NOTIFY_TOPICS      = join(",", local.notify_topics)
+    FDP_NOTIFY_QUEUES      = join(",", local.notify_queues)
+    FDP_WORKER_PARALLELISM = var.q.worker_parallelism
+    FDP_JOB_MAX_RECEIVES   = var.q.queue_max_receive_count
+    SECRETS_MANAGER_TTL    = var.q.secrets_manager_ttl
   }
   iam_policies_arns = [
     "arn:${data.aws_partition.this.partition}:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole",
@@ -12,7 +12,7 @@ module "lambda" {
   handler       = var.q.handler
   runtime       = var.q.runtime
   memory_size   = var.q.memory_size
-  timeout       = var.q.timeout
+  timeout       = lookup(var.r[count.index], "timeout", var.q.timeout)
   tracing_mode  = var.q.tracing_mode
   store_on_s3   = true
   s3_bucket     = var.fdp_backend_bucket[data.aws_region.this.region]
@@ -66,3 +66,55 @@ resource "aws_sqs_queue" "this" {
   name                    = format("%s-lambda-dlq-%s", var.r[count.index]["name"], local.fdp_gid)
   sqs_managed_sse_enabled = var.q.sqs_managed_sse_enabled
 }
+
+resource "aws_sqs_queue" "jobs" {
+  #checkov:skip=CKV_AWS_27:This solution leverages KMS encryption using AWS managed keys instead of CMKs (false positive)
+
+  name                       = format("fdp-strands-jobs-%s", local.fdp_gid)
+  sqs_managed_sse_enabled    = var.q.sqs_managed_sse_enabled
+  visibility_timeout_seconds = var.q.queue_visibility_timeout
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.jobs_dlq.arn
+    maxReceiveCount     = var.q.queue_max_receive_count
+  })
+}
+
+resource "aws_sqs_queue" "jobs_dlq" {
+  #checkov:skip=CKV_AWS_27:This solution leverages KMS encryption using AWS managed keys instead of CMKs (false positive)
+
+  name                    = format("fdp-strands-jobs-dlq-%s", local.fdp_gid)
+  sqs_managed_sse_enabled = var.q.sqs_managed_sse_enabled
+}
+
+resource "aws_lambda_event_source_mapping" "jobs" {
+  event_source_arn        = aws_sqs_queue.jobs.arn
+  function_name           = module.lambda[index(var.r[*].key, "strands")].lambda_function_arn
+  batch_size              = var.q.queue_batch_size
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+resource "aws_sqs_queue" "callbacks" {
+  #checkov:skip=CKV_AWS_27:This solution leverages KMS encryption using AWS managed keys instead of CMKs (false positive)
+
+  name                    = format("fdp-strands-callbacks-dlq-%s", local.fdp_gid)
+  sqs_managed_sse_enabled = var.q.sqs_managed_sse_enabled
+}
+
+resource "aws_secretsmanager_secret" "callbacks" {
+  #checkov:skip=CKV2_AWS_57:The signing secret is shared with API clients and rotated manually
+  #checkov:skip=CKV_AWS_149:This solution leverages KMS encryption using AWS managed keys instead of CMKs (false positive)
+
+  name                    = format("fdp-strands-callbacks-%s-%s", data.aws_region.this.region, local.fdp_gid)
+  description             = "FDP STRANDS CALLBACK SIGNING SECRET"
+  recovery_window_in_days = 0
+}
+
+resource "aws_secretsmanager_secret_version" "callbacks" {
+  secret_id     = aws_secretsmanager_secret.callbacks.id
+  secret_string = data.aws_secretsmanager_random_password.callbacks.random_password
+
+  lifecycle {
+    ignore_changes = [secret_string]
+  }
+}
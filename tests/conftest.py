@@ -0,0 +1,12 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Make the shared lib package importable the way the handlers import it"""
+
+import os
+import sys
+
+# Function directories link lib to app/api/_lib
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'api', 'strands-agent')
+
+sys.path.insert(0, FUNCTION_DIR)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
@@ -0,0 +1,88 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from datetime import date
+import pytest
+from lib.consistency_rules import check_consistency, parse_date
+
+@pytest.mark.parametrize('value, expected', [
+    ('1974-08-12', date(1974, 8, 12)),
+    ('1974/08/12', date(1974, 8, 12)),
+    ('12 Aug 1974', date(1974, 8, 12)),
+    ('12 August 1974', date(1974, 8, 12)),
+    ('August 12, 1974', date(1974, 8, 12)),
+    (' 12-Aug-1974 ', date(1974, 8, 12)),
+    ('25/12/1990', date(1990, 12, 25)),
+    ('12/25/1990', date(1990, 12, 25)),
+    ('07.07.2001', date(2001, 7, 7))
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+@pytest.mark.parametrize('value', [
+    '03/04/2020',
+    '31/02/2020',
+    '1974-13-01',
+    'not a date',
+    ''
+])
+def test_ambiguous_or_invalid_dates_are_not_parsed(value):
+    assert parse_date(value) is None
+
+TODAY = date(2024, 6, 1)
+PASSPORT = {
+    'full_name': 'Anna Maria Eriksson',
+    'date_of_birth': '1974-08-12',
+    'passport_number': 'L898902C3',
+    'issue_date': '2020-04-16',
+    'expiry_date': '2030-04-15'
+}
+
+def test_consistent_fields_pass_every_check():
+    result = check_consistency(PASSPORT, 'Passport', TODAY)
+
+    assert result == {'is_consistent': True, 'confidence': 1.0, 'inconsistencies': [], 'source': 'rules'}
+
+def test_fields_that_contradict_each_other_are_inconsistent():
+    fields = {**PASSPORT, 'passport_number': 'L8989-02C3', 'issue_date': '1970-01-01'}
+
+    result = check_consistency(fields, 'Passport', TODAY)
+
+    assert not result['is_consistent']
+    assert result['inconsistencies'] == [
+        'Document number has an invalid format: L8989-02C3',
+        'Issue date is before the date of birth'
+    ]
+    assert 0 < result['confidence'] < 1
+
+def test_expired_document_is_inconsistent():
+    result = check_consistency({**PASSPORT, 'expiry_date': '15 Apr 2024'}, 'Passport', TODAY)
+
+    assert result['inconsistencies'] == ['Document expired on 2024-04-15']
+
+def test_birth_certificates_do_not_expire():
+    fields = {'name': 'Anna Maria Eriksson', 'date_of_birth': '1974-08-12', 'expiry_date': '2000-01-01'}
+
+    assert check_consistency(fields, 'Birth certificate', TODAY)['is_consistent']
+
+def test_missing_required_fields_are_inconsistent():
+    result = check_consistency({'full_name': 'Anna Maria Eriksson', 'dob': '1974-08-12'}, 'Passport', TODAY)
+
+    assert result['inconsistencies'] == [
+        'Missing required field: document_number',
+        'Missing required field: expiry_date'
+    ]
+
+def test_mismatches_count_as_failed_checks():
+    result = check_consistency(PASSPORT, 'Passport', TODAY, mismatches=['Document number does not match the MRZ'])
+
+    assert result['inconsistencies'] == ['Document number does not match the MRZ']
+    assert result['confidence'] < check_consistency(PASSPORT, 'Passport', TODAY)['confidence']
+
+@pytest.mark.parametrize('fields, document_type', [
+    (PASSPORT, 'Utility bill'),
+    ({}, 'Passport'),
+    ({**PASSPORT, 'date_of_birth': '03/04/1974'}, 'Passport')
+])
+def test_inconclusive_rules_return_none(fields, document_type):
+    assert check_consistency(fields, document_type, TODAY) is None
@@ -0,0 +1,165 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+import base64
+import logging
+import pytest
+from lib import document_analyzer
+from lib.batch_inference import LocalBatchInferenceService
+from lib.bedrock import get_image_s3_uri
+from lib.document_analyzer import DocumentAnalyzer
+from lib.utils import decode_base64_image
+
+VALID_IMAGE = base64.b64encode(b'document image').decode('ascii')
+INVALID_IMAGE = 'not base64!'
+
+class FakeDatabase:
+    """Configuration and verification storage of one analysis"""
+
+    def __init__(self):
+        self.snapshots = 0
+        self.saved = []
+        self.usage = []
+
+    async def get_active_prompt(self):
+        return {'pk': 'prompt-1', 'role': 'Document analyst', 'tasks': 'Analyze this document'}
+
+    async def get_active_model_config(self):
+        return {'sk': 'LITE', 'value': 'model-1'}
+
+    async def get_config_snapshot(self, config_types):
+        self.snapshots += 1
+        return {config_type: [] for config_type in config_types}
+
+    async def save_verification(self, verification):
+        self.saved.append(verification)
+        return verification
+
+    async def get_cached_configurations(self, config_type):
+        return []
+
+    async def get_configurations(self, config_type):
+        return [{'sk': 'LITE', 'value': 'model-1'}]
+
+    async def save_verifications(self, verifications):
+        saved_pks = {verification['pk'] for verification in self.saved}
+        new = [verification for verification in verifications if verification['pk'] not in saved_pks]
+        self.saved.extend(new)
+        return new
+
+    async def record_model_usage(self, usage_log, prompt_id=None, prompt_version=None):
+        self.usage.extend(usage_log)
+
+class FakeStorage:
+    """S3 service that decodes uploads like the real one"""
+
+    def upload_base64_image(self, base64_string):
+        decode_base64_image(base64_string)
+        return 'documents/image.jpg'
+
+    def get_s3_uri(self, file_key):
+        return f"s3://bucket/{file_key}"
+
+    def get_file_key(self, s3_uri):
+        return s3_uri.replace("s3://bucket/", '', 1)
+
+    def get_presigned_url(self, file_key):
+        return f"https://bucket/{file_key}"
+
+class Analyzer(DocumentAnalyzer):
+    """Document analyzer answering every document without calling Bedrock"""
+
+    async def _invoke_model(self, image_base64, active_prompt, active_model, inference_configs,
+                            usage_log=None, image_s3_uri=None):
+        return "Document Type: Passport\nConfidence Score: 90"
+
+def get_analyzer():
+    services = {'db_service': FakeDatabase(), 's3_service': FakeStorage(), 'bedrock_client': None}
+    return Analyzer(services, logging.getLogger(__name__))
+
+def test_failed_document_does_not_stop_the_batch():
+    analyzer = get_analyzer()
+
+    result = asyncio.run(analyzer.analyze_documents([VALID_IMAGE, INVALID_IMAGE, VALID_IMAGE]))
+
+    assert (result['total'], result['succeeded'], result['failed']) == (3, 2, 1)
+    assert [item['index'] for item in result['items']] == [0, 1, 2]
+    assert [item['status'] for item in result['items']] == ['completed', 'failed', 'completed']
+    assert result['items'][1]['error'] == "Invalid base64 image data"
+    assert result['items'][0]['result']['document_type'] == 'Passport'
+    assert len(analyzer.db_service.saved) == 2
+    # One configuration snapshot is shared by the whole batch
+    assert analyzer.db_service.snapshots == 1
+
+@pytest.mark.parametrize('images', [[], [VALID_IMAGE] * (document_analyzer.BATCH_MAX_ITEMS + 1)])
+def test_batch_size_is_validated(images):
+    with pytest.raises(ValueError):
+        asyncio.run(get_analyzer().analyze_documents(images))
+
+def respond(model_id, model_input):
+    """Batch model output naming the document of each record"""
+    name = get_image_s3_uri(model_input).rsplit('/', 1)[-1]
+    return {
+        'output': {'message': {'content': [{'text': f"Document Type: {name}\nConfidence Score: 90"}]}},
+        'usage': {'inputTokens': 100, 'outputTokens': 10}
+    }
+
+def test_batch_results_are_ingested_once_per_document(tmp_path):
+    analyzer = get_analyzer()
+    analyzer.batch_service = LocalBatchInferenceService(str(tmp_path), respond)
+    file_keys = [f"documents/{index:03d}.jpg" for index in range(document_analyzer.BATCH_INFERENCE_MIN_RECORDS)]
+
+    job = asyncio.run(analyzer.submit_batch_verifications(file_keys))
+    result = asyncio.run(analyzer.ingest_batch_verifications(job['job_arn']))
+
+    assert job['record_count'] == len(file_keys)
+    assert (result['status'], result['saved_count']) == ('Completed', len(file_keys))
+    assert {item['file_key']: item['document_type'] for item in analyzer.db_service.saved} == {
+        file_key: file_key.rsplit('/', 1)[-1] for file_key in file_keys
+    }
+    assert {item['model_id'] for item in analyzer.db_service.saved} == {'model-1'}
+    assert len(analyzer.db_service.usage) == len(file_keys)
+
+    # Ingesting the job again saves nothing and records no usage
+    result = asyncio.run(analyzer.ingest_batch_verifications(job['job_arn']))
+    assert result['saved_count'] == 0
+    assert len(analyzer.db_service.saved) == len(file_keys)
+    assert len(analyzer.db_service.usage) == len(file_keys)
+
+def test_batch_inference_below_the_minimum_fails_fast(tmp_path):
+    analyzer = get_analyzer()
+    analyzer.batch_service = LocalBatchInferenceService(str(tmp_path), respond)
+
+    with pytest.raises(ValueError):
+        asyncio.run(analyzer.submit_batch_verifications(['documents/000.jpg']))
+    assert not list(tmp_path.iterdir())
+
+class CascadeAnalyzer(DocumentAnalyzer):
+    """Document analyzer answering with the output given for each model"""
+
+    def __init__(self, outputs):
+        super().__init__({'db_service': FakeDatabase(), 's3_service': FakeStorage(), 'bedrock_client': None},
+                         logging.getLogger(__name__))
+        self.outputs = outputs
+        self.invoked = []
+
+    async def _invoke_model(self, image_base64, active_prompt, active_model, inference_configs,
+                            usage_log=None, image_s3_uri=None):
+        self.invoked.append(active_model['sk'])
+        return self.outputs[active_model['sk']]
+
+@pytest.mark.parametrize('lite_output, decided_by', [
+    ("Document Type: Passport\nConfidence Score: 95", ['LITE']),
+    ("Document Type: Passport\nConfidence Score: 60", ['LITE', 'PRO']),
+    ("Document Type: Passport", ['LITE', 'PRO'])
+])
+def test_cascade_escalates_uncertain_and_unparseable_output(lite_output, decided_by):
+    analyzer = CascadeAnalyzer({'LITE': lite_output, 'PRO': "Document Type: Passport\nConfidence Score: 90"})
+    tiers = [{'sk': 'LITE', 'value': 'model-1'}, {'sk': 'PRO', 'value': 'model-2'}]
+
+    _, model = asyncio.run(analyzer._invoke_cascade( # pylint: disable=protected-access
+        VALID_IMAGE, {}, {}, {'lower_bound': 0.5, 'upper_bound': 0.8}, tiers=tiers))
+
+    assert analyzer.invoked == decided_by
+    assert model['sk'] == decided_by[-1]
@@ -0,0 +1,283 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from botocore.exceptions import ClientError
+from lib.deadline import DEADLINE, remaining_seconds
+from lib.document_verification_agent import DocumentVerificationAgent
+from lib.job_queue import MAX_RECEIVES
+from lib.models import AgentRequest, VerificationStatus
+from lib.session_store import CURRENT_VERIFICATION_ID
+
+ANALYSIS = {'document_type': 'passport', 'image_quality': 'high', 'confidence': 0.9}
+
+def get_agent():
+    services = {'db_service': None, 's3_service': None, 'bedrock_client': None}
+    return DocumentVerificationAgent(services, logging.getLogger(__name__))
+
+def test_tools_called_from_a_worker_thread_use_the_verification_session():
+    agent = get_agent()
+    agent.sessions.get('verification-1')['analysis_result'] = ANALYSIS
+    agent.sessions.get('verification-2')['analysis_result'] = {**ANALYSIS, 'document_type': 'id card'}
+
+    async def run():
+        CURRENT_VERIFICATION_ID.set('verification-1')
+        tool_executions = []
+        tools = agent._bind_tools('verification-1', tool_executions, []) # pylint: disable=protected-access
+        analyze_tool = next(tool for tool in tools if tool.__name__ == '_analyze_document_image')
+
+        # Strands runs tools on its own executor, which does not copy context variables
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, analyze_tool, {'toolUseId': 'tool-1', 'input': {}})
+        return result, tool_executions
+
+    result, tool_executions = asyncio.run(run())
+
+    assert result['status'] == 'success'
+    assert "'document_type': 'passport'" in result['content'][0]['text']
+    assert tool_executions == [{
+        'tool_name': 'analyze_document_image',
+        'tool_input': {'image_base64': ''},
+        'result': ANALYSIS
+    }]
+
+def test_tools_run_under_the_deadline_of_the_verification():
+    agent = get_agent()
+    remaining = []
+
+    async def analyze(image_base64: str = ""):
+        remaining.append((CURRENT_VERIFICATION_ID.get(), remaining_seconds()))
+        return ANALYSIS
+
+    async def run():
+        DEADLINE.set(time.monotonic() + 60)
+        agent._analyze_document_image = analyze # pylint: disable=protected-access
+        tools = agent._bind_tools('verification-1', [], []) # pylint: disable=protected-access
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await asyncio.get_running_loop().run_in_executor(executor, tools[0], {'toolUseId': 'tool-1', 'input': {}})
+
+    asyncio.run(run())
+
+    verification_id, seconds = remaining[0]
+    assert verification_id == 'verification-1'
+    assert 0 < seconds <= 60
+
+def run_pipeline(early_exit_enabled, authenticity):
+    """Run the pipeline with tools that record their calls, return the calls and the result"""
+    agent = get_agent()
+    calls = []
+    results = []
+    both_started = asyncio.Event()
+
+    async def analyze(image_base64: str = ""):
+        calls.append('analyze')
+        agent.agent_memory['analysis_result'] = ANALYSIS
+        return ANALYSIS
+
+    async def verify(image_base64: str = "", document_type: str = ""):
+        calls.append('verify')
+        if not early_exit_enabled:
+            # Returns only once extraction has started alongside it
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+        if early_exit_enabled and not authenticity['is_authentic']:
+            agent.agent_memory['early_exit'] = {'step': 'verify_document_authenticity', 'reason': 'Not authentic'}
+        return authenticity
+
+    async def extract(image_base64: str = "", document_type: str = ""):
+        calls.append('extract')
+        both_started.set()
+        return {'fields': {'name': 'Anna'}}
+
+    async def check(fields):
+        calls.append('check')
+        return {'is_consistent': True, 'inconsistencies': []}
+
+    async def process_agent_result(verification_id, result):
+        results.append(result)
+
+    agent._analyze_document_image = analyze # pylint: disable=protected-access
+    agent._verify_document_authenticity = verify # pylint: disable=protected-access
+    agent._extract_document_fields = extract # pylint: disable=protected-access
+    agent._check_document_consistency = check # pylint: disable=protected-access
+    agent._process_agent_result = process_agent_result # pylint: disable=protected-access
+
+    async def run():
+        CURRENT_VERIFICATION_ID.set('verification-1')
+        agent.agent_memory['early_exit_policy'] = {'enabled': early_exit_enabled}
+        await agent._run_pipeline('verification-1') # pylint: disable=protected-access
+
+    asyncio.run(run())
+    return calls, results[0]
+
+def test_pipeline_with_early_exit_skips_extraction_of_rejected_documents():
+    calls, result = run_pipeline(True, {'is_authentic': False, 'confidence': 0.95})
+
+    assert calls == ['analyze', 'verify']
+    assert result['response'] == 'Not authentic'
+
+def test_pipeline_with_early_exit_extracts_after_authenticity_passes():
+    calls, result = run_pipeline(True, {'is_authentic': True, 'confidence': 0.95})
+
+    assert calls == ['analyze', 'verify', 'extract', 'check']
+    assert [execution['tool_name'] for execution in result['tool_executions']] == [
+        'analyze_document_image', 'verify_document_authenticity', 'extract_document_fields',
+        'check_document_consistency'
+    ]
+
+def test_pipeline_without_early_exit_runs_authenticity_and_extraction_concurrently():
+    calls, result = run_pipeline(False, {'is_authentic': False, 'confidence': 0.95})
+
+    assert calls == ['analyze', 'verify', 'extract', 'check']
+    assert 'Authentic: False' in result['response']
+
+class FakeVerifications:
+    """Agent verification records kept in memory"""
+
+    def __init__(self, **records):
+        self.records = records
+
+    async def get_agent_verification(self, verification_id):
+        return dict(self.records[verification_id])
+
+    async def update_agent_verification(self, verification):
+        self.records[verification['pk']] = verification
+        return verification
+
+    async def get_cached_configurations(self, config_id):
+        return []
+
+class FailingQueue:
+    """Job queue that can't be reached"""
+
+    def send_job(self, job):
+        raise ConnectionError("Queue is unreachable")
+
+def throttled(operation):
+    return ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, operation)
+
+def get_failing_agent(error):
+    agent = get_agent()
+    agent.db_service = FakeVerifications(**{'verification-1': {'pk': 'verification-1', 'status': 'IN_PROGRESS'}})
+
+    async def run_pipeline(verification_id, document_type=None):
+        raise error
+
+    agent._run_pipeline = run_pipeline # pylint: disable=protected-access
+    return agent
+
+def start_job(receive_count=None):
+    job = {'action': 'start', 'verification_id': 'verification-1', 'pipeline_mode': 'pipeline'}
+    if receive_count is not None:
+        job['receive_count'] = receive_count
+    return job
+
+def test_retryable_error_is_raised_before_the_final_attempt():
+    agent = get_failing_agent(throttled('InvokeModel'))
+
+    with pytest.raises(ClientError):
+        asyncio.run(agent.process_job(start_job(receive_count=1)))
+    assert agent.db_service.records['verification-1']['status'] == 'IN_PROGRESS'
+
+def test_retryable_error_fails_the_verification_on_the_final_attempt():
+    agent = get_failing_agent(throttled('InvokeModel'))
+
+    asyncio.run(agent.process_job(start_job(receive_count=MAX_RECEIVES)))
+    assert agent.db_service.records['verification-1']['status'] == VerificationStatus.FAILED
+
+def test_permanent_error_fails_the_verification_at_once():
+    agent = get_failing_agent(KeyError('fields'))
+
+    asyncio.run(agent.process_job(start_job(receive_count=1)))
+    assert agent.db_service.records['verification-1']['status'] == VerificationStatus.FAILED
+
+def test_verification_fails_when_its_job_cant_be_queued():
+    agent = get_agent()
+    agent.db_service = FakeVerifications(**{'verification-1': {'pk': 'verification-1', 'status': 'IN_PROGRESS'}})
+    agent.job_queue = FailingQueue()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(agent._dispatch_job(start_job())) # pylint: disable=protected-access
+    record = agent.db_service.records['verification-1']
+    assert record['status'] == VerificationStatus.FAILED
+    assert 'could not be queued' in record['error']
+
+class RecordingS3:
+    """S3 service that records uploads"""
+
+    def __init__(self):
+        self.uploads = []
+
+    def upload_base64_image(self, image_base64):
+        self.uploads.append(image_base64)
+        return 'uploads/verification-1.jpg'
+
+def test_rejected_callback_url_uploads_nothing():
+    agent = get_agent()
+    agent.s3_service = RecordingS3()
+    request = AgentRequest(image_base64='aW1hZ2U=', metadata={'callback_url': 'http://example.com/callback'})
+
+    with pytest.raises(ValueError):
+        asyncio.run(agent.start_verification(request))
+    assert agent.s3_service.uploads == []
+
+class Notifier:
+    """Notifier whose deliveries succeed"""
+
+    def deliver(self, destination, body, attempt, timeout):
+        return {'status': 'delivered', 'attempts': attempt}
+
+def test_redelivered_notification_is_recorded_on_the_verification():
+    agent = get_agent()
+    agent.db_service = FakeVerifications(**{'verification-1': {'pk': 'verification-1', 'status': 'COMPLETED'}})
+    agent.notifier = Notifier()
+
+    asyncio.run(agent.process_job({
+        'action': 'notify',
+        'verification_id': 'verification-1',
+        'destination': {'callback_url': 'https://example.com/callback'},
+        'body': '{}',
+        'attempts': 1
+    }))
+    assert agent.db_service.records['verification-1']['callback_result'] == {'status': 'delivered', 'attempts': 2}
+
+MRZ = {
+    'document_code': 'P',
+    'issuing_country': 'UTO',
+    'document_number': 'L898902C3',
+    'nationality': 'UTO',
+    'date_of_birth': '1974-08-12',
+    'sex': 'F',
+    'expiry_date': '2099-04-15',
+    'surname': 'ERIKSSON',
+    'given_names': 'ANNA MARIA',
+    'valid': True
+}
+
+def check_with_mrz(mismatches):
+    """Run the consistency check of a verification with a validated MRZ"""
+    agent = get_agent()
+
+    async def run():
+        CURRENT_VERIFICATION_ID.set('verification-1')
+        agent.agent_memory['mrz_result'] = {**MRZ, 'mismatches': mismatches}
+        return await agent._check_document_consistency({'passport_number': 'L898902C3'}) # pylint: disable=protected-access
+
+    return asyncio.run(run())
+
+def test_validated_mrz_is_checked_without_the_model():
+    result = check_with_mrz([])
+
+    assert result == {'is_consistent': True, 'confidence': 1.0, 'inconsistencies': [], 'source': 'mrz'}
+
+def test_mrz_mismatches_make_the_document_inconsistent():
+    result = check_with_mrz(['Date of birth 12 Aug 1975 does not match the MRZ'])
+
+    assert not result['is_consistent']
+    assert result['inconsistencies'] == ['Date of birth 12 Aug 1975 does not match the MRZ']
+    assert result['source'] == 'mrz'
+    assert result['confidence'] < 1.0
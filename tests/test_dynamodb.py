@@ -0,0 +1,56 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+from lib.dynamodb import DynamoDBService
+from lib.utils import prompt_version
+
+PROMPT = {'pk': 'prompt-1', 'role': 'Document analyst', 'tasks': 'Analyze this document'}
+USAGE = {'model_id': 'model-1', 'input_tokens': 100, 'output_tokens': 10, 'latency_ms': 500}
+
+class UsageTable:
+    """Configuration table that applies usage ADD updates in memory"""
+
+    def __init__(self):
+        self.items = {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
+        item = self.items.setdefault(Key['sk'], {'pk': Key['pk'], 'sk': Key['sk']})
+        item['invocations'] = item.get('invocations', 0) + ExpressionAttributeValues[':one']
+        item['input_tokens'] = item.get('input_tokens', 0) + ExpressionAttributeValues[':input']
+
+def get_service():
+    db_service = DynamoDBService.__new__(DynamoDBService)
+    db_service.configs_table = UsageTable()
+
+    async def get_configurations(config_id):
+        return [dict(item) for item in db_service.configs_table.items.values()]
+
+    db_service.get_configurations = get_configurations
+    return db_service
+
+def test_usage_of_an_edited_prompt_is_kept_apart():
+    db_service = get_service()
+    edited = {**PROMPT, 'tasks': 'Analyze this document and list its fields'}
+
+    asyncio.run(db_service.record_model_usage([USAGE], PROMPT['pk'], prompt_version(PROMPT)))
+    asyncio.run(db_service.record_model_usage([USAGE, USAGE], edited['pk'], prompt_version(edited)))
+    stats = {item['sk']: item for item in asyncio.run(db_service.get_usage_stats())}
+
+    assert prompt_version(PROMPT) != prompt_version(edited)
+    assert prompt_version({**PROMPT, 'is_active': False}) == prompt_version(PROMPT)
+    assert stats['MODEL#model-1']['invocations'] == 3
+    assert stats['MODEL#model-1']['model_id'] == 'model-1'
+
+    original = stats[f"PROMPT#prompt-1#{prompt_version(PROMPT)}"]
+    assert (original['prompt_id'], original['prompt_version']) == ('prompt-1', prompt_version(PROMPT))
+    assert original['invocations'] == 1
+    assert stats[f"PROMPT#prompt-1#{prompt_version(edited)}"]['invocations'] == 2
+
+def test_usage_recorded_before_prompt_versions_has_no_version():
+    db_service = get_service()
+    db_service.configs_table.items['PROMPT#prompt-1'] = {'pk': 'USAGE_STATS', 'sk': 'PROMPT#prompt-1', 'invocations': 4}
+
+    stats = asyncio.run(db_service.get_usage_stats())
+
+    assert (stats[0]['prompt_id'], stats[0]['prompt_version']) == ('prompt-1', None)
@@ -0,0 +1,10 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from conftest import FUNCTION_DIR
+from lib.benchmarks import import_time_report
+
+def test_handler_imports_fit_the_cold_start_budget(monkeypatch):
+    monkeypatch.chdir(FUNCTION_DIR)
+    report = import_time_report()
+    assert report['within_budget'], report
@@ -0,0 +1,79 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+from lib.job_queue import MAX_RECEIVES, InMemoryJobQueue, is_final_attempt, is_queue_event, process_records
+
+def test_failed_jobs_are_reported_as_batch_item_failures():
+    queue = InMemoryJobQueue()
+    message_ids = [queue.send_job({'action': 'start', 'verification_id': str(index)}) for index in range(4)]
+    processed = []
+
+    async def process_job(job):
+        if job['verification_id'] in ('1', '3'):
+            raise RuntimeError("Job failed")
+        processed.append(job['verification_id'])
+
+    result = asyncio.run(process_records(queue.receive(), process_job))
+
+    assert result == {'batchItemFailures': [
+        {'itemIdentifier': message_ids[1]},
+        {'itemIdentifier': message_ids[3]}
+    ]}
+    assert sorted(processed) == ['0', '2']
+
+def test_malformed_record_fails_alone():
+    async def process_job(job):
+        pass
+
+    records = [
+        {'messageId': 'valid', 'eventSource': 'aws:sqs', 'body': '{}'},
+        {'messageId': 'malformed', 'eventSource': 'aws:sqs', 'body': 'not json'}
+    ]
+    result = asyncio.run(process_records(records, process_job))
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'malformed'}]}
+
+def test_parallelism_limits_concurrent_jobs():
+    queue = InMemoryJobQueue()
+    for index in range(6):
+        queue.send_job({'verification_id': str(index)})
+    running = 0
+    peak = 0
+
+    async def process_job(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    result = asyncio.run(process_records(queue.receive(), process_job, parallelism=2))
+
+    assert result == {'batchItemFailures': []}
+    assert peak == 2
+
+def test_is_queue_event():
+    queue = InMemoryJobQueue()
+    queue.send_job({'action': 'start'})
+
+    assert is_queue_event({'Records': queue.receive()})
+    assert not is_queue_event({'httpMethod': 'GET', 'path': '/verifications'})
+    assert not is_queue_event({'Records': []})
+
+def test_jobs_get_the_receive_count_of_their_record():
+    jobs = []
+
+    async def process_job(job):
+        jobs.append(job)
+
+    records = [
+        {'messageId': 'first', 'body': '{"action": "start"}', 'attributes': {'ApproximateReceiveCount': '1'}},
+        {'messageId': 'last', 'body': '{"action": "start"}', 'attributes': {'ApproximateReceiveCount': str(MAX_RECEIVES)}}
+    ]
+    asyncio.run(process_records(records, process_job))
+
+    assert [job['receive_count'] for job in jobs] == [1, MAX_RECEIVES]
+    assert [is_final_attempt(job) for job in jobs] == [False, True]
+    # Jobs run in process are never retried
+    assert is_final_attempt({'action': 'start'})
@@ -0,0 +1,59 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from datetime import date
+import pytest
+from lib.mrz import check_digit, parse_mrz
+
+# ICAO 9303 specimen passport and ID card
+TD3_SPECIMEN = (
+    "P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<\n"
+    "L898902C36UTO7408122F1204159ZE184226B<<<<<10"
+)
+TD1_SPECIMEN = (
+    "I<UTOD231458907<<<<<<<<<<<<<<<\n"
+    "7408122F1204159UTO<<<<<<<<<<<6\n"
+    "ERIKSSON<<ANNA<MARIA<<<<<<<<<<"
+)
+TODAY = date(2010, 1, 1)
+
+@pytest.mark.parametrize('value, expected', [
+    ('L898902C3', '6'),
+    ('740812', '2'),
+    ('120415', '9'),
+    ('ZE184226B<<<<<', '1'),
+    ('D23145890', '7'),
+    ('<<<<<<<<<', '0')
+])
+def test_check_digit(value, expected):
+    assert check_digit(value) == expected
+
+def test_parse_td3_specimen():
+    mrz = parse_mrz(TD3_SPECIMEN, TODAY)
+
+    assert mrz['format'] == 'TD3'
+    assert mrz['valid']
+    assert all(mrz['check_digits'].values())
+    assert mrz['document_number'] == 'L898902C3'
+    assert mrz['surname'] == 'ERIKSSON'
+    assert mrz['given_names'] == 'ANNA MARIA'
+    assert mrz['date_of_birth'] == '1974-08-12'
+    assert mrz['expiry_date'] == '2012-04-15'
+
+def test_parse_td1_specimen():
+    mrz = parse_mrz(TD1_SPECIMEN, TODAY)
+
+    assert mrz['format'] == 'TD1'
+    assert mrz['valid']
+    assert mrz['document_number'] == 'D23145890'
+
+def test_altered_field_fails_its_check_digit():
+    mrz = parse_mrz(TD3_SPECIMEN.replace('L898902C3', 'L898902C4'), TODAY)
+
+    assert not mrz['valid']
+    assert not mrz['check_digits']['document_number']
+    assert not mrz['check_digits']['composite']
+    assert mrz['check_digits']['date_of_birth']
+
+def test_text_without_mrz():
+    assert parse_mrz("Passport\nNo machine readable zone here") is None
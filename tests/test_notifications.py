@@ -0,0 +1,75 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+from lib.job_queue import InMemoryJobQueue
+from lib.notifications import MAX_DELIVERY_ATTEMPTS, RETRY_BASE_DELAY_SECONDS, CompletionNotifier
+
+DESTINATION = {'callback_url': 'https://example.com/callback'}
+VERIFICATION = {'verification_id': 'verification-1', 'status': 'COMPLETED', 'updated_at': '2025-01-01T00:00:00'}
+
+class RecordingQueue(InMemoryJobQueue):
+    """In-memory job queue that records the delay of each job"""
+
+    def __init__(self):
+        super().__init__()
+        self.delays = []
+
+    def send_job(self, job, delay_seconds=0):
+        self.delays.append(delay_seconds)
+        return super().send_job(job, delay_seconds)
+
+class RecordingSQS:
+    """SQS client that records sent messages"""
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, **kwargs):
+        self.messages.append(kwargs)
+
+def get_notifier(failures):
+    """Notifier whose first deliveries fail, returns the notifier and the delivered bodies"""
+    notifier = CompletionNotifier(dead_letter_queue_url='https://sqs.us-east-1.amazonaws.com/123/dlq',
+                                  job_queue=RecordingQueue())
+    notifier.sqs = RecordingSQS()
+    attempts = []
+    delivered = []
+
+    def deliver(destination, body, timestamp, signature, timeout):
+        attempts.append(timestamp)
+        if len(attempts) <= failures:
+            raise ConnectionError("Callback is unreachable")
+        delivered.append(body)
+
+    notifier._deliver = deliver # pylint: disable=protected-access
+    return notifier, delivered
+
+def test_failed_delivery_is_retried_with_backoff():
+    notifier, delivered = get_notifier(failures=2)
+
+    result = notifier.notify(DESTINATION, VERIFICATION)
+    assert result['status'] == 'retrying'
+    while notifier.job_queue:
+        job = json.loads(notifier.job_queue.receive(1)[0]['body'])
+        result = notifier.deliver(job['destination'], job['body'], job['attempts'] + 1)
+
+    assert result['status'] == 'delivered'
+    assert result['attempts'] == 3
+    assert notifier.job_queue.delays == [RETRY_BASE_DELAY_SECONDS, 2 * RETRY_BASE_DELAY_SECONDS]
+    assert json.loads(delivered[0])['verification_id'] == 'verification-1'
+    assert not notifier.sqs.messages
+
+def test_notification_is_dead_lettered_after_the_last_attempt():
+    notifier, delivered = get_notifier(failures=MAX_DELIVERY_ATTEMPTS)
+
+    notifier.notify(DESTINATION, VERIFICATION)
+    while notifier.job_queue:
+        job = json.loads(notifier.job_queue.receive(1)[0]['body'])
+        result = notifier.deliver(job['destination'], job['body'], job['attempts'] + 1)
+
+    assert result['status'] == 'dead_letter'
+    assert result['attempts'] == MAX_DELIVERY_ATTEMPTS
+    assert len(notifier.job_queue.delays) == MAX_DELIVERY_ATTEMPTS - 1
+    assert not delivered
+    assert json.loads(notifier.sqs.messages[0]['MessageBody'])['destination'] == DESTINATION
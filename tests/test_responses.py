@@ -0,0 +1,48 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from lib.responses import compute_etag, finalize_response
+from lib.utils import create_api_response
+
+ITEM = {'pk': 'verification-1', 'sk': 'result', 'updated_at': '2024-01-01T00:00:00', 'url': 'https://signed/1'}
+
+def get_event(if_none_match=None, method='GET'):
+    headers = {'if-none-match': if_none_match} if if_none_match else {}
+    return {'httpMethod': method, 'headers': headers}
+
+def test_etag_ignores_volatile_fields_of_versioned_items():
+    assert compute_etag(ITEM) == compute_etag({**ITEM, 'url': 'https://signed/2'})
+    assert compute_etag(ITEM) != compute_etag({**ITEM, 'updated_at': '2024-01-02T00:00:00'})
+    assert compute_etag(ITEM).startswith('W/"')
+
+def test_etag_of_unversioned_body_covers_the_whole_body():
+    assert compute_etag({'a': 1}) == compute_etag({'a': 1})
+    assert compute_etag({'a': 1}) != compute_etag({'a': 2})
+    assert compute_etag([ITEM, {'a': 1}]) != compute_etag([ITEM, {'a': 2}])
+
+def test_matching_etag_returns_304():
+    etag = compute_etag(ITEM)
+    response = finalize_response(get_event(etag.removeprefix('W/')), create_api_response(200, ITEM, etag=etag))
+
+    assert response['statusCode'] == 304
+    assert response['body'] == ''
+    assert 'Content-Type' not in response['headers']
+    assert response['headers']['ETag'] == etag
+
+def test_any_of_several_etags_or_wildcard_matches():
+    etag = compute_etag(ITEM)
+    for if_none_match in (f'W/"other", {etag}', '*'):
+        response = finalize_response(get_event(if_none_match), create_api_response(200, ITEM, etag=etag))
+        assert response['statusCode'] == 304
+
+def test_full_response_when_etag_differs_or_method_is_not_get():
+    etag = compute_etag(ITEM)
+    for event in (get_event('W/"other"'), get_event(etag, method='POST'), get_event()):
+        response = finalize_response(event, create_api_response(200, ITEM, etag=etag))
+        assert response['statusCode'] == 200
+        assert response['body']
+
+def test_error_responses_are_not_replaced():
+    etag = compute_etag(ITEM)
+    response = finalize_response(get_event(etag), create_api_response(404, {'detail': 'Not Found'}, etag=etag))
+    assert response['statusCode'] == 404
@@ -0,0 +1,47 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+from lib.router import Route, Router
+
+async def handler(event, context):
+    return {}
+
+@pytest.mark.parametrize('path', ['/verifications', '/verifications/', '/prod/verifications'])
+def test_route_matches_path_with_optional_stage(path):
+    assert Route('GET', '/verifications', handler).match('GET', path, None) == {}
+
+@pytest.mark.parametrize('path', ['/fooverifications', '/verifications-old', '/x/y/verifications', '/verifications/abc'])
+def test_route_is_anchored_on_path_segments(path):
+    assert Route('GET', '/verifications', handler).match('GET', path, None) is None
+
+def test_path_parameter_matches_one_segment():
+    route = Route('GET', '/strands/{verification_id}', handler)
+
+    assert route.match('GET', '/strands/abc', None) == {'verification_id': 'abc'}
+    assert route.match('GET', '/prod/strands/abc', None) == {'verification_id': 'abc'}
+    assert route.match('GET', '/strands/abc/def', None) is None
+    assert route.match('GET', '/strands/', None) is None
+
+def test_method_and_action_must_match():
+    route = Route('POST', '/verifications', handler, action='analyze')
+
+    assert route.match('GET', '/verifications', 'analyze') is None
+    assert route.match('POST', '/verifications', None) is None
+    assert route.match('POST', '/verifications', 'analyze') == {}
+
+def test_router_prefers_routes_with_an_action():
+    plain = Route('POST', '/verifications', handler)
+    action = Route('POST', '/verifications', handler, action='analyze')
+    router = Router([plain, action])
+
+    assert router.resolve({'httpMethod': 'POST', 'path': '/verifications',
+                           'queryStringParameters': {'action': 'analyze'}}) is action
+    assert router.resolve({'httpMethod': 'POST', 'path': '/verifications'}) is plain
+
+def test_router_fills_in_path_parameters():
+    router = Router([Route('GET', '/verifications/{verification_id}', handler)])
+    event = {'httpMethod': 'GET', 'path': '/verifications/abc'}
+
+    assert router.resolve(event) is not None
+    assert event['pathParameters'] == {'verification_id': 'abc'}
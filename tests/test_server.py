@@ -0,0 +1,59 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+import json
+import threading
+from lib.dynamodb import DynamoDBService
+from lib.router import Route, Router
+from lib.server import create_app
+from lib.utils import create_api_response
+
+class SlowTable:
+    """DynamoDB table whose reads only return once two of them are in flight"""
+
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def get_item(self, Key):
+        self.barrier.wait()
+        return {'Item': {'pk': Key['pk']}}
+
+def get_app():
+    db_service = DynamoDBService.__new__(DynamoDBService)
+    db_service.verifications_table = SlowTable()
+
+    async def get_verification(event, context):
+        verification = await db_service.get_verification(event['pathParameters']['verification_id'])
+        return create_api_response(200, verification)
+
+    router = Router([Route('GET', '/verifications/{verification_id}', get_verification)])
+    return create_app({'verifications': router})
+
+async def get(app, path):
+    """Send a GET request to an ASGI app and return the status and body"""
+    messages = []
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': 'GET', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': [], 'client': ('test', 1), 'server': ('test', 80)
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return messages[0]['status'], json.loads(body)
+
+def test_overlapping_requests_do_not_block_each_other():
+    app = get_app()
+
+    async def run():
+        return await asyncio.gather(get(app, '/verifications/a'), get(app, '/verifications/b'))
+
+    # Each read waits for the other, a read blocking the event loop would time out
+    assert asyncio.run(run()) == [(200, {'pk': 'a'}), (200, {'pk': 'b'})]
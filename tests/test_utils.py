@@ -0,0 +1,52 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import base64
+import pytest
+from pydantic import BaseModel
+from lib.utils import decode_base64_image, extract_json_object, validate_body
+
+IMAGE = b'\xff\xd8\xff\xe0 fake jpeg \x00\x01'
+ENCODED = base64.b64encode(IMAGE).decode('ascii')
+
+class Document(BaseModel):
+    image: str
+
+def test_extract_json_object_from_fenced_output():
+    text = 'Here is the result:\n```json\n{"is_authentic": true, "confidence": 0.9}\n```\nDone.'
+    assert extract_json_object(text) == {'is_authentic': True, 'confidence': 0.9}
+
+def test_extract_json_object_ignores_braces_in_strings():
+    text = '{"reason": "text with } and { braces", "nested": {"a": "\\"}"}}'
+    assert extract_json_object(text) == {'reason': 'text with } and { braces', 'nested': {'a': '"}'}}
+
+def test_extract_json_object_skips_invalid_objects():
+    assert extract_json_object('{not json} then {"valid": 1}') == {'valid': 1}
+
+def test_extract_json_object_without_object():
+    assert extract_json_object('no json here') is None
+    assert extract_json_object('{"unbalanced": 1') is None
+    assert extract_json_object(None) is None
+
+@pytest.mark.parametrize('value', [
+    ENCODED,
+    f"data:image/jpeg;base64,{ENCODED}",
+    ENCODED.encode('ascii'),
+    f"{ENCODED[:8]}\n{ENCODED[8:]}\n"
+])
+def test_decode_base64_image(value):
+    assert decode_base64_image(value) == IMAGE
+
+def test_decode_base64_image_rejects_invalid_data():
+    with pytest.raises(ValueError, match="Invalid base64 image data"):
+        decode_base64_image(ENCODED[:-3])
+
+@pytest.mark.parametrize('body', ['{"image": "abc"}', b'{"image": "abc"}', {'image': 'abc'}])
+def test_validate_body_drops_the_raw_body(body):
+    event = {'body': body}
+    assert validate_body(event, Document) == Document(image='abc')
+    assert event['body'] is None
+
+def test_validate_body_requires_a_body():
+    with pytest.raises(ValueError, match="No body found"):
+        validate_body({'body': None}, Document)